@@ -1,19 +1,113 @@
+import asyncio
+import hmac
+import os
+import threading
 import time
-from typing import Awaitable, Callable, Dict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
 
 import boto3
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import Response
+from fastapi.responses import PlainTextResponse, Response
 
 from .pydantic_models import (
     AiRequest,
     AiResponse,
+    ClassifierBatchResponse,
     ClassifierResponse,
     VaGovClaim,
+    VaGovClaimBatch,
 )
-from .util.app_utilities import dc_lookup_table, dropdown_lookup_table, expanded_lookup_table, ml_classifier
-from .util.classifier_utilities import classify_claim, ml_classify_claim, supplement_with_ml_classification
-from .util.logging_utilities import log_as_json, log_claim_stats_decorator
+from .util.app_utilities import (
+    app_config,
+    dc_lookup_table,
+    dropdown_lookup_table,
+    expanded_lookup_table,
+    ml_classifier_resource,
+    reload_resources,
+    reload_signal,
+    resources,
+    taxonomy_resource,
+)
+from .util.classifier_utilities import (
+    classify_claim,
+    lookup_contention_texts,
+    ml_classify_claim,
+    result_caches,
+    supplement_batch_with_ml_classification,
+    supplement_with_ml_classification,
+)
+from .util.executor_utilities import run_in_classification_executor
+from .util.log_queue import queue_logging_stats
+from .util.logging_utilities import (
+    count_ml_classifications,
+    is_log_line_sampled,
+    log_as_json,
+    log_claim_stats_decorator,
+    log_claim_stats_v2,
+)
+from .util.metrics import (
+    CACHE_ENTRIES,
+    CACHE_EVICTIONS,
+    CACHE_HIT_RATIO,
+    CACHE_REQUESTS,
+    LOG_QUEUE_SIZE,
+    LOG_RECORDS_DROPPED,
+    LOOKUP_TABLE_ENTRIES,
+    PROCESSES,
+    REQUEST_DURATION,
+    MetricsFlusher,
+    Sample,
+    metrics,
+    render_metrics,
+)
+from .util.resource_registry import ReloadInProgressError
+from .util.stage_timing import StageTimedRoute, finish_request_stages, format_server_timing, start_request_stages
+
+
+def warm_up_resources() -> None:
+    start_time = time.perf_counter()
+    try:
+        load_times = resources.warm_up()
+    except Exception as e:
+        # resources that failed to load are retried when they are first used
+        log_as_json({"message": "Failed to load shared resources", "error": str(e), "level": "error"})
+        return
+    log_as_json(
+        {"message": "Loaded shared resources", "total_seconds": time.perf_counter() - start_time, "load_seconds": load_times}
+    )
+
+
+def follow_reload() -> None:
+    # another worker has reloaded the shared resources; this one rebuilds its own from the same app_config.yaml
+    try:
+        load_times = reload_resources()
+    except ReloadInProgressError:
+        # this worker is already reloading, and will use the same configuration
+        return
+    except Exception as e:
+        log_as_json({"message": "Failed to reload shared resources after another worker", "error": str(e), "level": "error"})
+        return
+    log_as_json({"message": "Reloaded shared resources after another worker", "load_seconds": load_times})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # the lookup tables and ML classifier are built lazily; start building them in the background at startup,
+    # so that the first requests do not pay for it and /ready can report that the app is still loading
+    warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up_resources))
+    # with several workers, each one writes its metrics to the shared directory for /metrics to add up
+    metrics_flusher: Optional[MetricsFlusher] = None
+    if app_config["metrics"]["multiprocess_dir"]:
+        metrics_flusher = MetricsFlusher(
+            metrics, app_config["metrics"]["multiprocess_dir"], app_config["metrics"]["flush_seconds"]
+        )
+        metrics_flusher.start()
+    yield
+    await warm_up_task
+    if metrics_flusher is not None:
+        metrics_flusher.stop()
+
 
 app = FastAPI(
     title="Contention Classification",
@@ -34,21 +128,49 @@ app = FastAPI(
             "description": "Contention Classification Default",
         },
     ],
+    lifespan=lifespan,
 )
+# times request validation and response serialization (see stage_timing.py); set before any routes are added
+app.router.route_class = StageTimedRoute
 
 
 @app.middleware("http")
 async def save_process_time_as_metric(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
+    start_time = time.perf_counter()
+    if reload_signal is not None and reload_signal.check():
+        # this request is served with the current resources while the new ones are built
+        threading.Thread(target=follow_reload, name="follow-reload", daemon=True).start()
+    stages_token = start_request_stages()
+    # the request uses the lookup tables, ML classifier and thresholds that are current now until it finishes,
+    # even if a reload swaps in new ones in the meantime
+    snapshot_token = resources.pin_snapshot()
+    try:
+        response = await call_next(request)
+    finally:
+        resources.unpin_snapshot(snapshot_token)
+        stages = finish_request_stages(stages_token)
+    process_time = time.perf_counter() - start_time
+    # labelled by route rather than url, so that unknown urls do not each add a histogram
+    route = request.scope.get("route")
+    metrics.observe(REQUEST_DURATION, process_time, route=getattr(route, "path", "other"))
     response.headers["X-Process-Time"] = str(process_time)
-    log_as_json({"process_time": process_time, "url": request.url.path})
+    if app_config["stage_timing"]["server_timing_header"]:
+        response.headers["Server-Timing"] = format_server_timing(stages, process_time)
+    # the request durations are also in /metrics, so in rollup logging mode only a sample of these lines are written
+    if is_log_line_sampled():
+        log = {"process_time": process_time, "url": request.url.path}
+        if app_config["stage_timing"]["log_stages"]:
+            log["stages_ms"] = {stage: seconds * 1000 for stage, seconds in stages.items()}
+        log_as_json(log)
     return response
 
 
 @app.get("/health")
-def get_health_status() -> Dict[str, str]:
+async def get_health_status() -> Dict[str, str]:
+    # the tables are not used until they have loaded: using them would wait for the warm-up on the event loop,
+    # holding up every other request (including /ready) until the tables have loaded
+    if not taxonomy_resource.loaded:
+        return {"status": "loading"}
     empty_tables = []
     if not len(dc_lookup_table):
         empty_tables.append("DC Lookup")
@@ -66,22 +188,114 @@ def get_health_status() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def get_readiness_status() -> Dict[str, str]:
+    # unlike /health, this reports whether the shared resources have finished loading, so that traffic is
+    # not sent to the app while it is still starting up
+    pending = resources.pending()
+    if pending:
+        raise HTTPException(status_code=503, detail=f"Loading {', '.join(pending)}")
+    return {"status": "ready"}
+
+
+def _cache_and_log_queue_counters() -> Iterator[Sample]:
+    # the result caches and the log queue keep their own counts, which are read whenever the metrics are
+    for name, cache in result_caches().items():
+        stats = cache.stats()
+        yield CACHE_REQUESTS, {"cache": name, "result": "hit"}, stats["hits"]
+        yield CACHE_REQUESTS, {"cache": name, "result": "miss"}, stats["misses"]
+        yield CACHE_EVICTIONS, {"cache": name}, stats["evictions"]
+    yield LOG_RECORDS_DROPPED, {}, queue_logging_stats()["dropped"]
+
+
+metrics.add_collector(_cache_and_log_queue_counters)
+
+
+def _gauges(snapshot: Dict[str, Any], num_processes: int) -> List[Sample]:
+    """
+    Returns the gauges read when /metrics is scraped. The hit ratios are calculated from the cache counters of all
+    of the processes; the sizes of the lookup tables, caches and log queue are those of the process serving the
+    scrape.
+    """
+    gauges: List[Sample] = [(PROCESSES, {}, num_processes)]
+    # the lookup tables are not loaded by a scrape; their sizes are reported once they have been loaded
+    if taxonomy_resource.loaded:
+        gauges.append((LOOKUP_TABLE_ENTRIES, {"table": "diagnostic_code"}, len(dc_lookup_table)))
+        gauges.append((LOOKUP_TABLE_ENTRIES, {"table": "contention_text"}, len(dropdown_lookup_table)))
+        gauges.append((LOOKUP_TABLE_ENTRIES, {"table": "expanded"}, len(expanded_lookup_table)))
+
+    cache_requests: Dict[str, Dict[str, float]] = {}
+    for counter in snapshot["counters"]:
+        if counter["name"] == CACHE_REQUESTS:
+            cache_requests.setdefault(counter["labels"]["cache"], {})[counter["labels"]["result"]] = counter["value"]
+    for name, lookups in sorted(cache_requests.items()):
+        total = lookups.get("hit", 0.0) + lookups.get("miss", 0.0)
+        gauges.append((CACHE_HIT_RATIO, {"cache": name}, lookups.get("hit", 0.0) / total if total else 0.0))
+    for name, cache in result_caches().items():
+        gauges.append((CACHE_ENTRIES, {"cache": name}, len(cache)))
+    gauges.append((LOG_QUEUE_SIZE, {}, queue_logging_stats()["queue_size"]))
+    return gauges
+
+
+@app.get("/metrics", include_in_schema=False, response_class=PlainTextResponse)
+def get_metrics() -> PlainTextResponse:
+    # counters and histograms in the Prometheus text format, added up across workers when a multi-process
+    # directory is configured (see metrics.py)
+    snapshot, num_processes = metrics.merged_snapshot(app_config["metrics"]["multiprocess_dir"])
+    return PlainTextResponse(
+        render_metrics(metrics, snapshot, _gauges(snapshot, num_processes)),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@app.post("/admin/reload", include_in_schema=False)
+async def reload_shared_resources(request: Request) -> Dict[str, Any]:
+    # rebuilds the lookup tables and ML classifier from app_config.yaml without a restart; only enabled
+    # when ADMIN_RELOAD_TOKEN is set, and the token must be sent in the X-Admin-Token header
+    admin_token = os.environ.get("ADMIN_RELOAD_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", "").encode(), admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if reload_signal is None and app_config["metrics"]["multiprocess_dir"]:
+        # with several workers, only the one handling this request would be reloaded
+        raise HTTPException(status_code=409, detail="Reloading several workers needs admin_reload.signal_file to be set")
+
+    try:
+        load_times = await asyncio.to_thread(reload_resources)
+    except ReloadInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    except Exception as e:
+        log_as_json({"message": "Failed to reload shared resources", "error": str(e), "level": "error"})
+        raise HTTPException(status_code=500, detail=f"Reload failed, the current resources are still in use: {e}") from e
+    if reload_signal is not None:
+        reload_signal.publish()
+    log_as_json({"message": "Reloaded shared resources", "load_seconds": load_times})
+    return {"status": "reloaded", "load_seconds": load_times}
+
+
 @app.post("/expanded-contention-classification")
 @log_claim_stats_decorator
-def expanded_classifications(claim: VaGovClaim, request: Request) -> ClassifierResponse:
-    response = classify_claim(claim, request)
+async def expanded_classifications(claim: VaGovClaim, request: Request) -> ClassifierResponse:
+    response = await run_in_classification_executor(classify_claim, claim, request)
     return response
 
 
 @app.post("/ml-contention-classification")
-def ml_classifications_endpoint(contentions: AiRequest) -> AiResponse:
-    response = ml_classify_claim(contentions)
+async def ml_classifications_endpoint(contentions: AiRequest) -> AiResponse:
+    response = await run_in_classification_executor(ml_classify_claim, contentions)
+    count_ml_classifications(response, "/ml-contention-classification")
     return response
 
 
 @app.post("/hybrid-contention-classification")
 @log_claim_stats_decorator
-def hybrid_classification(claim: VaGovClaim, request: Request) -> ClassifierResponse:
+async def hybrid_classification(claim: VaGovClaim, request: Request) -> ClassifierResponse:
+    response = await run_in_classification_executor(_hybrid_classify_claim, claim, request)
+    return response
+
+
+def _hybrid_classify_claim(claim: VaGovClaim, request: Request) -> ClassifierResponse:
     # classifies using expanded classification
     response: ClassifierResponse = classify_claim(claim, request)
 
@@ -97,11 +311,34 @@ def hybrid_classification(claim: VaGovClaim, request: Request) -> ClassifierResp
     return response
 
 
+@app.post("/batch/hybrid-contention-classification")
+async def batch_hybrid_classification(batch: VaGovClaimBatch, request: Request) -> ClassifierBatchResponse:
+    responses = await run_in_classification_executor(_batch_hybrid_classify_claims, batch.claims, request)
+
+    for claim, response in zip(batch.claims, responses, strict=True):
+        log_claim_stats_v2(claim, response, request)
+
+    return ClassifierBatchResponse(claims=responses)
+
+
+def _batch_hybrid_classify_claims(claims: list[VaGovClaim], request: Request) -> list[ClassifierResponse]:
+    # looks up the contention texts of the whole batch at once and classifies every claim using expanded
+    # classification, then makes a single ML classifier call for the contentions that remain unclassified
+    text_classifications = lookup_contention_texts(claims)
+    responses = [classify_claim(claim, request, text_classifications) for claim in claims]
+    return supplement_batch_with_ml_classification(responses, claims, request)
+
+
+# left synchronous: the STS call is blocking network I/O, which Starlette runs on its threadpool
 @app.get("/health-ml-classifier")
 def get_aws_status() -> Dict[str, str]:
     
     errors = []
-    if ml_classifier is None:
+    # reads the load state rather than using the ml_classifier proxy, which would load the model (or wait for the
+    # warm-up to finish loading it)
+    if not ml_classifier_resource.loaded:
+        errors.append("ML Classifier is still loading")
+    elif ml_classifier_resource.get() is None:
         errors.append("ML Classifier is not initialized")
     try:
         sts_client = boto3.client("sts")
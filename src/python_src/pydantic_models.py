@@ -37,11 +37,27 @@ class VaGovClaim(BaseModel):
     contentions: Annotated[list[Contention], Field(min_length=1)]
 
 
+class VaGovClaimBatch(BaseModel):
+    """used for classifying many claims (eg backfill jobs) in a single request"""
+
+    claims: Annotated[list[VaGovClaim], Field(min_length=1)]
+
+
+class MLClassification(BaseModel):
+    classification_code: Optional[int]
+    classification_name: str
+    probability: float
+
+
 class ClassifiedContention(BaseModel):
     classification_code: Optional[int]
     classification_name: Optional[str]
     diagnostic_code: Optional[int] = None  # only required for contention_type: "claim_for_increase"
     contention_type: str  # "disabilityActionType" in the VA.gov API
+    # the ML classifier's most probable classifications, only included when requested with AiRequest.top_k
+    top_classifications: Optional[List[MLClassification]] = Field(default=None, exclude_if=lambda v: v is None)
+    # the ML classification that was rejected for being below its confidence threshold, if any
+    rejected_classification: Optional[MLClassification] = Field(default=None, exclude_if=lambda v: v is None)
 
 
 class ClassifierResponse(BaseModel):
@@ -53,8 +69,14 @@ class ClassifierResponse(BaseModel):
     num_classified_contentions: int
 
 
+class ClassifierBatchResponse(BaseModel):
+    claims: list[ClassifierResponse]
+
+
 class AiRequest(BaseModel):
     contentions: List[Contention]
+    # number of ML classifications (with their probabilities) to return for each contention
+    top_k: Optional[Annotated[int, Field(ge=1, le=20)]] = None
 
 
 class AiResponse(BaseModel):
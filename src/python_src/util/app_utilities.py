@@ -5,9 +5,21 @@ Methods
 -------
 load_config
     Load the configuration file.
+load_taxonomy
+    Load the lookup tables from the compiled taxonomy artifact, or build them from the CSVs.
+load_predictor
+    Load the ML classifier.
+reload_resources
+    Rebuild the lookup tables and ML classifier from the config file and swap them in.
 
 Shared Resources
 ----------------
+These are built on first use, or when resources.warm_up() is called at application startup.
+
+resources
+    Registry of the lazily built resources
+reload_signal
+    Tells the other uvicorn workers to reload the resources after a reload (None if it is not configured)
 dc_lookup_table
     Class used to look up diagnostic codes and map to classifications
 dropdown_lookup_table
@@ -15,24 +27,35 @@ dropdown_lookup_table
 expanded_lookup_table
     Class to use in the expanded lookup method
 dropdown_values
-    List of autosuggestions
+    Indexed catalog of autosuggestions
 ml_classifier
-    Machine learning classifier instance for model predictions
+    Machine learning classifier instance for model predictions (behind a micro-batcher if batching is enabled)
+ml_confidence_thresholds
+    Default ML confidence threshold and the thresholds for particular classification codes
+contention_text_cache
+    LRU cache of lookup table classifications, keyed on resource generation, lookup table and contention text
+ml_prediction_cache
+    LRU cache of ML classifier predictions, keyed on resource generation and contention text
 
 Note:
     S3-related functions have been moved to s3_utilities.py module.
 """
 
 import os
-from typing import Any, Dict, cast
+from typing import Any, Dict, Optional, Tuple, cast
 
 from yaml import safe_load
 
 from .expanded_lookup_table import ExpandedLookupTable
-from .logging_dropdown_selections import build_logging_table
+from .logging_dropdown_selections import DropdownCatalog
 from .lookup_table import ContentionTextLookupTable, DiagnosticCodeLookupTable
 from .lookup_tables_utilities import InitValues
+from .ml_batcher import MLPredictionBatcher
+from .ml_classifier import Predictor
 from .ml_utilities import load_ml_classifier
+from .resource_registry import ReloadSignal, ResourceRegistry
+from .result_cache import LRUCache
+from .taxonomy_artifact import TaxonomyTables, build_taxonomy_tables, compute_source_hash, load_taxonomy_artifact
 
 
 def load_config(config_file: str) -> Dict[str, Any]:
@@ -60,69 +83,163 @@ def load_config(config_file: str) -> Dict[str, Any]:
         return cast(Dict[str, Any], safe_load(f))
 
 
-# build the lookup tables after loading the config yaml
-app_config = load_config(os.path.join(os.path.dirname(__file__), "app_config.yaml"))
+def get_diagnostic_code_inits(app_config: Dict[str, Any]) -> InitValues:
+    dc_table_name = (
+        f"{app_config['diagnostic_code_table']['filename']} {app_config['diagnostic_code_table']['version_number']}.csv"
+    )
+    return InitValues(
+        csv_filepath=os.path.join(os.path.dirname(__file__), "data", "dc_lookup_table", dc_table_name),
+        input_key=app_config["diagnostic_code_table"]["input_key"],
+        classification_code=app_config["diagnostic_code_table"]["classification_code"],
+        classification_name=app_config["diagnostic_code_table"]["classification_name"],
+        active_selection=None,
+        lut_default_value=app_config["lut_default_value"],
+    )
+
+
+def get_dropdown_expanded_table_inits(app_config: Dict[str, Any]) -> InitValues:
+    contention_lut_csv_filename = (
+        f"{app_config['condition_dropdown_table']['filename']} - "
+        f"{app_config['condition_dropdown_table']['version_number']}.csv"
+    )
+    return InitValues(
+        csv_filepath=os.path.join(os.path.dirname(__file__), "data", "master_taxonomy", contention_lut_csv_filename),
+        input_key=app_config["condition_dropdown_table"]["input_key"],
+        classification_code=app_config["condition_dropdown_table"]["classification_code"],
+        classification_name=app_config["condition_dropdown_table"]["classification_name"],
+        active_selection=app_config["condition_dropdown_table"]["active_classification"],
+        lut_default_value=app_config["lut_default_value"],
+        aggregate_synonyms=app_config["condition_dropdown_table"]["aggregate_synonyms"],
+    )
+
+
+def get_autosuggestions_path(app_config: Dict[str, Any]) -> str:
+    return os.path.join(
+        os.path.dirname(__file__),
+        "data",
+        "master_taxonomy",
+        f"{app_config['autosuggestion_table']['filename']} - {app_config['autosuggestion_table']['version_number']}.csv",
+    )
+
+
+def get_ml_confidence_thresholds(app_config: Dict[str, Any]) -> Tuple[float, Dict[int, float]]:
+    """
+    Returns the default ML confidence threshold and the thresholds for particular classification codes
+    """
+    thresholds_config = app_config["ml_classifier"]["confidence_thresholds"]
+    by_classification_code = thresholds_config["by_classification_code"] or {}
+    return float(thresholds_config["default"]), {int(code): float(t) for code, t in by_classification_code.items()}
 
-default_lut_table = app_config["lut_default_value"]
 
-dc_table_name = (
-    f"{app_config['diagnostic_code_table']['filename']} {app_config['diagnostic_code_table']['version_number']}.csv"
-)
-dc_csv_filepath = os.path.join(os.path.dirname(__file__), "data", "dc_lookup_table", dc_table_name)
-
-diagnostic_code_inits = InitValues(
-    csv_filepath=dc_csv_filepath,
-    input_key=app_config["diagnostic_code_table"]["input_key"],
-    classification_code=app_config["diagnostic_code_table"]["classification_code"],
-    classification_name=app_config["diagnostic_code_table"]["classification_name"],
-    active_selection=None,
-    lut_default_value=default_lut_table,
-)
+def load_taxonomy(app_config: Dict[str, Any]) -> TaxonomyTables:
+    """
+    Loads the lookup tables from the compiled taxonomy artifact (see taxonomy_artifact.py) when it is
+    up to date, and builds them from the CSVs otherwise.
+    """
+    diagnostic_code_inits = get_diagnostic_code_inits(app_config)
+    dropdown_expanded_table_inits = get_dropdown_expanded_table_inits(app_config)
+    autosuggestions_path = get_autosuggestions_path(app_config)
+    taxonomy_source_files = [
+        diagnostic_code_inits.csv_filepath,
+        dropdown_expanded_table_inits.csv_filepath,
+        autosuggestions_path,
+    ]
+    return load_taxonomy_artifact(
+        os.path.join(os.path.dirname(__file__), app_config["taxonomy_artifact"]["path"]),
+        compute_source_hash(app_config, taxonomy_source_files),
+        app_config,
+        diagnostic_code_inits,
+        dropdown_expanded_table_inits,
+    ) or build_taxonomy_tables(app_config, diagnostic_code_inits, dropdown_expanded_table_inits, autosuggestions_path)
+
+
+def load_predictor(app_config: Dict[str, Any]) -> Optional[Predictor]:
+    """
+    Loads the ML classifier using the ml_utilities module, behind a micro-batcher if batching is enabled.
+    """
+    ml_classifier: Optional[Predictor] = load_ml_classifier(app_config)
+    batching_config = app_config["ml_classifier"]["inference"]["batching"]
+    if ml_classifier is not None and batching_config["enabled"]:
+        ml_classifier = MLPredictionBatcher(ml_classifier, batching_config["max_wait_ms"], batching_config["max_batch_size"])
+    return ml_classifier
 
 
-dc_lookup_table = DiagnosticCodeLookupTable(init_values=diagnostic_code_inits)
+config_path = os.path.join(os.path.dirname(__file__), "app_config.yaml")
+app_config = load_config(config_path)
 
-contention_lut_csv_filename = (
-    f"{app_config['condition_dropdown_table']['filename']} - {app_config['condition_dropdown_table']['version_number']}.csv"
+default_lut_table = app_config["lut_default_value"]
+diagnostic_code_inits = get_diagnostic_code_inits(app_config)
+dropdown_expanded_table_inits = get_dropdown_expanded_table_inits(app_config)
+autosuggestions_path = get_autosuggestions_path(app_config)
+
+taxonomy_source_files = [diagnostic_code_inits.csv_filepath, dropdown_expanded_table_inits.csv_filepath, autosuggestions_path]
+taxonomy_artifact_path = os.path.join(os.path.dirname(__file__), app_config["taxonomy_artifact"]["path"])
+
+# The tables and classifier are built on first use, or by resources.warm_up() at application startup, so that
+# importing this module stays cheap. The module-level names are proxies that stand in for the resources, in the
+# snapshot pinned by the current request (see ResourceRegistry), so that they are all from the same reload.
+resources = ResourceRegistry()
+taxonomy_resource = resources.register("taxonomy", lambda: load_taxonomy(app_config))
+ml_classifier_resource = resources.register("ml_classifier", lambda: load_predictor(app_config))
+ml_confidence_thresholds_resource = resources.register(
+    "ml_confidence_thresholds", lambda: get_ml_confidence_thresholds(app_config)
 )
-
-contention_text_csv_filepath = os.path.join(
-    os.path.dirname(__file__),
-    "data",
-    "master_taxonomy",
-    contention_lut_csv_filename,
+reload_signal = ReloadSignal(app_config["admin_reload"]["signal_file"]) if app_config["admin_reload"]["signal_file"] else None
+
+dc_lookup_table = cast(DiagnosticCodeLookupTable, taxonomy_resource.proxy("dc_lookup_table"))
+dropdown_lookup_table = cast(ContentionTextLookupTable, taxonomy_resource.proxy("dropdown_lookup_table"))
+expanded_lookup_table = cast(ExpandedLookupTable, taxonomy_resource.proxy("expanded_lookup_table"))
+dropdown_values = cast(DropdownCatalog, taxonomy_resource.proxy("dropdown_values"))
+ml_classifier = cast(Optional[Predictor], ml_classifier_resource.proxy())
+ml_confidence_thresholds = cast(Tuple[float, Dict[int, float]], ml_confidence_thresholds_resource.proxy())
+
+# Result caches sit in front of the lookup tables and ML classifier; they are created alongside them
+# so that rebuilding the shared resources also starts with empty caches
+contention_text_cache: LRUCache[Any, Tuple[Dict[str, Any], Optional[str]]] = LRUCache(
+    app_config["result_cache"]["contention_text_max_size"]
 )
-
-dropdown_expanded_table_inits = InitValues(
-    csv_filepath=contention_text_csv_filepath,
-    input_key=app_config["condition_dropdown_table"]["input_key"],
-    classification_code=app_config["condition_dropdown_table"]["classification_code"],
-    classification_name=app_config["condition_dropdown_table"]["classification_name"],
-    active_selection=app_config["condition_dropdown_table"]["active_classification"],
-    lut_default_value=default_lut_table,
-    aggregate_synonyms=app_config["condition_dropdown_table"]["aggregate_synonyms"],
+ml_prediction_cache: LRUCache[Tuple[int, str], tuple[str, float]] = LRUCache(
+    app_config["result_cache"]["ml_prediction_max_size"]
 )
-dropdown_lookup_table = ContentionTextLookupTable(dropdown_expanded_table_inits)
 
 
-expanded_lookup_table = ExpandedLookupTable(
-    init_values=dropdown_expanded_table_inits,
-    common_words=app_config["common_words"],
-    musculoskeletal_lut=app_config["musculoskeletal_lut"],
-)
+def clear_result_caches() -> None:
+    """
+    Invalidates the cached classification results, eg after the lookup tables or ML model are reloaded.
+    """
+    contention_text_cache.clear()
+    ml_prediction_cache.clear()
 
-autosuggestions_path = os.path.join(
-    os.path.dirname(__file__),
-    "data",
-    "master_taxonomy",
-    f"{app_config['autosuggestion_table']['filename']} - {app_config['autosuggestion_table']['version_number']}.csv",
-)
 
-dropdown_values = build_logging_table(
-    autosuggestions_path,
-    app_config["autosuggestion_table"]["autocomplete_terms"],
-    app_config["autosuggestion_table"]["active_autocomplete"],
-)
+def reload_resources() -> Dict[str, float]:
+    """
+    Re-reads app_config.yaml and rebuilds the lookup tables, ML classifier and ML confidence thresholds from it,
+    then swaps them all in at once (see ResourceRegistry.reload) and clears the result caches. Returns the time
+    taken to build each resource.
 
-# Initialize ML classifier using the ml_utilities module
-ml_classifier = load_ml_classifier(app_config)
+    Only the lookup table and ML classifier settings are reloaded; other settings (eg the cache sizes) still
+    need a restart to take effect. If the new lookup tables or ML classifier cannot be loaded, the error is
+    raised and the current ones stay in use.
+    """
+    new_config = load_config(config_path)
+    replaced = resources.reload(
+        {
+            "taxonomy": lambda: load_taxonomy(new_config),
+            "ml_classifier": lambda: _load_replacement_predictor(new_config),
+            "ml_confidence_thresholds": lambda: get_ml_confidence_thresholds(new_config),
+        }
+    )
+    clear_result_caches()
+    replaced_predictor = replaced.get("ml_classifier")
+    if isinstance(replaced_predictor, MLPredictionBatcher):
+        replaced_predictor.close()
+    return resources.load_times()
+
+
+def _load_replacement_predictor(new_config: Dict[str, Any]) -> Optional[Predictor]:
+    # load_ml_classifier logs and returns None when the model cannot be loaded; a reload should keep
+    # the current model in that case rather than disabling the ML classifier
+    predictor = load_predictor(new_config)
+    if predictor is None and ml_classifier_resource.loaded and ml_classifier_resource.get() is not None:
+        raise ValueError("The ML classifier could not be loaded from the new config")
+    return predictor
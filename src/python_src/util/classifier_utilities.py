@@ -1,5 +1,6 @@
-from typing import Any, Dict, Optional, Protocol, Tuple, Union, runtime_checkable
+from typing import Any, Dict, List, Optional, Protocol, Tuple, Union, runtime_checkable
 
+import numpy as np
 from fastapi import Request
 
 from ..pydantic_models import (
@@ -8,13 +9,27 @@ from ..pydantic_models import (
     ClassifiedContention,
     ClassifierResponse,
     Contention,
+    MLClassification,
     VaGovClaim,
 )
-from .app_utilities import dc_lookup_table, expanded_lookup_table, ml_classifier
+from .app_utilities import (
+    contention_text_cache,
+    dc_lookup_table,
+    dropdown_lookup_table,
+    expanded_lookup_table,
+    ml_classifier,
+    ml_confidence_thresholds,
+    ml_prediction_cache,
+    resources,
+)
 from .brd_classification_codes import get_classification_code
 from .expanded_lookup_table import ExpandedLookupTable
 from .logging_utilities import log_as_json, log_contention_stats_decorator, log_ml_contention_stats_decorator
 from .lookup_table import ContentionTextLookupTable
+from .lookup_tables_utilities import ContentionClassification
+from .ml_classifier import Predictor
+from .result_cache import LRUCache
+from .stage_timing import timed_stage
 
 
 @runtime_checkable
@@ -22,9 +37,100 @@ class LookupTable(Protocol):
     def get(self, input_str: str, default_value: Optional[Dict[str, Any]] = None) -> Dict[str, Any]: ...
 
 
+# a lookup table classification and, for the expanded lookup table, the processed text used for the lookup
+TextClassification = Tuple[Dict[str, Any], Optional[str]]
+
+
+def result_caches() -> Dict[str, LRUCache[Any, Any]]:
+    """
+    Returns the result caches in use, by name
+    """
+    return {"contention_text": contention_text_cache, "ml_prediction": ml_prediction_cache}
+
+
+def _resource_generation() -> int:
+    """
+    Returns the generation of the shared resources used by the current request. It is part of the result cache
+    keys, so that results computed with resources that have since been reloaded are never returned.
+    """
+    return resources.snapshot().generation
+
+
+def get_cached_classification(contention_text: str, lookup_table: LookupTable) -> TextClassification:
+    """
+    Looks up the contention text in the lookup table, using the result cache for repeated text
+
+    Returns
+    -------
+    tuple:
+        classification : dict with classification_code and classification_name
+        processed_text : the text as normalized by the expanded lookup table (None for other tables)
+    """
+    key = (_resource_generation(), lookup_table, contention_text)
+    cached = contention_text_cache.get(key)
+    if cached is None:
+        if isinstance(lookup_table, ExpandedLookupTable):
+            cached = lookup_table.lookup(contention_text)
+        else:
+            cached = (lookup_table.get(contention_text), None)
+        contention_text_cache.put(key, cached)
+    return cached
+
+
+def get_cached_classifications(contention_texts: List[str], lookup_table: LookupTable) -> List[TextClassification]:
+    """
+    Batch version of get_cached_classification: the texts without a cached result are looked up together
+    (with lookup_many for the expanded lookup table), once per distinct text
+    """
+    generation = _resource_generation()
+    cached = [contention_text_cache.get((generation, lookup_table, text)) for text in contention_texts]
+    texts_to_look_up = list(dict.fromkeys(text for text, c in zip(contention_texts, cached, strict=True) if c is None))
+    if not texts_to_look_up:
+        return [c for c in cached if c is not None]
+
+    if isinstance(lookup_table, ExpandedLookupTable):
+        new_results: List[TextClassification] = list(lookup_table.lookup_many(texts_to_look_up))
+    else:
+        new_results = [(lookup_table.get(text), None) for text in texts_to_look_up]
+    looked_up = dict(zip(texts_to_look_up, new_results, strict=True))
+    for text, result in looked_up.items():
+        contention_text_cache.put((generation, lookup_table, text), result)
+
+    return [c if c is not None else looked_up[text] for text, c in zip(contention_texts, cached, strict=True)]
+
+
+def lookup_contention_texts(claims: List[VaGovClaim]) -> Dict[str, TextClassification]:
+    """
+    Looks up the contention texts of all of the claims in the expanded lookup table at once, so that claims
+    (and batches of claims) do not make a separate lookup per contention
+    """
+    texts = list(dict.fromkeys(c.contention_text for claim in claims for c in claim.contentions if c.contention_text))
+    with timed_stage("expanded_lookup"):
+        return dict(zip(texts, get_cached_classifications(texts, expanded_lookup_table), strict=True))
+
+
+def get_cached_ml_predictions(classifier: Predictor, texts_to_classify: list[str]) -> list[tuple[str, float]]:
+    """
+    Makes ML classifier predictions for the texts, only sending texts without a cached prediction
+    to the classifier (once per distinct text). Error predictions are not cached.
+    """
+    generation = _resource_generation()
+    cached = [ml_prediction_cache.get((generation, text)) for text in texts_to_classify]
+    texts_to_predict = list(dict.fromkeys(text for text, p in zip(texts_to_classify, cached, strict=True) if p is None))
+    if not texts_to_predict:
+        return [p for p in cached if p is not None]
+
+    new_predictions = dict(zip(texts_to_predict, classifier.make_predictions(texts_to_predict), strict=True))
+    for text, prediction in new_predictions.items():
+        if prediction[0] != "error":
+            ml_prediction_cache.put((generation, text), prediction)
+
+    return [p if p is not None else new_predictions[text] for text, p in zip(texts_to_classify, cached, strict=True)]
+
+
 def get_classification_code_name(
-    contention: Contention, lookup_table: LookupTable
-) -> Tuple[Optional[int], Optional[str], str]:
+    contention: Contention, lookup_table: LookupTable, text_classification: Optional[TextClassification] = None
+) -> ContentionClassification:
     """
     check contention type and match contention to appropriate table's
     classification code (if available)
@@ -36,55 +142,86 @@ def get_classification_code_name(
     lookup_table : dict
         The lookup table to use for classification of contention text. This is determine based on the request url
         in the classify_contention function
+    text_classification : tuple, optional
+        The result of looking up the contention text in the lookup table, if it has already been looked up
+        (eg by lookup_contention_texts)
 
     Returns
     -------
-    tuple:
-        classification_code : int
-        classification_name: str
-        classified_by: str
+    ContentionClassification
+        classification_code, classification_name and classified_by, along with the results of the
+        expanded lookup (processed text, matched key) and whether the text is in the contention text
+        lookup table, for use in logging
     """
-    classified_by = "not classified"
-    classification_code = None
-    classification_name = None
+    result = ContentionClassification(classification_code=None, classification_name=None, classified_by="not classified")
+    # text in the contention text (dropdown) lookup table is known not to contain PII, so it can be logged
+    result.is_mapped_text = (
+        bool(contention.contention_text)
+        and dropdown_lookup_table.get(contention.contention_text).get("classification_code") is not None
+    )
 
     if contention.contention_type == "INCREASE" and contention.diagnostic_code is not None:
-        classification = dc_lookup_table.get(str(contention.diagnostic_code))
+        with timed_stage("dc_lookup"):
+            classification = dc_lookup_table.get(str(contention.diagnostic_code))
         if classification:
-            classification_code = classification["classification_code"]
-            classification_name = classification["classification_name"]
-            if classification_code is not None:
-                classified_by = "diagnostic_code"
-
-    if contention.contention_text and not classification_code:
-        classification = lookup_table.get(contention.contention_text)
-        classification_code = classification["classification_code"]
-        classification_name = classification["classification_name"]
-        if classification_code is not None:
-            classified_by = "contention_text"
-
-    return classification_code, classification_name, classified_by
+            result.classification_code = classification["classification_code"]
+            result.classification_name = classification["classification_name"]
+            if result.classification_code is not None:
+                result.classified_by = "diagnostic_code"
+
+    if contention.contention_text and not result.classification_code:
+        if text_classification is None:
+            with timed_stage("expanded_lookup"):
+                text_classification = get_cached_classification(contention.contention_text, lookup_table)
+        classification, processed_text = text_classification
+        result.classification_code = classification["classification_code"]
+        result.classification_name = classification["classification_name"]
+        if result.classification_code is not None:
+            result.classified_by = "contention_text"
+        if processed_text is not None:
+            result.processed_text = processed_text
+            result.is_expanded_match = result.classification_code is not None
+            if result.is_expanded_match:
+                result.matched_key = classification.get("matched_key", frozenset(processed_text.split()))
+                result.match_confidence = classification.get("match_confidence")
+
+    return result
 
 
 @log_contention_stats_decorator
-def classify_contention(contention: Contention, claim: VaGovClaim, request: Request) -> Tuple[ClassifiedContention, str]:
+def classify_contention(
+    contention: Contention,
+    claim: VaGovClaim,
+    request: Request,
+    text_classification: Optional[TextClassification] = None,
+) -> Tuple[ClassifiedContention, ContentionClassification]:
     lookup_table: Union[ExpandedLookupTable, ContentionTextLookupTable] = expanded_lookup_table
 
-    classification_code, classification_name, classified_by = get_classification_code_name(contention, lookup_table)
+    classification = get_classification_code_name(contention, lookup_table, text_classification)
 
     response = ClassifiedContention(
-        classification_code=classification_code,
-        classification_name=classification_name,
+        classification_code=classification.classification_code,
+        classification_name=classification.classification_name,
         diagnostic_code=contention.diagnostic_code,
         contention_type=contention.contention_type,
     )
-    return response, classified_by
+    return response, classification
 
 
-def classify_claim(claim: VaGovClaim, request: Request) -> ClassifierResponse:
+def classify_claim(
+    claim: VaGovClaim, request: Request, text_classifications: Optional[Dict[str, TextClassification]] = None
+) -> ClassifierResponse:
+    """
+    Classifies each contention of the claim. text_classifications holds the results of looking up the contention
+    texts (see lookup_contention_texts); if it is not given, the texts of the claim are looked up together.
+    """
+    if text_classifications is None:
+        text_classifications = lookup_contention_texts([claim])
+
     classified_contentions: list[ClassifiedContention] = []
     for contention in claim.contentions:
-        classification = classify_contention(contention, claim, request)
+        text_classification = text_classifications.get(contention.contention_text) if contention.contention_text else None
+        classification = classify_contention(contention, claim, request, text_classification)
         classified_contentions.append(classification)
 
     num_classified = len([c for c in classified_contentions if c.classification_code])
@@ -122,29 +259,77 @@ def update_classifications(response: ClassifierResponse, indices: list[int],
         for idx, c in zip(indices, ai_classified.classified_contentions, strict=True):
             response.contentions[idx].classification_code = c.classification_code
             response.contentions[idx].classification_name = c.classification_name
+            response.contentions[idx].rejected_classification = c.rejected_classification
     except ValueError:
         log_as_json({"message": "Mismatched contentions between AiResponse and original classifications"})
     return response
 
 
+def accept_ml_classifications(classification_codes: List[Optional[int]], probabilities: List[float]) -> List[bool]:
+    """
+    Compares the probabilities of a batch of ML classifications with the confidence thresholds of their
+    classification codes (ml_classifier.confidence_thresholds in app_config.yaml), returning whether each
+    one is accepted. Predictions without a classification code (eg "error") are always accepted.
+    """
+    default_threshold, thresholds_by_code = ml_confidence_thresholds
+    if default_threshold <= 0 and not thresholds_by_code:
+        return [True] * len(classification_codes)
+    # predictions without a code get a threshold of 0, so they are always accepted
+    thresholds = np.array(
+        [thresholds_by_code.get(code, default_threshold) if code is not None else 0.0 for code in classification_codes]
+    )
+    accepted: List[bool] = (np.asarray(probabilities, dtype=float) >= thresholds).tolist()
+    return accepted
+
+
 def ml_classify_claim(contentions: AiRequest) -> AiResponse:
     contentions_to_classify = contentions.contentions
     texts_to_classify = [c.contention_text for c in contentions_to_classify]
 
-    if ml_classifier:
-        classifications = ml_classifier.make_predictions(texts_to_classify)
-    else:
+    top_classifications: Optional[List[List[MLClassification]]] = None
+    if not ml_classifier:
         classifications = [("no-model", 0.0)] * len(texts_to_classify)
+    elif contentions.top_k:
+        # top-k predictions are not cached, since only the most probable classification is
+        with timed_stage("ml_classifier"):
+            top_k_predictions = ml_classifier.make_top_k_predictions(texts_to_classify, contentions.top_k)
+        classifications = [predictions[0] for predictions in top_k_predictions]
+        top_classifications = [
+            [
+                MLClassification(
+                    classification_code=get_classification_code(name),
+                    classification_name=name,
+                    probability=probability,
+                )
+                for name, probability in predictions
+            ]
+            for predictions in top_k_predictions
+        ]
+    else:
+        with timed_stage("ml_classifier"):
+            classifications = get_cached_ml_predictions(ml_classifier, texts_to_classify)
+
+    classification_codes = [get_classification_code(name) for name, _ in classifications]
+    accepted = accept_ml_classifications(classification_codes, [probability for _, probability in classifications])
 
     classified_contentions: list[ClassifiedContention] = []
 
     for i in range(len(contentions_to_classify)):
         classified_contention = ClassifiedContention(
-            classification_code=get_classification_code(classifications[i][0]),
+            classification_code=classification_codes[i],
             classification_name=classifications[i][0],
             diagnostic_code=contentions_to_classify[i].diagnostic_code,
             contention_type=contentions_to_classify[i].contention_type,
+            top_classifications=top_classifications[i] if top_classifications is not None else None,
         )
+        if not accepted[i]:
+            classified_contention.rejected_classification = MLClassification(
+                classification_code=classification_codes[i],
+                classification_name=classifications[i][0],
+                probability=classifications[i][1],
+            )
+            classified_contention.classification_code = None
+            classified_contention.classification_name = None
 
         classified_contentions.append(classified_contention)
     return AiResponse(
@@ -158,3 +343,41 @@ def supplement_with_ml_classification(response: ClassifierResponse, claim: VaGov
     response = update_classifications(response, non_classified_indices, ai_response, request)
 
     return response
+
+
+def supplement_batch_with_ml_classification(
+    responses: list[ClassifierResponse], claims: list[VaGovClaim], request: Request
+) -> list[ClassifierResponse]:
+    """
+    Supplements a batch of expanded classifications with the ML classifier. The unclassified
+    contentions of every claim in the batch are sent to the ML classifier in a single call,
+    and the results are split back out to the claims they came from.
+    """
+    claim_indices: list[tuple[int, list[int]]] = []
+    contentions_to_classify: list[Contention] = []
+    for claim_idx, (response, claim) in enumerate(zip(responses, claims, strict=True)):
+        if response.is_fully_classified:
+            continue
+        non_classified_indices, ai_request = build_ai_request(response, claim)
+        claim_indices.append((claim_idx, non_classified_indices))
+        contentions_to_classify.extend(ai_request.contentions)
+
+    if not contentions_to_classify:
+        return responses
+
+    ai_response = ml_classify_claim(AiRequest(contentions=contentions_to_classify))
+
+    offset = 0
+    for claim_idx, non_classified_indices in claim_indices:
+        claim_ai_response = AiResponse(
+            classified_contentions=ai_response.classified_contentions[offset : offset + len(non_classified_indices)]
+        )
+        offset += len(non_classified_indices)
+
+        response = update_classifications(responses[claim_idx], non_classified_indices, claim_ai_response, request)
+        num_classified = len([c for c in response.contentions if c.classification_code])
+        response.num_classified_contentions = num_classified
+        response.is_fully_classified = num_classified == len(response.contentions)
+        responses[claim_idx] = response
+
+    return responses
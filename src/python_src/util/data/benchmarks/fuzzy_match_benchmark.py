@@ -0,0 +1,111 @@
+"""
+This script measures the cost of expanded lookups and the number of contentions left for the ML classifier,
+with and without spelling correction (fuzzy_match.py), for the texts of simulations/inputs.csv and for
+misspelled copies of them (one edit to one word of each text, made with a fixed random seed).
+
+Usage: (from the codebase root directory)
+    poetry run python src/python_src/util/data/benchmarks/fuzzy_match_benchmark.py
+
+"""
+
+import argparse
+import csv
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from python_src.util.app_utilities import app_config, dropdown_expanded_table_inits
+from python_src.util.expanded_lookup_table import ExpandedLookupTable
+
+INPUT_FILE = "src/python_src/util/data/simulations/inputs.csv"
+
+
+def _read_inputs() -> List[Tuple[str, Optional[int]]]:
+    """
+    Returns the texts of the inputs file with their expected classification code (None for texts that are
+    not expected to be classified)
+    """
+    with open(INPUT_FILE) as f:
+        rows = [row for row in csv.reader(f) if row and not row[0].startswith("#")]
+    return [(text, int(code) if code.isdigit() and code != "1010" else None) for text, code in rows]
+
+
+def _misspell(text: str, rng: random.Random) -> str:
+    words = text.split()
+    long_words = [i for i, word in enumerate(words) if len(word) >= 5]
+    if not long_words:
+        return text
+    i = rng.choice(long_words)
+    word = words[i]
+    position = rng.randrange(1, len(word) - 1)
+    edit = rng.choice(["delete", "double", "swap", "substitute"])
+    if edit == "delete":
+        word = word[:position] + word[position + 1 :]
+    elif edit == "double":
+        word = word[:position] + word[position] + word[position:]
+    elif edit == "swap":
+        word = word[: position - 1] + word[position] + word[position - 1] + word[position + 1 :]
+    else:
+        word = word[:position] + rng.choice("aeiou") + word[position + 1 :]
+    words[i] = word
+    return " ".join(words)
+
+
+def _run(lookup_table: ExpandedLookupTable, inputs: List[Tuple[str, Optional[int]]], repeats: int) -> Dict[str, Any]:
+    latencies = []
+    for _ in range(repeats):
+        for text, _ in inputs:
+            start = time.perf_counter()
+            lookup_table.get(text)
+            latencies.append(time.perf_counter() - start)
+    results = [lookup_table.get(text)["classification_code"] for text, _ in inputs]
+    latencies_us = np.array(latencies) * 1e6
+    return {
+        "mean_us": float(latencies_us.mean()),
+        "p99_us": float(np.percentile(latencies_us, 99)),
+        "ml_fallbacks": sum(1 for code in results if code is None),
+        "correct": sum(1 for code, (_, expected) in zip(results, inputs, strict=True) if code == expected),
+        "wrong": sum(1 for code, (_, expected) in zip(results, inputs, strict=True) if code is not None and code != expected),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--max-distance", type=int, default=app_config["expanded_lookup"]["fuzzy_match"]["max_distance"])
+    args = parser.parse_args()
+
+    inputs = _read_inputs()
+    rng = random.Random(0)  # nosec B311
+    misspelled_inputs = [(_misspell(text, rng), expected) for text, expected in inputs]
+
+    exact_table = ExpandedLookupTable(
+        dropdown_expanded_table_inits, app_config["common_words"], app_config["musculoskeletal_lut"]
+    )
+    start = time.perf_counter()
+    fuzzy_table = ExpandedLookupTable.from_mappings(
+        dropdown_expanded_table_inits,
+        app_config["common_words"],
+        app_config["musculoskeletal_lut"],
+        exact_table.contention_text_lookup_table,
+        fuzzy_match={**app_config["expanded_lookup"]["fuzzy_match"], "enabled": True, "max_distance": args.max_distance},
+    )
+    build_seconds = time.perf_counter() - start
+
+    results = {
+        "num_inputs": len(inputs),
+        "fuzzy_index_build_seconds": build_seconds,
+        "original": {"exact": _run(exact_table, inputs, args.repeats), "fuzzy": _run(fuzzy_table, inputs, args.repeats)},
+        "misspelled": {
+            "exact": _run(exact_table, misspelled_inputs, args.repeats),
+            "fuzzy": _run(fuzzy_table, misspelled_inputs, args.repeats),
+        },
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+This script compares looking up contention texts in the expanded lookup table one at a time (ExpandedLookupTable.get)
+with looking them up together (ExpandedLookupTable.get_many), for batches of texts drawn from simulations/inputs.csv
+(which repeat, as contention texts do in production) and for batches of distinct texts.
+
+Usage: (from the codebase root directory)
+    poetry run python src/python_src/util/data/benchmarks/get_many_benchmark.py
+
+"""
+
+import argparse
+import csv
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from python_src.util.app_utilities import app_config, dropdown_expanded_table_inits
+from python_src.util.expanded_lookup_table import ExpandedLookupTable
+
+INPUT_FILE = "src/python_src/util/data/simulations/inputs.csv"
+
+
+def _read_texts() -> List[str]:
+    with open(INPUT_FILE) as f:
+        return [row[0] for row in csv.reader(f) if row and not row[0].startswith("#")]
+
+
+def _best_of(function: Callable[[], Any], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _compare(lookup_table: ExpandedLookupTable, texts: List[str], repeats: int) -> Dict[str, Any]:
+    assert [lookup_table.get(text) for text in texts] == lookup_table.get_many(texts)  # nosec B101
+    loop_seconds = _best_of(lambda: [lookup_table.get(text) for text in texts], repeats)
+    get_many_seconds = _best_of(lambda: lookup_table.get_many(texts), repeats)
+    return {
+        "num_texts": len(texts),
+        "num_distinct_texts": len(set(texts)),
+        "loop_ms": loop_seconds * 1000,
+        "get_many_ms": get_many_seconds * 1000,
+        "speedup": loop_seconds / get_many_seconds,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    lookup_table = ExpandedLookupTable(
+        dropdown_expanded_table_inits, app_config["common_words"], app_config["musculoskeletal_lut"]
+    )
+    texts = _read_texts()
+    rng = random.Random(0)  # nosec B311
+
+    results = {}
+    for size in args.sizes:
+        repeated_texts = rng.choices(texts, k=size)
+        distinct_texts = [f"{rng.choice(texts)} {i}" for i in range(size)]
+        results[size] = {
+            "repeated_texts": _compare(lookup_table, repeated_texts, args.repeats),
+            "distinct_texts": _compare(lookup_table, distinct_texts, args.repeats),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
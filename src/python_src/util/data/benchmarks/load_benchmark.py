@@ -0,0 +1,247 @@
+"""
+This script sends concurrent classification requests to the API and reports the throughput, latency
+percentiles and memory use of each classification endpoint.
+
+The claims are a mix of taxonomy terms (from the condition dropdown CSV), free text (from simulations/inputs.csv)
+and claims for increase (with diagnostic codes from the DC lookup table), with a varying number of contentions per
+claim, generated with a fixed random seed so that runs are comparable.
+
+By default the requests are sent to the app in-process; pass --url to load test a running server
+(eg one started with uvicorn), which is needed to compare how the server's worker threads handle
+concurrent requests. Pass --server-pid to report the memory use of the server process.
+
+The results can be saved with --output and compared with an earlier run with --compare, eg to check a change
+for regressions:
+    poetry run python src/python_src/util/data/benchmarks/load_benchmark.py --output before.json
+    (make the change)
+    poetry run python src/python_src/util/data/benchmarks/load_benchmark.py --compare before.json
+
+Usage: (from the codebase root directory)
+    poetry run python src/python_src/util/data/benchmarks/load_benchmark.py
+    poetry run python src/python_src/util/data/benchmarks/load_benchmark.py --url http://localhost:8120
+
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import random
+import resource
+import subprocess  # nosec B404
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from python_src.util.app_utilities import diagnostic_code_inits, dropdown_expanded_table_inits
+
+INPUT_FILE = "src/python_src/util/data/simulations/inputs.csv"
+ENDPOINTS = [
+    "/expanded-contention-classification",
+    "/hybrid-contention-classification",
+    "/ml-contention-classification",
+]
+
+
+def _read_texts() -> Dict[str, List[Any]]:
+    """
+    Returns the taxonomy terms, the free texts of the inputs file, and the diagnostic codes of the DC lookup
+    table with their rated issue names
+    """
+    with open(dropdown_expanded_table_inits.csv_filepath) as f:
+        terms = sorted(
+            {
+                row[key].strip()
+                for row in csv.DictReader(f)
+                for key in dropdown_expanded_table_inits.input_key
+                if row[key].strip()
+            }
+        )
+    with open(INPUT_FILE) as f:
+        free_texts = [row[0] for row in csv.reader(f) if row and not row[0].startswith("#")]
+    with open(diagnostic_code_inits.csv_filepath) as f:
+        diagnostic_codes = [
+            (int(row["DIAGNOSTIC_CODE"]), row["RATED_ISSUE_NAME"])
+            for row in csv.DictReader(f)
+            if row["DIAGNOSTIC_CODE"].isdigit()
+        ]
+    return {"terms": terms, "free_texts": free_texts, "diagnostic_codes": diagnostic_codes}
+
+
+def _build_claims(
+    num_claims: int, contentions_per_claim: int, free_text_share: float, increase_share: float, seed: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Builds claims with between 1 and 2 * contentions_per_claim - 1 contentions (contentions_per_claim on average).
+    Each contention is a claim for increase with probability increase_share, and otherwise a new condition
+    described with free text with probability free_text_share, or with a taxonomy term.
+    """
+    texts = _read_texts()
+    rng = random.Random(seed)  # nosec B311
+
+    claims = []
+    for i in range(num_claims):
+        contentions = []
+        for _ in range(rng.randint(1, 2 * contentions_per_claim - 1)):
+            if rng.random() < increase_share:
+                diagnostic_code, rated_issue = rng.choice(texts["diagnostic_codes"])
+                contentions.append(
+                    {"contention_text": rated_issue, "contention_type": "INCREASE", "diagnostic_code": diagnostic_code}
+                )
+            else:
+                source = texts["free_texts"] if rng.random() < free_text_share else texts["terms"]
+                contentions.append({"contention_text": rng.choice(source), "contention_type": "NEW"})
+        claims.append({"claim_id": i, "form526_submission_id": i, "contentions": contentions})
+    return claims
+
+
+def _request_body(endpoint: str, claim: Dict[str, Any]) -> Dict[str, Any]:
+    # the ML endpoint takes the contentions on their own
+    if endpoint == "/ml-contention-classification":
+        return {"contentions": claim["contentions"]}
+    return claim
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    """Returns the resident set size of the process in MB, or None if it cannot be read (eg not on Linux)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)  # nosec
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _run(
+    client: httpx.AsyncClient, endpoint: str, claims: List[Dict[str, Any]], concurrency: int, server_pid: Optional[int]
+) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+    latencies: List[float] = []
+
+    async def send(claim: Dict[str, Any]) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.post(endpoint, json=_request_body(endpoint, claim))
+            except httpx.TransportError:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(claim) for claim in claims))
+    elapsed = time.perf_counter() - start
+    if not latencies:
+        raise SystemExit(f"Could not connect to the server to send requests to {endpoint}")
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "requests": len(claims),
+        "contentions": sum(len(claim["contentions"]) for claim in claims),
+        "errors": errors,
+        "seconds": elapsed,
+        "requests_per_second": len(claims) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "max_ms": float(latencies_ms.max()),
+        "rss_mb": _rss_mb(server_pid) if server_pid else _rss_mb(os.getpid()),
+    }
+
+
+async def _run_all(args: argparse.Namespace, claims: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        from python_src.api import app, warm_up_resources
+
+        # the transport does not run the app's lifespan, so load the shared resources before timing requests
+        warm_up_resources()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=60)
+
+    results = {}
+    async with client:
+        for endpoint in args.endpoints:
+            await _run(client, endpoint, claims[: args.warm_up_requests], args.concurrency, args.server_pid)
+            results[endpoint] = await _run(client, endpoint, claims, args.concurrency, args.server_pid)
+    return results
+
+
+def _compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Returns the percentage change of the throughput and latency percentiles of each endpoint from the baseline"""
+    changes = {}
+    for endpoint, result in results.items():
+        if endpoint not in baseline:
+            continue
+        changes[endpoint] = {
+            f"{metric}_change_percent": 100 * (result[metric] - baseline[endpoint][metric]) / baseline[endpoint][metric]
+            for metric in ["requests_per_second", "p50_ms", "p95_ms", "p99_ms"]
+            if baseline[endpoint].get(metric)
+        }
+    return changes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base url of a running server; the app is called in-process if not given")
+    parser.add_argument("--server-pid", type=int, help="process id of the running server, to report its memory use")
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS)
+    parser.add_argument("--num-requests", type=int, default=2000)
+    parser.add_argument("--warm-up-requests", type=int, default=100)
+    parser.add_argument("--contentions-per-claim", type=int, default=3)
+    parser.add_argument("--free-text-share", type=float, default=0.25)
+    parser.add_argument("--increase-share", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="file to save the results to, as JSON")
+    parser.add_argument("--compare", help="results file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    claims = _build_claims(args.num_requests, args.contentions_per_claim, args.free_text_share, args.increase_share, args.seed)
+    results: Dict[str, Any] = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "options": vars(args),
+        "endpoints": asyncio.run(_run_all(args, claims)),
+    }
+    if not args.url:
+        results["peak_rss_mb"] = _peak_rss_mb()
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        results["baseline_commit"] = baseline.get("commit")
+        results["changes"] = _compare(results["endpoints"], baseline["endpoints"])
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+This script measures the latency of writing a contention log line when stdout is piped to a slow
+consumer, with and without the queue-backed log sink.
+
+A child process reads the pipe in small chunks with a delay between reads, so the pipe buffer fills
+up and synchronous writes start to block, as they would with a slow log shipper.
+
+Usage: (from the codebase root directory)
+    poetry run python src/python_src/util/data/benchmarks/log_sink_benchmark.py
+
+"""
+
+import argparse
+import io
+import json
+import logging
+import subprocess  # nosec B404
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from python_src.util.log_queue import queue_logging_stats, start_queue_logging, stop_queue_logging
+
+SLOW_CONSUMER = "import sys, time\nwhile sys.stdin.buffer.read(4096):\n    time.sleep(0.002)\n"
+
+SAMPLE_LOG = {
+    "vagov_claim_id": 100,
+    "claim_type": "new",
+    "classification_code": 8997,
+    "classification_name": "Musculoskeletal - Knee",
+    "contention_text": "unmapped contention text ['knee']",
+    "diagnostic_code": "None",
+    "is_in_dropdown": False,
+    "is_lookup_table_match": True,
+    "is_multi_contention": False,
+    "endpoint": "/expanded-contention-classification",
+    "processed_contention_text": "knee",
+    "classification_method": "contention_text",
+}
+
+
+def _time_log_calls(num_lines: int) -> List[float]:
+    latencies = []
+    for i in range(num_lines):
+        start = time.perf_counter()
+        logging.info(json.dumps({**SAMPLE_LOG, "vagov_claim_id": i}))
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _run(use_queue: bool, num_lines: int, max_queue_size: int) -> Dict[str, float]:
+    consumer = subprocess.Popen([sys.executable, "-c", SLOW_CONSUMER], stdin=subprocess.PIPE)  # nosec B603
+    assert consumer.stdin is not None
+    stream = io.TextIOWrapper(consumer.stdin, write_through=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(logging.INFO)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    root.addHandler(handler)
+
+    if use_queue:
+        start_queue_logging(max_queue_size)
+    latencies = np.array(_time_log_calls(num_lines)) * 1000
+    dropped = queue_logging_stats()["dropped"]
+    if use_queue:
+        stop_queue_logging()
+
+    root.removeHandler(handler)
+    stream.close()
+    consumer.wait()
+
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(latencies.max()),
+        "dropped": dropped,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-lines", type=int, default=20000)
+    parser.add_argument("--max-queue-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    results = {
+        "synchronous": _run(False, args.num_lines, args.max_queue_size),
+        "queue": _run(True, args.num_lines, args.max_queue_size),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
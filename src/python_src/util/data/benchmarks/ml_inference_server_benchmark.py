@@ -0,0 +1,89 @@
+"""
+This script measures the overhead of making ML classifier predictions through the ML inference server,
+compared with calling the classifier in-process.
+
+The inference server is started in a child process on a temporary socket, using the same model and
+vectorizer files as the in-process classifier.
+
+Usage: (from the codebase root directory)
+    poetry run python src/python_src/util/data/benchmarks/ml_inference_server_benchmark.py
+
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import secrets
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from python_src.util.app_utilities import app_config
+from python_src.util.ml_classifier import MLClassifier
+from python_src.util.ml_inference_server import MLInferenceServer, RemoteMLClassifier
+from python_src.util.ml_utilities import get_model_file_paths
+
+INPUT_FILE = "src/python_src/util/data/simulations/inputs.csv"
+
+
+def _serve(model_file: str, vectorizer_file: str, socket_path: str, authkey: bytes) -> None:
+    MLInferenceServer(MLClassifier(model_file, vectorizer_file), socket_path, authkey).serve_forever()
+
+
+def _time_predictions(predict: Callable[[List[str]], object], batches: List[List[str]]) -> Dict[str, float]:
+    latencies = []
+    for batch in batches:
+        start = time.perf_counter()
+        predict(batch)
+        latencies.append(time.perf_counter() - start)
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def main() -> None:
+    model_file, vectorizer_file = get_model_file_paths(app_config)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-file", default=model_file)
+    parser.add_argument("--vectorizer-file", default=vectorizer_file)
+    parser.add_argument("--num-calls", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 32])
+    args = parser.parse_args()
+
+    with open(INPUT_FILE) as f:
+        texts = [row[0] for row in csv.reader(f)]
+
+    local = MLClassifier(args.model_file, args.vectorizer_file)
+    authkey = secrets.token_bytes(32)
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "ml.sock")
+        server = multiprocessing.Process(
+            target=_serve, args=(args.model_file, args.vectorizer_file, socket_path, authkey), daemon=True
+        )
+        server.start()
+        while not os.path.exists(socket_path):
+            time.sleep(0.05)
+        remote = RemoteMLClassifier(socket_path, authkey)
+
+        results = {}
+        for batch_size in args.batch_sizes:
+            batches = [[texts[(i + j) % len(texts)] for j in range(batch_size)] for i in range(args.num_calls)]
+            remote.make_predictions(batches[0])
+            results[f"batch_size_{batch_size}"] = {
+                "in_process": _time_predictions(local.make_predictions, batches),
+                "inference_server": _time_predictions(remote.make_predictions, batches),
+            }
+        server.terminate()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
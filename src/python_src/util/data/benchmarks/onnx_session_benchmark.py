@@ -0,0 +1,71 @@
+"""
+This script measures the latency of ML classifier predictions made with session.run and with IOBinding
+(ml_classifier.inference.io_binding in app_config.yaml), for several batch sizes.
+
+Usage: (from the codebase root directory)
+    poetry run python src/python_src/util/data/benchmarks/onnx_session_benchmark.py
+
+"""
+
+import argparse
+import csv
+import json
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from python_src.util.app_utilities import app_config
+from python_src.util.ml_classifier import MLClassifier
+from python_src.util.ml_utilities import get_model_file_paths
+
+INPUT_FILE = "src/python_src/util/data/simulations/inputs.csv"
+
+
+def _time_predictions(predict: Callable[[List[str]], object], batches: List[List[str]]) -> Dict[str, float]:
+    latencies = []
+    for batch in batches:
+        start = time.perf_counter()
+        predict(batch)
+        latencies.append(time.perf_counter() - start)
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def main() -> None:
+    model_file, vectorizer_file = get_model_file_paths(app_config)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-file", default=model_file)
+    parser.add_argument("--vectorizer-file", default=vectorizer_file)
+    parser.add_argument("--num-calls", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 32])
+    args = parser.parse_args()
+
+    with open(INPUT_FILE) as f:
+        texts = [row[0] for row in csv.reader(f)]
+
+    classifiers = {
+        "session_run": MLClassifier(args.model_file, args.vectorizer_file),
+        "io_binding": MLClassifier(
+            args.model_file, args.vectorizer_file, io_binding=True, preallocated_batch_sizes=args.batch_sizes
+        ),
+    }
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for batch_size in args.batch_sizes:
+        batches = [[texts[(i + j) % len(texts)] for j in range(batch_size)] for i in range(args.num_calls)]
+        results[f"batch_size_{batch_size}"] = {}
+        for name, classifier in classifiers.items():
+            # the first call allocates the output buffers of the batch size
+            classifier.make_predictions(batches[0])
+            results[f"batch_size_{batch_size}"][name] = _time_predictions(classifier.make_predictions, batches)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+This script compares ONNX Runtime session options (ml_classifier.inference.session_options in app_config.yaml)
+for the ML classifier. For each combination of thread counts, graph optimization level and execution mode, it
+measures how long the session takes to load, and the throughput and latency of predictions made by several threads
+at once, as the classification executor does. Run it on a machine with the CPU count of the pods, with --concurrency
+set to the number of classification executor threads that make predictions at the same time.
+
+Usage: (from the codebase root directory)
+    poetry run python src/python_src/util/data/benchmarks/onnx_session_options_benchmark.py
+
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+
+from python_src.util.app_utilities import app_config
+from python_src.util.ml_classifier import MLClassifier
+from python_src.util.ml_utilities import get_model_file_paths
+
+INPUT_FILE = "src/python_src/util/data/simulations/inputs.csv"
+
+
+def _time_load(model_file: str, vectorizer_file: str, session_options: Dict[str, Any]) -> float:
+    start = time.perf_counter()
+    MLClassifier(model_file, vectorizer_file, session_options=session_options)
+    return time.perf_counter() - start
+
+
+def _time_predictions(classifier: MLClassifier, batches: List[List[str]], concurrency: int) -> Dict[str, float]:
+    def predict(batch: List[str]) -> float:
+        start = time.perf_counter()
+        classifier.make_predictions(batch)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(predict, batches))
+    elapsed = time.perf_counter() - start
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "predictions_per_second": len(batches) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def main() -> None:
+    model_file, vectorizer_file = get_model_file_paths(app_config)
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-file", default=model_file)
+    parser.add_argument("--vectorizer-file", default=vectorizer_file)
+    parser.add_argument("--num-calls", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--intra-op-threads", type=int, nargs="+", default=sorted({0, 1, 2, cpu_count}))
+    parser.add_argument("--inter-op-threads", type=int, nargs="+", default=[0, 1])
+    parser.add_argument("--optimization-levels", nargs="+", default=["basic", "all"])
+    parser.add_argument("--execution-modes", nargs="+", default=["sequential", "parallel"])
+    args = parser.parse_args()
+
+    with open(INPUT_FILE) as f:
+        texts = [row[0] for row in csv.reader(f)]
+    batches = [[texts[(i + j) % len(texts)] for j in range(args.batch_size)] for i in range(args.num_calls)]
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        # the optimized models are saved next to a copy of the model file, so the model directory is left as it is
+        model_copy = shutil.copy(args.model_file, directory)
+        for intra_op, inter_op, level, mode in itertools.product(
+            args.intra_op_threads, args.inter_op_threads, args.optimization_levels, args.execution_modes
+        ):
+            if mode == "sequential" and inter_op != args.inter_op_threads[0]:
+                # inter-op threads are only used in parallel execution mode
+                continue
+            session_options = {
+                "intra_op_num_threads": intra_op,
+                "inter_op_num_threads": inter_op,
+                "graph_optimization_level": level,
+                "execution_mode": mode,
+            }
+            classifier = MLClassifier(model_copy, args.vectorizer_file, session_options=session_options)
+            classifier.make_predictions(batches[0])
+            result: Dict[str, Any] = {"session_options": session_options}
+            result.update(_time_predictions(classifier, batches, args.concurrency))
+            result["load_seconds"] = _time_load(model_copy, args.vectorizer_file, session_options)
+
+            # the first load with save_optimized_model saves the optimized model, and later loads read it
+            saved_options = dict(session_options, save_optimized_model=True)
+            _time_load(model_copy, args.vectorizer_file, saved_options)
+            result["load_seconds_from_saved_optimized_model"] = _time_load(model_copy, args.vectorizer_file, saved_options)
+            results.append(result)
+
+    results.sort(key=lambda result: result["predictions_per_second"], reverse=True)
+    print(json.dumps({"cpu_count": cpu_count, "best": results[0]["session_options"], "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
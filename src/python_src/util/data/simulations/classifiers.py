@@ -21,15 +21,8 @@ class ProductionClassifier(BaseClassifierForSimulation):
     name = "csv_lookup"
 
     def make_predictions(self, conditions: List[str]) -> bool:
-        predicted_classifications: List[str] = []
-        for condition in conditions:
-            try:
-                prediction = str(expanded_lookup_table.get(condition).get("classification_code"))
-            except Exception as e:
-                print("error: ", e)
-
-            predicted_classifications.append(prediction)
-        self.predictions = predicted_classifications
+        classifications = expanded_lookup_table.get_many(conditions)
+        self.predictions = [str(classification.get("classification_code")) for classification in classifications]
         return len(self.predictions) == len(conditions)
 
 
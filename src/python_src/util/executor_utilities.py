@@ -0,0 +1,37 @@
+"""
+Executor for the classification work done by the async endpoints.
+
+The endpoints are async so that they do not take a thread from Starlette's shared threadpool while waiting;
+the CPU-bound work (lookup table normalization and ML classifier inference) runs on a dedicated thread pool
+whose size is set in app_config.yaml. ONNX Runtime releases the GIL during inference, so ML classification
+work on this pool runs in parallel.
+
+Methods
+-------
+run_in_classification_executor
+    Run a function on the classification executor and await its result
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from .app_utilities import app_config
+
+T = TypeVar("T")
+
+classification_executor = ThreadPoolExecutor(
+    max_workers=app_config["executor"]["classification_threads"], thread_name_prefix="classification"
+)
+
+
+async def run_in_classification_executor(func: Callable[..., T], *args: Any) -> T:
+    """
+    Runs func(*args) on the classification executor, in a copy of the current context so that
+    context variables set for the request are visible to the function.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(classification_executor, functools.partial(context.run, func, *args))
@@ -1,9 +1,12 @@
 import logging
 import re
 from string import punctuation
-from typing import Any, Dict, FrozenSet, List, Optional, Union
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
 
+from .fuzzy_match import SpellingCorrector
 from .lookup_tables_utilities import InitValues, read_csv_to_list
+from .partial_match import PartialMatcher
+from .text_normalizer import TextNormalizer
 
 
 class ExpandedLookupTable:
@@ -20,6 +23,12 @@ class ExpandedLookupTable:
     musculoskeletal_lut: dict[str, dict[str, str | int]]
         Lookup table for musculoskeletal classifications that are for single body parts:
             ex: {"keee": {"classification_code": 8997, "classification_name": "Musculoskeletal - Knee"}}
+    partial_match: dict[str, Any] | None
+        Partial match settings (enabled, min_confidence, max_input_tokens) from app_config.yaml; when enabled,
+        text that does not exactly match a key is classified by the largest key contained in it
+    fuzzy_match: dict[str, Any] | None
+        Spelling correction settings (enabled, max_distance, min_word_length, max_lookup_ms) from app_config.yaml;
+        when enabled, misspelled words of text that does not exactly match a key are corrected before trying again
     """
 
     def __init__(
@@ -27,6 +36,8 @@ class ExpandedLookupTable:
         init_values: InitValues,
         common_words: List[str],
         musculoskeletal_lut: Dict[str, Dict[str, Union[str, int]]],
+        partial_match: Optional[Dict[str, Any]] = None,
+        fuzzy_match: Optional[Dict[str, Any]] = None,
     ) -> None:
         """
         Builds the lookup table for expanded classification using a CSV file path, plus
@@ -35,7 +46,51 @@ class ExpandedLookupTable:
         self.init_values = init_values
         self.common_words = common_words
         self.musculoskeletal_lookup = musculoskeletal_lut
+        self.normalizer = TextNormalizer(common_words)
         self.contention_text_lookup_table = self._build_lut()
+        self.partial_matcher = self._build_partial_matcher(partial_match)
+        self.spelling_corrector = self._build_spelling_corrector(fuzzy_match)
+
+    @classmethod
+    def from_mappings(
+        cls,
+        init_values: InitValues,
+        common_words: List[str],
+        musculoskeletal_lut: Dict[str, Dict[str, Union[str, int]]],
+        contention_text_lookup_table: Dict[FrozenSet[str], Dict[str, Union[str, int]]],
+        partial_match: Optional[Dict[str, Any]] = None,
+        fuzzy_match: Optional[Dict[str, Any]] = None,
+    ) -> "ExpandedLookupTable":
+        """
+        Creates the lookup table from mappings that were already built (eg by the compiled taxonomy artifact),
+        skipping the CSV parsing and normalization of the taxonomy terms.
+        """
+        table = cls.__new__(cls)
+        table.init_values = init_values
+        table.common_words = common_words
+        table.musculoskeletal_lookup = musculoskeletal_lut
+        table.normalizer = TextNormalizer(common_words)
+        table.contention_text_lookup_table = contention_text_lookup_table
+        table.partial_matcher = table._build_partial_matcher(partial_match)
+        table.spelling_corrector = table._build_spelling_corrector(fuzzy_match)
+        return table
+
+    def _build_partial_matcher(self, partial_match: Optional[Dict[str, Any]]) -> Optional[PartialMatcher]:
+        if not partial_match or not partial_match["enabled"]:
+            return None
+        return PartialMatcher(
+            self.contention_text_lookup_table, partial_match["min_confidence"], partial_match["max_input_tokens"]
+        )
+
+    def _build_spelling_corrector(self, fuzzy_match: Optional[Dict[str, Any]]) -> Optional[SpellingCorrector]:
+        if not fuzzy_match or not fuzzy_match["enabled"]:
+            return None
+        return SpellingCorrector(
+            self.contention_text_lookup_table,
+            fuzzy_match["max_distance"],
+            fuzzy_match["min_word_length"],
+            fuzzy_match["max_lookup_ms"],
+        )
 
     def _musculoskeletal_lookup(self) -> Dict[FrozenSet[str], Dict[str, Union[str, int]]]:
         """
@@ -71,8 +126,7 @@ class ExpandedLookupTable:
         """
         Removes common words from the lookup table contention text values
         """
-        regex = re.compile(rf"\b({'|'.join(self.common_words)})\b", re.IGNORECASE)
-        removed_words = re.sub(regex, " ", text)
+        removed_words = self.normalizer.common_words_regex.sub(" ", text)
         removed_words = self._remove_spaces(removed_words)
         return removed_words
 
@@ -87,13 +141,11 @@ class ExpandedLookupTable:
 
     def _removal_pipeline(self, text: str) -> str:
         """
-        Pipeline to remove all unwanted characters from the lookup table contention text values
+        Pipeline to remove all unwanted characters from the lookup table contention text values.
+        Equivalent to applying _remove_punctuation, _remove_numbers_single_characters and _remove_common_words
+        in turn and lowercasing, but done in a single pass by the precompiled normalizer.
         """
-        text = self._remove_punctuation(text)
-        text = self._remove_numbers_single_characters(text)
-        text = self._remove_common_words(text)
-
-        return text.lower().strip()
+        return self.normalizer.normalize(text)
 
     def _is_in_table(
         self, term: str, row: Dict[str, str], classification_code_mappings: Dict[FrozenSet[str], Dict[str, Union[str, int]]]
@@ -152,7 +204,7 @@ class ExpandedLookupTable:
         """
         processed_key = self._removal_pipeline(key)
         if processed_key != "":
-            term_set: FrozenSet[str] = frozenset(self._removal_pipeline(key).split())
+            term_set: FrozenSet[str] = frozenset(processed_key.split())
             classification_code_mappings[term_set] = {
                 "classification_code": int(row[self.init_values.classification_code]),
                 "classification_name": row[self.init_values.classification_name],
@@ -206,18 +258,72 @@ class ExpandedLookupTable:
 
         This also process the parenthetical terms in the mappings
         """
-        default_value = self.init_values.lut_default_value
+        classification, _ = self.lookup(input_str)
+        return classification
+
+    def lookup(self, input_str: str) -> Tuple[Dict[str, Any], str]:
+        """
+        Performs the lookup as in get, also returning the processed text that was used for the lookup.
+
+        A spelling-corrected match (see SpellingCorrector) or partial match (see PartialMatcher) also includes
+        the matched_key and its match_confidence in the classification.
+        """
+        processed_text = self.prep_incoming_text(input_str)
         if input_str == "loss of teeth due to bone loss":
             return {
                 "classification_code": 8967,
                 "classification_name": "Dental and Oral",
-            }
+            }, processed_text
 
-        input_str = self.prep_incoming_text(input_str)
+        input_str_lookup = frozenset(processed_text.split())
+        classification = self.contention_text_lookup_table.get(input_str_lookup)
+        if classification is None:
+            classification = self._approximate_lookup(input_str_lookup)
+        if classification is None:
+            classification = self.init_values.lut_default_value
+        return classification, processed_text
 
-        input_str_lookup = frozenset(input_str.split())
-        classification = self.contention_text_lookup_table.get(input_str_lookup, default_value)
-        return classification
+    def get_many(self, input_strs: List[str]) -> List[Dict[str, Any]]:
+        """
+        Performs get for each input string, returning the classifications in input order
+        """
+        return [classification for classification, _ in self.lookup_many(input_strs)]
+
+    def lookup_many(self, input_strs: List[str]) -> List[Tuple[Dict[str, Any], str]]:
+        """
+        Performs lookup for each input string, returning the results in input order. Each distinct string
+        is only normalized and looked up once.
+        """
+        lookup = self.lookup
+        results = {input_str: lookup(input_str) for input_str in dict.fromkeys(input_strs)}
+        return [results[input_str] for input_str in input_strs]
+
+    def _approximate_lookup(self, words: FrozenSet[str]) -> Optional[Dict[str, Any]]:
+        """
+        Looks up text that did not exactly match a key: first with its misspelled words corrected, then by
+        partial match. The confidence of a corrected match is the share of the text's characters that were
+        not edited.
+        """
+        confidence = 1.0
+        if self.spelling_corrector is not None and words:
+            corrected_words, num_edits = self.spelling_corrector.correct(words)
+            if num_edits:
+                confidence = 1 - num_edits / sum(len(word) for word in words)
+                words = corrected_words
+                classification = self.contention_text_lookup_table.get(words)
+                if classification is not None:
+                    return {**classification, "matched_key": words, "match_confidence": confidence}
+
+        if self.partial_matcher is not None:
+            partial_match = self.partial_matcher.match(words)
+            if partial_match is not None:
+                matched_key, partial_confidence = partial_match
+                return {
+                    **self.contention_text_lookup_table[matched_key],
+                    "matched_key": matched_key,
+                    "match_confidence": confidence * partial_confidence,
+                }
+        return None
 
     def __len__(self) -> int:
         """
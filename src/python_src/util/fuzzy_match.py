@@ -0,0 +1,121 @@
+"""
+Spelling correction of contention text against the words of the expanded lookup table.
+
+Misspelled contention text ("tinitus", "sciatia") does not match the expanded lookup table and falls
+through to the ML classifier. The SpellingCorrector replaces each word that is not in the lookup table's
+vocabulary with the closest vocabulary word, using a SymSpell-style deletion index: every vocabulary word
+is indexed under each string that can be made by deleting up to max_distance of its characters, so the
+candidates for a word are found by generating its own deletions and looking them up, and only those
+candidates have their edit distance computed.
+
+Classes:
+    SpellingCorrector: Corrects words to the closest word of a vocabulary.
+"""
+
+import time
+from collections import Counter, defaultdict
+from itertools import combinations
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+
+def _deletions(word: str, max_distance: int) -> Set[str]:
+    """
+    Returns the strings made by deleting up to max_distance characters from word (including word itself)
+    """
+    deletions = {word}
+    for num_deleted in range(1, min(max_distance, len(word)) + 1):
+        for positions in combinations(range(len(word)), num_deleted):
+            deletions.add("".join(c for i, c in enumerate(word) if i not in positions))
+    return deletions
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> Optional[int]:
+    """
+    Optimal string alignment distance (Levenshtein distance, also counting the transposition of two adjacent
+    characters as one edit) between a and b. Returns None if it is greater than max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    previous_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return None
+        previous_previous, previous = previous, current
+    return previous[-1] if previous[-1] <= max_distance else None
+
+
+class SpellingCorrector:
+    """
+    Attributes:
+        vocabulary (Counter[str]): The words to correct to, with the number of lookup table keys each is in
+            (used to prefer the more common word when two are equally close).
+        max_distance (int): Largest number of edits made to correct a word.
+        min_word_length (int): Words shorter than this are not corrected, since short words are within a
+            couple of edits of too many others.
+        max_lookup_ms (float): Time budget for correcting the words of one text; once it is spent, the
+            remaining words are left as they are.
+    """
+
+    def __init__(self, keys: Iterable[FrozenSet[str]], max_distance: int, min_word_length: int, max_lookup_ms: float) -> None:
+        if max_distance <= 0:
+            raise ValueError("max_distance must be greater than zero")
+        self.vocabulary: Counter[str] = Counter(word for key in keys for word in key)
+        self.max_distance = max_distance
+        self.min_word_length = min_word_length
+        self.max_lookup_seconds = max_lookup_ms / 1000
+
+        index: Dict[str, List[str]] = defaultdict(list)
+        for word in self.vocabulary:
+            for deletion in _deletions(word, max_distance):
+                index[deletion].append(word)
+        self.index = dict(index)
+
+    def correct_word(self, word: str) -> Tuple[str, int]:
+        """
+        Returns the closest vocabulary word and its edit distance from word, or word itself (with a distance of 0)
+        if it is in the vocabulary, too short to correct or has no vocabulary word within max_distance.
+        """
+        if word in self.vocabulary or len(word) < self.min_word_length:
+            return word, 0
+
+        best: Optional[Tuple[int, int, str]] = None
+        seen: Set[str] = set()
+        for deletion in _deletions(word, self.max_distance):
+            for candidate in self.index.get(deletion, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = edit_distance(word, candidate, self.max_distance)
+                if distance is None:
+                    continue
+                # closest first, then the word in the most keys, then alphabetical so that ties are deterministic
+                ranking = (distance, -self.vocabulary[candidate], candidate)
+                if best is None or ranking < best:
+                    best = ranking
+        if best is None:
+            return word, 0
+        return best[2], best[0]
+
+    def correct(self, words: Iterable[str]) -> Tuple[FrozenSet[str], int]:
+        """
+        Corrects each word, returning the corrected words and the total number of edits made. Words left after
+        the time budget has been spent are not corrected.
+        """
+        deadline = time.perf_counter() + self.max_lookup_seconds
+        corrected = set()
+        total_distance = 0
+        for word in words:
+            if time.perf_counter() > deadline:
+                corrected.add(word)
+                continue
+            corrected_word, distance = self.correct_word(word)
+            corrected.add(corrected_word)
+            total_distance += distance
+        return frozenset(corrected), total_distance
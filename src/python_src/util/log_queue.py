@@ -0,0 +1,126 @@
+"""
+Queue-backed log sink, so that writing log lines to stdout never blocks the request path.
+
+Log records are put on a bounded in-memory queue by a QueueHandler on the root logger, and a
+QueueListener thread writes them to the handlers that were previously on the root logger. When the
+queue is full (eg stdout is piped to a consumer that cannot keep up) records are dropped and counted
+rather than blocking the caller.
+
+Methods
+-------
+start_queue_logging
+    Move the root logger's handlers behind a bounded queue
+stop_queue_logging
+    Flush the queue and restore the root logger's handlers
+queue_logging_stats
+    Counts of records enqueued and dropped
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that drops (and counts) records when the queue is full, instead of raising
+
+    Attributes:
+    ----------
+    enqueued: int
+        Number of records put on the queue
+    dropped: int
+        Number of records dropped because the queue was full
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self.log_queue = log_queue
+        self.enqueued = 0
+        self.dropped = 0
+        self._count_lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.log_queue.put_nowait(record)
+        except queue.Full:
+            with self._count_lock:
+                self.dropped += 1
+            return
+        with self._count_lock:
+            self.enqueued += 1
+
+
+_queue_handler: Optional[DroppingQueueHandler] = None
+_queue_listener: Optional[QueueListener] = None
+_original_handlers: List[logging.Handler] = []
+
+
+def start_queue_logging(max_queue_size: int) -> DroppingQueueHandler:
+    """
+    Replaces the root logger's handlers with a DroppingQueueHandler, and starts a listener thread that
+    passes queued records on to the original handlers. Calling this again while queue logging is running
+    returns the running handler.
+
+    Parameters
+    ----------
+    max_queue_size : int
+        Maximum number of records held in the queue before new records are dropped
+    """
+    global _queue_handler, _queue_listener, _original_handlers
+    if _queue_handler is not None:
+        return _queue_handler
+    if max_queue_size <= 0:
+        raise ValueError("max_queue_size must be greater than zero")
+
+    root = logging.getLogger()
+    _original_handlers = list(root.handlers)
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=max_queue_size)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_listener = QueueListener(log_queue, *_original_handlers, respect_handler_level=True)
+
+    for handler in _original_handlers:
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    _queue_listener.start()
+    return _queue_handler
+
+
+def stop_queue_logging() -> None:
+    """
+    Writes out any queued records, then puts the original handlers back on the root logger
+    """
+    global _queue_handler, _queue_listener, _original_handlers
+    if _queue_handler is None or _queue_listener is None:
+        return
+
+    _queue_listener.stop()
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    for handler in _original_handlers:
+        root.addHandler(handler)
+
+    if _queue_handler.dropped:
+        logging.warning(f"{_queue_handler.dropped} log records were dropped because the log queue was full")
+    _queue_handler = None
+    _queue_listener = None
+    _original_handlers = []
+
+
+def queue_logging_stats() -> Dict[str, int]:
+    """
+    Returns the number of records enqueued and dropped, and the current queue size
+    """
+    if _queue_handler is None:
+        return {"enqueued": 0, "dropped": 0, "queue_size": 0}
+    return {
+        "enqueued": _queue_handler.enqueued,
+        "dropped": _queue_handler.dropped,
+        "queue_size": _queue_handler.log_queue.qsize(),
+    }
+
+
+atexit.register(stop_queue_logging)
@@ -0,0 +1,94 @@
+"""
+Windowed rollups of the per-contention log events.
+
+Logging one JSON line for each classified contention is the largest I/O cost of the service at high volume. In
+rollup mode (logging.contention_stats.mode in app_config.yaml), the contentions are counted by endpoint,
+classification method and classification code instead, and the counts are logged once per window, one line for
+each combination seen in the window. Only a sample of the raw per-contention lines is still logged.
+
+Classes
+-------
+ContentionStatsRollup
+    Counts of classified contentions, logged at the end of each window by a background thread
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+RollupKey = Tuple[str, str, Optional[int]]
+
+
+class ContentionStatsRollup:
+    """
+    Counts contentions by endpoint, classification method and classification code, and passes a log line for each
+    count to emit every window_seconds (and when stopped).
+
+    Attributes:
+        window_seconds (float): Length of each window.
+        emit (Callable[[Dict[str, Any]], None]): Logs a rollup line (eg log_as_json).
+    """
+
+    def __init__(self, window_seconds: float, emit: Callable[[Dict[str, Any]], None]) -> None:
+        if window_seconds <= 0:
+            raise ValueError("window_seconds must be greater than zero")
+        self.window_seconds = window_seconds
+        self.emit = emit
+        self._lock = threading.Lock()
+        self._counts: Dict[RollupKey, int] = {}
+        self._window_start = datetime.now(tz=timezone.utc)
+        self._window_started_at = time.monotonic()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, endpoint: str, classification_method: str, classification_code: Optional[int]) -> None:
+        key = (endpoint, classification_method, classification_code)
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def flush(self) -> None:
+        """
+        Logs the counts of the current window and starts a new one
+        """
+        now = time.monotonic()
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            window_start, self._window_start = self._window_start, datetime.now(tz=timezone.utc)
+            window_seconds, self._window_started_at = now - self._window_started_at, now
+        for (endpoint, classification_method, classification_code), count in sorted(
+            counts.items(), key=lambda item: (item[0][0], item[0][1], item[0][2] or 0)
+        ):
+            self.emit(
+                {
+                    "message": "contention stats rollup",
+                    "window_start": window_start.isoformat(),
+                    "window_seconds": window_seconds,
+                    "endpoint": endpoint,
+                    "classification_method": classification_method,
+                    "classification_code": classification_code,
+                    "count": count,
+                }
+            )
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="contention-stats-rollup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the background thread and logs the counts of the last window
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.window_seconds)
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.window_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Could not log the contention stats rollup: {e}")
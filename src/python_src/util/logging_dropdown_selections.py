@@ -1,9 +1,67 @@
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterator, List, Optional
+
 from .lookup_tables_utilities import read_csv_to_list
 
 
-def build_logging_table(filepath: str, autocomplete_columns: list[str], active_autocomplete: str) -> list[str]:
+@dataclass(frozen=True)
+class DropdownSelection:
+    """
+    Where an autosuggestion term came from in the autosuggestion list
+
+    Attributes:
+    ----------
+    term: str
+        The normalized (stripped and lowercased) autosuggestion term
+    autosuggestion_column: str
+        The autosuggestion column the term was read from, eg "Autosuggestion term 2"
+    row_index: int
+        Index of the taxonomy row in the csv (0 is the first row after the header)
+    row: dict[str, str]
+        The taxonomy row the term was read from
+    """
+
+    term: str
+    autosuggestion_column: str
+    row_index: int
+    row: Dict[str, str]
+
+
+class DropdownCatalog:
+    """
+    Indexed set of active autosuggestion terms used for logging.
+
+    Membership checks use a frozenset, and each term maps to the autosuggestion column and
+    taxonomy row it was read from. Iterating the catalog yields the terms in csv order.
+    """
+
+    def __init__(self, selections: List[DropdownSelection]) -> None:
+        self._terms = [s.term for s in selections]
+        self._index: Dict[str, DropdownSelection] = {}
+        for selection in selections:
+            self._index.setdefault(selection.term, selection)
+        self.terms: FrozenSet[str] = frozenset(self._index)
+
+    def get(self, term: str) -> Optional[DropdownSelection]:
+        """
+        Returns where the term appears in the autosuggestion list, or None if it is not an active autosuggestion.
+        The term is expected to be stripped and lowercased.
+        """
+        return self._index.get(term)
+
+    def __contains__(self, term: object) -> bool:
+        return term in self.terms
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._terms)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+
+def build_logging_table(filepath: str, autocomplete_columns: list[str], active_autocomplete: str) -> DropdownCatalog:
     """
-    Builds list of dropdown options to use for logging from the most current
+    Builds catalog of dropdown options to use for logging from the most current
     dropdown conditions lookup table csv.
 
     Parameters:
@@ -13,14 +71,14 @@ def build_logging_table(filepath: str, autocomplete_columns: list[str], active_a
 
     Returns
     -------
-    list[str]
-        List of autosuggestion names for use in logging
+    DropdownCatalog
+        Catalog of autosuggestion names for use in logging
     """
-    dropdown_values = []
+    selections = []
     rows = read_csv_to_list(filepath)
-    for row in rows:
+    for row_index, row in enumerate(rows):
         if row[active_autocomplete] == "Active":
             for col in autocomplete_columns:
                 if row[col]:
-                    dropdown_values.append(row[col].strip().lower())
-    return dropdown_values
+                    selections.append(DropdownSelection(row[col].strip().lower(), col, row_index, row))
+    return DropdownCatalog(selections)
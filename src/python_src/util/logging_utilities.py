@@ -1,9 +1,12 @@
+import atexit
+import inspect
 import json
 import logging
+import random
 import sys
 from datetime import datetime, timezone
 from functools import wraps
-from typing import Any, Callable, Dict, Tuple, TypeVar, Union, cast
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar, Union, cast
 
 from fastapi import Request
 
@@ -14,9 +17,21 @@ from ..pydantic_models import (
     Contention,
     VaGovClaim,
 )
-from .app_utilities import dropdown_lookup_table, dropdown_values, expanded_lookup_table, ml_classifier
-
+from .app_utilities import app_config, dropdown_lookup_table, dropdown_values, expanded_lookup_table, ml_classifier
+from .log_queue import start_queue_logging, stop_queue_logging
+from .log_rollup import ContentionStatsRollup
+from .lookup_tables_utilities import ContentionClassification
+from .metrics import CLASSIFICATIONS, metrics
+from .stage_timing import timed_stage
+
+HYBRID_ENDPOINTS = ["/hybrid-contention-classification", "/batch/hybrid-contention-classification"]
+EXPANDED_ENDPOINTS = ["/expanded-contention-classification", *HYBRID_ENDPOINTS]
+
+# basicConfig replaces the root handlers, so any running log queue is stopped first and restarted around the new handler
+stop_queue_logging()
 logging.basicConfig(format="%(message)s", level=logging.INFO, datefmt="%Y-%m-%dT%H:%M:%S%z", stream=sys.stdout, force=True)
+if app_config["logging"]["queue"]["enabled"]:
+    start_queue_logging(app_config["logging"]["queue"]["max_size"])
 
 
 def log_as_json(log: Dict[str, Any]) -> None:
@@ -28,17 +43,74 @@ def log_as_json(log: Dict[str, Any]) -> None:
     logging.info(json.dumps(log))
 
 
+# in rollup mode, classified contentions are counted in windowed rollups (see log_rollup.py), and only a sample of
+# the per-contention and per-request log lines are written
+contention_stats_config = app_config["logging"]["contention_stats"]
+if contention_stats_config["mode"] not in ("raw", "rollup"):
+    raise ValueError(f"Unknown contention stats logging mode: {contention_stats_config['mode']}")
+contention_stats_rollup: Optional[ContentionStatsRollup] = None
+log_sample_rate = 1.0
+if contention_stats_config["mode"] == "rollup":
+    contention_stats_rollup = ContentionStatsRollup(contention_stats_config["rollup_window_seconds"], log_as_json)
+    contention_stats_rollup.start()
+    # registered after the log queue's handler, so the last window is logged before the queue is drained
+    atexit.register(contention_stats_rollup.stop)
+    log_sample_rate = float(contention_stats_config["sample_rate"])
+
+
+def is_log_line_sampled() -> bool:
+    """
+    Returns whether a per-contention or per-request log line should be written: always in raw mode, and at the
+    sample rate in rollup mode
+    """
+    # random is fine here: the sample is not used for anything security related
+    return log_sample_rate >= 1 or random.random() < log_sample_rate  # nosec B311
+
+
+def record_contention_stats(endpoint: str, classification_method: str, classification_code: Optional[int]) -> bool:
+    """
+    Adds the contention to the rollup in rollup mode, returning whether its log line should be written
+    """
+    if contention_stats_rollup is None:
+        return True
+    contention_stats_rollup.add(endpoint, classification_method, classification_code)
+    return is_log_line_sampled()
+
+
 def log_expanded_contention_text(
-    logging_dict: Dict[str, Any], contention_text: str, log_contention_text: str
+    logging_dict: Dict[str, Any],
+    contention_text: str,
+    log_contention_text: str,
+    classification: Optional[ContentionClassification] = None,
 ) -> Dict[str, Any]:
     """
     Updates the logging payload to include the original contention text ONLY IF
     the expanded lookup is able to determine a classification code. The expanded
     lookup has a controlled set of accepted values, and if it is able to determine
     a classification code, we can be confident that the input does not contain PII
+    (for partial matches, only the words that matched are logged)
+
+    If the classification step already consulted the expanded lookup, its result is used
+    rather than repeating the lookup.
     """
-    if expanded_lookup_table.get(contention_text)["classification_code"]:
-        processed_text = expanded_lookup_table.prep_incoming_text(contention_text)
+    if classification is not None and classification.is_expanded_match is not None:
+        is_expanded_match = classification.is_expanded_match
+        processed_text = classification.processed_text
+        matched_key = classification.matched_key
+        match_confidence = classification.match_confidence
+    else:
+        expanded_classification, processed_text = expanded_lookup_table.lookup(contention_text)
+        is_expanded_match = bool(expanded_classification["classification_code"])
+        matched_key = expanded_classification.get("matched_key")
+        match_confidence = expanded_classification.get("match_confidence")
+
+    if is_expanded_match and match_confidence is not None and matched_key is not None:
+        # for a partial match, only the words of the matched key are logged: the other words of the text are
+        # not in the lookup table, so they may contain PII
+        processed_text = " ".join(sorted(matched_key))
+        logging_dict["match_confidence"] = match_confidence
+
+    if is_expanded_match:
         if log_contention_text == "unmapped contention text":
             log_contention_text = f"unmapped contention text {[processed_text]}"
         logging_dict.update(
@@ -54,25 +126,35 @@ def log_expanded_contention_text(
     return logging_dict
 
 
+@timed_stage("logging")
 def log_contention_stats(
     contention: Contention,
     classified_contention: ClassifiedContention,
     claim: VaGovClaim,
     request: Request,
     classified_by: str,
+    classification: Optional[ContentionClassification] = None,
 ) -> None:
     """
     Logs stats about each contention that was classified.
     If a classification was not made AND the hybrid classifier was requested, does not log the contention
     why: in this case, the ML classifier will be consulted, and the ML classifier will log contention stats;
     and due to assumptions in our dashboards, we need to log only one contention message per processed contention
+
+    The classification result, when given, provides the lookups already made by the classification step.
     """
-    if request.url.path == "/hybrid-contention-classification" and classified_by == "not classified":
+    if request.url.path in HYBRID_ENDPOINTS and classified_by == "not classified":
+        return
+    metrics.inc(CLASSIFICATIONS, endpoint=request.url.path, method=classified_by)
+    if not record_contention_stats(request.url.path, classified_by, classified_contention.classification_code):
         return
 
     contention_text = contention.contention_text or ""
     is_in_dropdown = contention_text.strip().lower() in dropdown_values
-    is_mapped_text = dropdown_lookup_table.get(contention_text, {}).get("classification_code") is not None
+    if classification is not None and classification.is_mapped_text is not None:
+        is_mapped_text = classification.is_mapped_text
+    else:
+        is_mapped_text = dropdown_lookup_table.get(contention_text, {}).get("classification_code") is not None
     log_contention_type = (
         "claim_for_increase" if contention.contention_type == "INCREASE" else contention.contention_type.lower()
     )
@@ -98,12 +180,15 @@ def log_contention_stats(
         "classification_method": classified_by,
     }
 
-    if request.url.path in ["/expanded-contention-classification", "/hybrid-contention-classification"]:
-        logging_dict = log_expanded_contention_text(logging_dict, contention.contention_text, log_contention_text)
+    if request.url.path in EXPANDED_ENDPOINTS:
+        logging_dict = log_expanded_contention_text(
+            logging_dict, contention.contention_text, log_contention_text, classification
+        )
 
     log_as_json(logging_dict)
 
 
+@timed_stage("logging")
 def log_claim_stats_v2(claim: VaGovClaim, response: ClassifierResponse, request: Request) -> None:
     """
     Logs stats about each claim processed by the classifier.  This will provide
@@ -126,6 +211,19 @@ F = TypeVar("F", bound=Callable[..., Any])
 
 
 def log_claim_stats_decorator(func: F) -> F:
+    if inspect.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            result = await func(*args, **kwargs)
+
+            if (claim := kwargs.get("claim")) and (request := kwargs.get("request")):
+                log_claim_stats_v2(claim, result, request)
+
+            return result
+
+        return cast(F, async_wrapper)
+
     @wraps(func)
     def wrapper(*args: Any, **kwargs: Any) -> Any:
         result = func(*args, **kwargs)
@@ -139,25 +237,26 @@ def log_claim_stats_decorator(func: F) -> F:
 
 
 def log_contention_stats_decorator(
-    func: Callable[..., Tuple[ClassifiedContention, str]],
+    func: Callable[..., Tuple[ClassifiedContention, ContentionClassification]],
 ) -> Callable[..., ClassifiedContention]:
     @wraps(func)
     def wrapper(*args: Any, **kwargs: Any) -> ClassifiedContention:
-        result, classified_by = func(*args, **kwargs)
+        result, classification = func(*args, **kwargs)
         if len(args) >= 3 and isinstance(args[0], Contention) and isinstance(args[1], VaGovClaim):
-            log_contention_stats(args[0], result, args[1], args[2], classified_by)
+            log_contention_stats(args[0], result, args[1], args[2], classification.classified_by, classification)
 
         return result
 
     return wrapper
 
 
+@timed_stage("logging")
 def log_ml_contention_stats(response: ClassifierResponse, ai_response: AiResponse, request: Request) -> None:
     """
     Logs stats about each contention processed by the ML classifier.
     """
     # Get ML classifier version if available
-    if ml_classifier is not None:
+    if ml_classifier:
         version_tuple = ml_classifier.get_version()
         # Convert tuple to a formatted string for logging
         if isinstance(version_tuple, tuple) and len(version_tuple) == 2:
@@ -167,7 +266,10 @@ def log_ml_contention_stats(response: ClassifierResponse, ai_response: AiRespons
     else:
         ml_version = "unknown"
 
+    count_ml_classifications(ai_response, request.url.path)
     for classified_contention in ai_response.classified_contentions:
+        if not record_contention_stats(request.url.path, "ml_classifier", classified_contention.classification_code):
+            continue
         log_contention_type = (
             "claim_for_increase"
             if classified_contention.contention_type == "INCREASE"
@@ -192,6 +294,16 @@ def log_ml_contention_stats(response: ClassifierResponse, ai_response: AiRespons
         log_as_json(logging_dict)
 
 
+def count_ml_classifications(ai_response: AiResponse, endpoint: str) -> None:
+    """
+    Counts the contentions classified by the ML classifier in the metrics; contentions it could not classify (or
+    whose classification was rejected) are counted as not classified
+    """
+    for classified_contention in ai_response.classified_contentions:
+        method = "ml_classifier" if classified_contention.classification_code is not None else "not classified"
+        metrics.inc(CLASSIFICATIONS, endpoint=endpoint, method=method)
+
+
 def log_ml_contention_stats_decorator(func: Callable[..., ClassifierResponse]) -> Callable[..., ClassifierResponse]:
     @wraps(func)
     def wrapper(*args: Any, **kwargs: Any) -> ClassifierResponse:
@@ -30,6 +30,18 @@ class DiagnosticCodeLookupTable:
                 ],  # note underscore different from contention LUT
             }
 
+    @classmethod
+    def from_mappings(
+        cls, init_values: InitValues, classification_code_mappings: Dict[str, Dict[str, Any]]
+    ) -> "DiagnosticCodeLookupTable":
+        """
+        Creates the lookup table from mappings that were already built (eg by the compiled taxonomy artifact)
+        """
+        table = cls.__new__(cls)
+        table.init_values = init_values
+        table.classification_code_mappings = classification_code_mappings
+        return table
+
     def get(self, input_str: str, default_value: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         default_value = self.init_values.lut_default_value
         classification = self.classification_code_mappings.get(input_str.strip().lower(), default_value)
@@ -82,6 +94,18 @@ class ContentionTextLookupTable:
                         )
                         self.classification_code_mappings[table_key] = mapping
 
+    @classmethod
+    def from_mappings(
+        cls, init_values: InitValues, classification_code_mappings: Dict[str, Dict[str, Any]]
+    ) -> "ContentionTextLookupTable":
+        """
+        Creates the lookup table from mappings that were already built (eg by the compiled taxonomy artifact)
+        """
+        table = cls.__new__(cls)
+        table.init_values = init_values
+        table.classification_code_mappings = classification_code_mappings
+        return table
+
     def get(self, input_str: str, default_value: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         fallback = default_value if default_value is not None else self.init_values.lut_default_value
         classification = self.classification_code_mappings.get(input_str.strip().lower(), fallback)
@@ -1,7 +1,7 @@
 import csv
 import logging
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, FrozenSet, List, Optional
 
 # from .logging_utilities import log_as_json
 
@@ -17,6 +17,28 @@ class InitValues:
     aggregate_synonyms: Optional[str] = None
 
 
+@dataclass
+class ContentionClassification:
+    """
+    Result of classifying a single contention. Besides the classification it carries the
+    intermediate results of the lookups, so that the logging layer does not have to repeat them.
+
+    is_expanded_match is None when the expanded lookup table was not consulted (eg the contention
+    was classified by diagnostic code). match_confidence is only set for partial matches of the
+    expanded lookup table. is_mapped_text is whether the contention text is in the contention text
+    (dropdown) lookup table, and is None if it was not looked up.
+    """
+
+    classification_code: Optional[int]
+    classification_name: Optional[str]
+    classified_by: str
+    processed_text: Optional[str] = None
+    matched_key: Optional[FrozenSet[str]] = None
+    is_expanded_match: Optional[bool] = None
+    match_confidence: Optional[float] = None
+    is_mapped_text: Optional[bool] = None
+
+
 def read_csv_to_list(filepath: str) -> List[Dict[str, str]]:
     """
     Reads a CSV file and returns a list of dictionaries (one dict per row).
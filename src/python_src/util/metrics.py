@@ -0,0 +1,345 @@
+"""
+In-process metrics, exposed in the Prometheus text format by the /metrics endpoint.
+
+Counting classifications, cache hits and latencies from metrics is cheaper than aggregating the per-event JSON
+log lines at ingest. Counters are sharded per thread, so incrementing one takes no lock; the shards are summed
+when the metrics are read. Histograms count observations in fixed buckets behind a short lock.
+
+Each uvicorn worker is a separate process with its own metrics, and a scrape of /metrics is answered by one of
+them. When a multi-process directory is configured, each process writes a snapshot of its counters and
+histograms to a file in the directory every few seconds, and /metrics adds up the snapshots of all of the
+processes. Snapshot files are kept after a process exits, so that its counts are not lost; the directory should
+be emptied when the application is deployed (as with the Prometheus client's multi-process mode).
+
+Classes
+-------
+Histogram
+    Counts of observations in fixed buckets, with their sum
+MetricsRegistry
+    Counters and histograms by name and labels, with snapshots that can be merged across processes
+MetricsFlusher
+    Background thread that writes the process's snapshot to the multi-process directory
+
+Methods
+-------
+render_metrics
+    Format a snapshot (and gauges read at scrape time) in the Prometheus text format
+"""
+
+import json
+import logging
+import os
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+MetricKey = Tuple[str, Labels]
+# a sample read at snapshot or scrape time: metric name, labels and value
+Sample = Tuple[str, Dict[str, str], float]
+
+SNAPSHOT_FILE_PREFIX = "metrics-"
+
+
+class Histogram:
+    """
+    Thread-safe histogram.
+
+    Attributes:
+        buckets (tuple[float, ...]): Upper bounds of the buckets, in increasing order; observations above the last
+            bound are only counted in the +Inf bucket.
+    """
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[bucket] += 1
+            self._count += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the number of observations, their sum, and the cumulative count of observations at or below
+        each bucket's upper bound
+        """
+        with self._lock:
+            counts = list(self._counts)
+            count, total = self._count, self._sum
+        cumulative: Dict[str, int] = {}
+        running_total = 0
+        for upper_bound, bucket_count in zip(self.buckets, counts, strict=False):
+            running_total += bucket_count
+            cumulative[_format_value(upper_bound)] = running_total
+        cumulative["+Inf"] = count
+        return {"count": count, "sum": total, "buckets": cumulative}
+
+
+class MetricsRegistry:
+    """
+    The metrics of the process. Metrics are described (with their type, help text and, for histograms, buckets)
+    before they are used.
+    """
+
+    def __init__(self) -> None:
+        self._descriptions: Dict[str, Tuple[str, str]] = {}
+        self._buckets: Dict[str, Sequence[float]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counter_shards: List[Dict[MetricKey, float]] = []
+        self._histograms: Dict[MetricKey, Histogram] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def describe(self, name: str, metric_type: str, help_text: str, buckets: Optional[Sequence[float]] = None) -> None:
+        if metric_type not in ("counter", "gauge", "histogram"):
+            raise ValueError(f"Unsupported metric type: {metric_type}")
+        if metric_type == "histogram" and not buckets:
+            raise ValueError("Histograms need buckets")
+        self._descriptions[name] = (metric_type, help_text)
+        if buckets:
+            self._buckets[name] = buckets
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        """
+        Adds to a counter. Each thread adds to its own shard of the counters, so no lock is taken.
+        """
+        shard: Optional[Dict[MetricKey, float]] = getattr(self._local, "counters", None)
+        if shard is None:
+            shard = self._local.counters = {}
+            with self._lock:
+                self._counter_shards.append(shard)
+        key = (name, _labels_key(labels))
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, _labels_key(labels))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self._buckets[name]))
+        histogram.observe(value)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """
+        Adds a function that returns counter samples kept elsewhere (eg the hit counts of the result caches),
+        which are read whenever a snapshot is taken
+        """
+        self._collectors.append(collector)
+
+    def histogram_snapshot(self, name: str) -> Dict[Labels, Dict[str, Any]]:
+        with self._lock:
+            histograms = [(key, histogram) for key, histogram in self._histograms.items() if key[0] == name]
+        return {labels: histogram.snapshot() for (_, labels), histogram in histograms}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the counters (including those read from the collectors) and histograms of the process as a
+        JSON-serializable dict
+        """
+        with self._lock:
+            shards = list(self._counter_shards)
+            histograms = list(self._histograms.items())
+        counters: Dict[MetricKey, float] = {}
+        for shard in shards:
+            # dict.copy is atomic, so a shard can be read while its thread is adding to it
+            for key, value in shard.copy().items():
+                counters[key] = counters.get(key, 0.0) + value
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                key = (name, _labels_key(labels))
+                counters[key] = counters.get(key, 0.0) + value
+        return {
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in counters.items()],
+            "histograms": [
+                {"name": name, "labels": dict(labels), **histogram.snapshot()} for (name, labels), histogram in histograms
+            ],
+        }
+
+    def write_snapshot(self, directory: str) -> None:
+        """
+        Writes the process's snapshot to the multi-process directory, replacing its previous snapshot
+        """
+        path = os.path.join(directory, f"{SNAPSHOT_FILE_PREFIX}{os.getpid()}.json")
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temporary_path, path)
+
+    def merged_snapshot(self, directory: Optional[str] = None) -> Tuple[Dict[str, Any], int]:
+        """
+        Returns the snapshot of this process added to the snapshots written by the other processes to the
+        multi-process directory (if given), and the number of processes included
+        """
+        snapshots = [self.snapshot()]
+        if directory and os.path.isdir(directory):
+            own_file = f"{SNAPSHOT_FILE_PREFIX}{os.getpid()}.json"
+            for file_name in sorted(os.listdir(directory)):
+                if not file_name.startswith(SNAPSHOT_FILE_PREFIX) or not file_name.endswith(".json") or file_name == own_file:
+                    continue
+                try:
+                    with open(os.path.join(directory, file_name)) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError) as e:
+                    logging.warning(f"Could not read metrics snapshot {file_name}: {e}")
+        return merge_snapshots(snapshots), len(snapshots)
+
+    def description(self, name: str) -> Optional[Tuple[str, str]]:
+        return self._descriptions.get(name)
+
+
+def merge_snapshots(snapshots: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Adds up the counters and histograms of several snapshots
+    """
+    counters: Dict[MetricKey, float] = {}
+    histograms: Dict[MetricKey, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        for counter in snapshot["counters"]:
+            key = (counter["name"], _labels_key(counter["labels"]))
+            counters[key] = counters.get(key, 0.0) + counter["value"]
+        for histogram in snapshot["histograms"]:
+            key = (histogram["name"], _labels_key(histogram["labels"]))
+            merged = histograms.setdefault(key, {"count": 0, "sum": 0.0, "buckets": {}})
+            merged["count"] += histogram["count"]
+            merged["sum"] += histogram["sum"]
+            for upper_bound, count in histogram["buckets"].items():
+                merged["buckets"][upper_bound] = merged["buckets"].get(upper_bound, 0) + count
+    return {
+        "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in counters.items()],
+        "histograms": [
+            {"name": name, "labels": dict(labels), **histogram} for (name, labels), histogram in histograms.items()
+        ],
+    }
+
+
+def render_metrics(registry: MetricsRegistry, snapshot: Dict[str, Any], gauges: Sequence[Sample] = ()) -> str:
+    """
+    Formats the snapshot's counters and histograms, and gauges read at scrape time, in the Prometheus text
+    exposition format
+    """
+    samples_by_name: Dict[str, List[str]] = {}
+    for counter in snapshot["counters"]:
+        samples_by_name.setdefault(counter["name"], []).append(
+            f"{counter['name']}{_format_labels(counter['labels'])} {_format_value(counter['value'])}"
+        )
+    for name, labels, value in gauges:
+        samples_by_name.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    for histogram in snapshot["histograms"]:
+        name, labels = histogram["name"], histogram["labels"]
+        lines = samples_by_name.setdefault(name, [])
+        for upper_bound, count in histogram["buckets"].items():
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': upper_bound})} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram['sum'])}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+    output = []
+    for name in sorted(samples_by_name):
+        description = registry.description(name)
+        if description is not None:
+            metric_type, help_text = description
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {metric_type}")
+        output.extend(samples_by_name[name])
+    return "\n".join(output) + "\n"
+
+
+class MetricsFlusher:
+    """
+    Writes the registry's snapshot to the multi-process directory every flush_seconds, and once more when stopped.
+    """
+
+    def __init__(self, registry: MetricsRegistry, directory: str, flush_seconds: float) -> None:
+        if flush_seconds <= 0:
+            raise ValueError("flush_seconds must be greater than zero")
+        self.registry = registry
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-flusher", daemon=True)
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join(timeout=self.flush_seconds)
+        self._flush()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_seconds):
+            self._flush()
+
+    def _flush(self) -> None:
+        try:
+            self.registry.write_snapshot(self.directory)
+        except OSError as e:
+            logging.warning(f"Could not write metrics snapshot: {e}")
+
+
+def _labels_key(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(10), "").replace(chr(34), chr(92) + chr(34))}"'
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS_SECONDS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)  # fmt: skip
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+CLASSIFICATIONS = "contention_classifications_total"
+REQUEST_DURATION = "http_request_duration_seconds"
+STAGE_DURATION = "classification_stage_duration_seconds"
+ML_BATCH_SIZE = "ml_classifier_batch_size"
+ML_BATCH_QUEUE_WAIT = "ml_batcher_queue_wait_seconds"
+CACHE_REQUESTS = "result_cache_requests_total"
+CACHE_EVICTIONS = "result_cache_evictions_total"
+CACHE_HIT_RATIO = "result_cache_hit_ratio"
+CACHE_ENTRIES = "result_cache_entries"
+LOOKUP_TABLE_ENTRIES = "lookup_table_entries"
+LOG_RECORDS_DROPPED = "log_records_dropped_total"
+LOG_QUEUE_SIZE = "log_queue_size"
+PROCESSES = "metrics_processes"
+
+# the metrics of this process
+metrics = MetricsRegistry()
+metrics.describe(CLASSIFICATIONS, "counter", "Contentions classified, by endpoint and classification method.")
+metrics.describe(REQUEST_DURATION, "histogram", "Time taken to handle each request, by route.", LATENCY_BUCKETS_SECONDS)
+metrics.describe(
+    STAGE_DURATION, "histogram", "Time spent in each stage of the classification pipeline.", LATENCY_BUCKETS_SECONDS
+)
+metrics.describe(ML_BATCH_SIZE, "histogram", "Number of texts in each call to the ML classifier.", BATCH_SIZE_BUCKETS)
+metrics.describe(
+    ML_BATCH_QUEUE_WAIT,
+    "histogram",
+    "Time requests waited for their batch of ML predictions to start.",
+    LATENCY_BUCKETS_SECONDS,
+)
+metrics.describe(CACHE_REQUESTS, "counter", "Lookups in the result caches, by cache and result (hit or miss).")
+metrics.describe(CACHE_EVICTIONS, "counter", "Entries evicted from the result caches.")
+metrics.describe(CACHE_HIT_RATIO, "gauge", "Share of the lookups in each result cache that were hits.")
+metrics.describe(CACHE_ENTRIES, "gauge", "Number of entries in each result cache.")
+metrics.describe(LOOKUP_TABLE_ENTRIES, "gauge", "Number of entries in each lookup table.")
+metrics.describe(LOG_RECORDS_DROPPED, "counter", "Log records dropped because the log queue was full.")
+metrics.describe(LOG_QUEUE_SIZE, "gauge", "Number of log records waiting to be written.")
+metrics.describe(PROCESSES, "gauge", "Number of processes whose metrics are included.")
@@ -0,0 +1,175 @@
+"""
+Micro-batching of ML classifier predictions across concurrent requests.
+
+Requests for the hybrid endpoint usually send only one or two contentions to the ML classifier. The
+MLPredictionBatcher collects the texts of requests that arrive within a short window (or until a maximum
+batch size is reached), makes a single call to the classifier for all of them, and hands each request its
+own predictions.
+
+Classes:
+    MLPredictionBatcher: Coalesces concurrent make_predictions calls into batched classifier calls.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import ML_BATCH_QUEUE_WAIT, metrics
+from .ml_classifier import Predictor
+
+
+@dataclass
+class _PendingRequest:
+    texts: List[str]
+    future: "Future[List[tuple[str, float]]]" = field(default_factory=Future)
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+class MLPredictionBatcher:
+    """
+    Stands in for the ML classifier, coalescing concurrent make_predictions calls into one classifier call.
+
+    Attributes:
+        classifier (Predictor): The classifier that makes the batched predictions.
+        max_wait_seconds (float): How long the first request of a batch waits for other requests to join it.
+        max_batch_size (int): Number of texts at which a batch is sent without waiting any longer.
+    """
+
+    def __init__(self, classifier: Predictor, max_wait_ms: float, max_batch_size: int) -> None:
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must be zero or greater")
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be greater than zero")
+        self.classifier = classifier
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        # None is queued by close() to stop the worker thread
+        self._queue: "queue.Queue[Optional[_PendingRequest]]" = queue.Queue()
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._texts = 0
+        self._largest_batch = 0
+        self._total_queue_wait = 0.0
+        self._longest_queue_wait = 0.0
+        self._requests = 0
+
+        self._worker = threading.Thread(target=self._run, name="ml-batcher", daemon=True)
+        self._worker.start()
+
+    def make_predictions(self, conditions: list[str]) -> List[tuple[str, float]]:
+        """
+        Queues the texts for the next batch and waits for their predictions.
+
+        Returns:
+            List[tuple[str, float]]: The predicted classification name and probability for each condition.
+        """
+        if not conditions:
+            return []
+        request = _PendingRequest(conditions)
+        with self._close_lock:
+            queued = not self._closed
+            if queued:
+                self._queue.put(request)
+        if not queued:
+            # the batcher has been replaced (eg by a reload) since the caller got hold of it
+            return self.classifier.make_predictions(conditions)
+        return request.future.result()
+
+    def make_top_k_predictions(self, conditions: list[str], k: int) -> List[List[tuple[str, float]]]:
+        """
+        Top-k predictions are only requested by callers of the ML classification endpoint, so they are not
+        batched; they go straight to the classifier.
+        """
+        return self.classifier.make_top_k_predictions(conditions, k)
+
+    def get_version(self) -> Any:
+        return self.classifier.get_version()
+
+    def close(self) -> None:
+        """
+        Stops the worker thread once the requests that are already queued have been predicted. Later calls
+        to make_predictions go straight to the classifier.
+        """
+        with self._close_lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+
+    def _run(self) -> None:
+        stopped = False
+        while not stopped:
+            batch, stopped = self._collect_batch()
+            if batch:
+                self._predict(batch)
+
+    def _collect_batch(self) -> Tuple[List[_PendingRequest], bool]:
+        """
+        Waits for a request, then collects more requests until the window closes or the batch is full.
+        Also returns whether the batcher has been closed.
+        """
+        first_request = self._queue.get()
+        if first_request is None:
+            return [], True
+        batch = [first_request]
+        num_texts = len(first_request.texts)
+        deadline = time.monotonic() + self.max_wait_seconds
+        while num_texts < self.max_batch_size:
+            try:
+                remaining = deadline - time.monotonic()
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+            num_texts += len(request.texts)
+        return batch, False
+
+    def _predict(self, batch: List[_PendingRequest]) -> None:
+        started_at = time.monotonic()
+        texts = [text for request in batch for text in request.texts]
+        try:
+            predictions = self.classifier.make_predictions(texts)
+            if len(predictions) != len(texts):
+                raise ValueError(f"Expected {len(texts)} predictions, got {len(predictions)}")
+        except Exception as e:
+            logging.error(f"Batched ML classification failed: {e}")
+            predictions = [("error", 0.0)] * len(texts)
+
+        offset = 0
+        for request in batch:
+            request.future.set_result(predictions[offset : offset + len(request.texts)])
+            offset += len(request.texts)
+
+        queue_waits = [started_at - request.submitted_at for request in batch]
+        for queue_wait in queue_waits:
+            metrics.observe(ML_BATCH_QUEUE_WAIT, queue_wait)
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._texts += len(texts)
+            self._largest_batch = max(self._largest_batch, len(texts))
+            self._total_queue_wait += sum(queue_waits)
+            self._longest_queue_wait = max(self._longest_queue_wait, *queue_waits)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the number of batches and requests, the mean and largest batch size (in texts), and the
+        mean and longest time requests waited in the queue
+        """
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "requests": self._requests,
+                "mean_batch_size": self._texts / self._batches if self._batches else 0.0,
+                "max_batch_size": self._largest_batch,
+                "mean_queue_wait_ms": 1000 * self._total_queue_wait / self._requests if self._requests else 0.0,
+                "max_queue_wait_ms": 1000 * self._longest_queue_wait,
+            }
@@ -8,6 +8,11 @@ contention classification.
 
 Classes:
     MLClassifier: Main classifier class for medical condition classification.
+    Predictor: Interface shared by MLClassifier and the classes that stand in for it.
+
+Functions:
+    create_inference_session: ONNX Runtime session for the model, with session options from the app config.
+    top_k_predictions: The k most probable labels for each row of a probability matrix.
 
 Example:
     >>> classifier = MLClassifier("model.onnx", "vectorizer.pkl")
@@ -21,12 +26,45 @@ import logging
 import os
 import re
 import string
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, List, Optional, Protocol, Sequence, cast
 
 import joblib
+import numpy as np
 import onnxruntime as ort
 from numpy import float32, ndarray
 
+from .metrics import ML_BATCH_SIZE, metrics
+from .sparse_linear_scorer import SparseLinearScorer
+from .stage_timing import timed_stage
+
+# numpy types of the ONNX tensor outputs that can be written to preallocated buffers
+ONNX_TENSOR_TYPES = {"tensor(float)": np.float32, "tensor(double)": np.float64, "tensor(int64)": np.int64}
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable_all": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+class Predictor(Protocol):
+    """
+    Interface used by the classification endpoints to make ML predictions, implemented by MLClassifier and
+    by the classes that stand in for it (eg RemoteMLClassifier, MLPredictionBatcher).
+    """
+
+    def make_predictions(self, conditions: list[str]) -> List[tuple[str, float]]: ...
+
+    def make_top_k_predictions(self, conditions: list[str], k: int) -> List[List[tuple[str, float]]]: ...
+
+    def get_version(self) -> Any: ...
+
 
 class MLClassifier:
     """
@@ -39,10 +77,19 @@ class MLClassifier:
     Attributes:
         session (ort.InferenceSession): ONNX Runtime inference session for the model.
         vectorizer: Scikit-learn vectorizer for text preprocessing.
+        sparse_scorer (Optional[SparseLinearScorer]): Scores the sparse vectorizer output directly
+            when sparse inference is enabled and supported by the model graph.
+        input_name (str): Name of the input node of the ONNX model, read once at construction.
+        output_names (list[str]): Names of the output nodes of the ONNX model, read once at construction.
+        run_options (ort.RunOptions): Run options reused by every call to the ONNX session.
 
     Args:
         model_file (str): Path to the ONNX model file.
         vectorizer_file (str): Path to the pickled vectorizer file.
+        sparse_inference (bool): Score the sparse vectorizer output without densifying it.
+        io_binding (bool): Run the ONNX session with IOBinding.
+        preallocated_batch_sizes (Sequence[int]): Batch sizes to reuse output buffers for with IOBinding.
+        session_options (Optional[Dict[str, Any]]): ONNX Runtime session options (see create_inference_session).
 
     Raises:
         Exception: If either the model file or vectorizer file is not found.
@@ -54,13 +101,33 @@ class MLClassifier:
         ('Hearing Loss', 0.95)
     """
 
-    def __init__(self, model_file: str = "", vectorizer_file: str = ""):
+    def __init__(
+        self,
+        model_file: str = "",
+        vectorizer_file: str = "",
+        sparse_inference: bool = False,
+        io_binding: bool = False,
+        preallocated_batch_sizes: Sequence[int] = (),
+        session_options: Optional[Dict[str, Any]] = None,
+    ):
         """
         Initialize the MLClassifier with model and vectorizer files.
 
         Args:
             model_file (str): Path to the ONNX model file. Defaults to empty string.
             vectorizer_file (str): Path to the vectorizer pickle file. Defaults to empty string.
+            sparse_inference (bool): Score the sparse vectorizer output with the weights of the ONNX graph
+                instead of densifying it for the ONNX session. Falls back to the ONNX session if the graph
+                is not a supported linear classifier. Defaults to False.
+            io_binding (bool): Bind the inputs and outputs of the ONNX session with IOBinding instead of
+                passing them to session.run. Only used when every output of the model is a numeric tensor.
+                Defaults to False.
+            preallocated_batch_sizes (Sequence[int]): With IOBinding, batch sizes for which the numeric tensor
+                outputs are written to buffers allocated once (per thread) and reused across calls. Outputs
+                of other types or batch sizes are allocated by ONNX Runtime. Defaults to none.
+            session_options (Optional[Dict[str, Any]]): ONNX Runtime session options, as in
+                ml_classifier.inference.session_options of the app config. Defaults to None, which creates
+                the session with the ONNX Runtime defaults.
 
         Raises:
             Exception: If either file does not exist.
@@ -69,10 +136,41 @@ class MLClassifier:
             raise Exception(f"File not found: {model_file}")
         if not os.path.exists(vectorizer_file):
             raise Exception(f"File not found: {vectorizer_file}")
-        self.session = ort.InferenceSession(model_file)
+        if session_options is None:
+            self.session = ort.InferenceSession(model_file)
+        else:
+            self.session = create_inference_session(model_file, session_options)
         self.vectorizer = joblib.load(vectorizer_file)
         self.version = self._extract_version_from_filenames(model_file, vectorizer_file)
 
+        # the session's input and output metadata don't change, so they are read once instead of on every call
+        self.input_name: str = self.session.get_inputs()[0].name
+        outputs = list(self.session.get_outputs())
+        self.output_names = [output.name for output in outputs]
+        self.run_options = ort.RunOptions()
+
+        # only numeric tensors can be bound as outputs: binding string tensors or ZipMap outputs (sequences of
+        # maps) crashes ONNX Runtime, so models with those outputs are run with session.run
+        if io_binding and not all(output.type in ONNX_TENSOR_TYPES for output in outputs):
+            logging.warning("IOBinding is not supported for the outputs of this model, using session.run")
+            io_binding = False
+        self.io_binding = io_binding
+        # shape (apart from the batch dimension) and numpy type of each output that can be preallocated
+        self._preallocated_outputs: Dict[str, tuple[tuple[int, ...], Any]] = {}
+        if io_binding:
+            self._preallocated_outputs = _preallocatable_outputs(outputs)
+        self._preallocated_batch_sizes = frozenset(preallocated_batch_sizes)
+        # buffers are not shared between threads, as the executor makes predictions concurrently
+        self._output_buffers = threading.local()
+
+        self.sparse_scorer: Optional[SparseLinearScorer] = None
+        if sparse_inference:
+            try:
+                self.sparse_scorer = SparseLinearScorer.from_onnx_model(model_file)
+                logging.info("ML classifier using sparse inference")
+            except Exception as e:
+                logging.warning(f"Sparse inference is not supported for this model, using the ONNX session: {e}")
+
     def make_predictions(self, conditions: list[str]) -> List[tuple[str, float]]:
         """
         Classify a list of medical conditions into standardized categories.
@@ -95,10 +193,20 @@ class MLClassifier:
             ("error", 0.0) for each condition.
         """
         predictions = [("error", 0.0)] * len(conditions)
+        metrics.observe(ML_BATCH_SIZE, len(conditions))
 
         try:
             cleaned_conditions = [self.clean_text(c) for c in conditions]
-            outputs = self.session.run(self.get_outputs_for_session(), self.get_inputs_for_session(cleaned_conditions))
+            if self.sparse_scorer is not None:
+                with timed_stage("ml_vectorize"):
+                    features = self.vectorizer.transform(cleaned_conditions)
+                with timed_stage("ml_inference"):
+                    return self.sparse_scorer.predict(features)
+
+            with timed_stage("ml_vectorize"):
+                inputs = self.get_inputs_for_session(cleaned_conditions)
+            with timed_stage("ml_inference"):
+                outputs = self.run_session(inputs)
             labels = outputs[0]
             probabilities = outputs[1]
 
@@ -107,6 +215,88 @@ class MLClassifier:
             logging.error(e)
         return predictions
 
+    def make_top_k_predictions(self, conditions: list[str], k: int) -> List[List[tuple[str, float]]]:
+        """
+        Classify a list of medical conditions, returning the k most probable classifications of each.
+
+        Args:
+            conditions (list[str]): List of condition descriptions to classify.
+            k (int): Number of classifications to return for each condition (at most the number of
+                classes of the model).
+
+        Returns:
+            List[List[tuple[str, float]]]: For each condition, the classification names and probabilities
+                in descending order of probability.
+                Example: [[('Hearing Loss', 0.88), ('Tinnitus', 0.07)]]
+
+        Note:
+            If an error occurs during prediction, returns [("error", 0.0)] for each condition.
+        """
+        if not conditions:
+            return []
+        metrics.observe(ML_BATCH_SIZE, len(conditions))
+        try:
+            cleaned_conditions = [self.clean_text(c) for c in conditions]
+            if self.sparse_scorer is not None:
+                with timed_stage("ml_vectorize"):
+                    features = self.vectorizer.transform(cleaned_conditions)
+                with timed_stage("ml_inference"):
+                    probabilities = self.sparse_scorer.predict_proba(features)
+                return top_k_predictions(probabilities, self.sparse_scorer.labels, k)
+
+            with timed_stage("ml_vectorize"):
+                inputs = self.get_inputs_for_session(cleaned_conditions)
+            with timed_stage("ml_inference"):
+                outputs = self.run_session(inputs)
+            # the probabilities output is a list of {label: probability} dicts (ZipMap), one per condition
+            labels = list(outputs[1][0])
+            probabilities = np.array([[row[label] for label in labels] for row in outputs[1]], dtype=float32)
+            return top_k_predictions(probabilities, labels, k)
+        except Exception as e:
+            logging.error(e)
+        return [[("error", 0.0)] for _ in conditions]
+
+    def run_session(self, inputs: Dict[str, ndarray]) -> List[Any]:
+        """
+        Run the ONNX session on the model inputs, with IOBinding if it is enabled.
+
+        Args:
+            inputs (Dict[str, ndarray]): Model inputs, as returned by get_inputs_for_session.
+
+        Returns:
+            List[Any]: The outputs of the model, in the order of output_names.
+        """
+        if not self.io_binding:
+            return cast(List[Any], self.session.run(self.get_outputs_for_session(), inputs, self.run_options))
+
+        features = inputs[self.input_name]
+        binding = self.session.io_binding()
+        binding.bind_cpu_input(self.input_name, features)
+        for name in self.output_names:
+            buffer = self._get_output_buffer(name, features.shape[0])
+            if buffer is None:
+                binding.bind_output(name, "cpu")
+            else:
+                binding.bind_ortvalue_output(name, buffer)
+        self.session.run_with_iobinding(binding, self.run_options)
+        return cast(List[Any], binding.copy_outputs_to_cpu())
+
+    def _get_output_buffer(self, name: str, batch_size: int) -> Optional[Any]:
+        """
+        Returns this thread's preallocated buffer for the output and batch size, allocating it on first use, or
+        None if the output is allocated by ONNX Runtime.
+        """
+        if name not in self._preallocated_outputs or batch_size not in self._preallocated_batch_sizes:
+            return None
+        buffers: Optional[Dict[tuple[str, int], Any]] = getattr(self._output_buffers, "buffers", None)
+        if buffers is None:
+            buffers = self._output_buffers.buffers = {}
+        key = (name, batch_size)
+        if key not in buffers:
+            shape, dtype = self._preallocated_outputs[name]
+            buffers[key] = ort.OrtValue.ortvalue_from_shape_and_type([batch_size, *shape], dtype, "cpu")
+        return buffers[key]
+
     def get_outputs_for_session(self) -> list[str]:
         """
         Get the output names from the ONNX model session.
@@ -114,7 +304,7 @@ class MLClassifier:
         Returns:
             list[str]: List of output node names from the ONNX model.
         """
-        return [i.name for i in self.session.get_outputs()]
+        return self.output_names
 
     def get_inputs_for_session(self, conditions: list[str]) -> Dict[str, ndarray]:
         """
@@ -131,7 +321,7 @@ class MLClassifier:
                 transformed feature arrays in float32 format.
         """
         transformed_inputs = self.vectorizer.transform(conditions)
-        return {self.session.get_inputs()[0].name: transformed_inputs.toarray().astype(float32)}
+        return {self.input_name: transformed_inputs.toarray().astype(float32)}
 
     def clean_text(self, text: str) -> str:
         """
@@ -195,3 +385,103 @@ class MLClassifier:
             str: Version string extracted from model filenames.
         """
         return self.version
+
+
+def create_inference_session(model_file: str, options: Dict[str, Any]) -> ort.InferenceSession:
+    """
+    Creates the ONNX Runtime session for the model with the given session options.
+
+    When save_optimized_model is set, the graph optimized at the configured level is saved next to the model
+    file, and loaded without optimizing it again the next time, as long as it is newer than the model file.
+
+    Args:
+        model_file (str): Path to the ONNX model file.
+        options (Dict[str, Any]): Session options; any left out take the ONNX Runtime default.
+            - intra_op_num_threads (int): Threads used to run each operator; 0 for one per core.
+            - inter_op_num_threads (int): Threads used to run operators in parallel in parallel execution mode;
+              0 for one per core.
+            - graph_optimization_level (str): disable_all, basic, extended or all.
+            - execution_mode (str): sequential or parallel.
+            - enable_cpu_mem_arena (bool): Allocate tensors from a memory arena.
+            - enable_mem_pattern (bool): Preallocate memory using the allocation pattern of earlier runs.
+            - save_optimized_model (bool): Save the optimized graph and load it on later starts.
+
+    Raises:
+        ValueError: If the graph optimization level or execution mode is unknown.
+    """
+    optimization_level = options.get("graph_optimization_level", "all")
+    execution_mode = options.get("execution_mode", "sequential")
+    if optimization_level not in GRAPH_OPTIMIZATION_LEVELS:
+        raise ValueError(f"Unknown graph optimization level: {optimization_level}")
+    if execution_mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode: {execution_mode}")
+
+    def session_options(level: str) -> ort.SessionOptions:
+        sess_options = ort.SessionOptions()
+        sess_options.intra_op_num_threads = int(options.get("intra_op_num_threads", 0))
+        sess_options.inter_op_num_threads = int(options.get("inter_op_num_threads", 0))
+        sess_options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[level]
+        sess_options.execution_mode = EXECUTION_MODES[execution_mode]
+        sess_options.enable_cpu_mem_arena = bool(options.get("enable_cpu_mem_arena", True))
+        sess_options.enable_mem_pattern = bool(options.get("enable_mem_pattern", True))
+        return sess_options
+
+    if not options.get("save_optimized_model", False):
+        return ort.InferenceSession(model_file, sess_options=session_options(optimization_level))
+
+    # the optimization level is part of the file name, so changing it in the config doesn't load a stale graph
+    optimized_model_file = f"{os.path.splitext(model_file)[0]}.{optimization_level}.optimized.onnx"
+    if os.path.exists(optimized_model_file) and os.path.getmtime(optimized_model_file) >= os.path.getmtime(model_file):
+        try:
+            session = ort.InferenceSession(optimized_model_file, sess_options=session_options("disable_all"))
+            logging.info(f"Loaded the optimized ML model {optimized_model_file}")
+            return session
+        except Exception as e:
+            logging.warning(f"Could not load the optimized ML model, optimizing the model again: {e}")
+
+    sess_options = session_options(optimization_level)
+    sess_options.optimized_model_filepath = optimized_model_file
+    try:
+        return ort.InferenceSession(model_file, sess_options=sess_options)
+    except Exception as e:
+        logging.warning(f"Could not save the optimized ML model, loading the model without saving it: {e}")
+        return ort.InferenceSession(model_file, sess_options=session_options(optimization_level))
+
+
+def _preallocatable_outputs(outputs: Sequence[Any]) -> Dict[str, tuple[tuple[int, ...], Any]]:
+    """
+    Returns the shape (apart from the batch dimension) and numpy type of each of the session outputs that can be
+    written to a preallocated buffer: numeric tensors whose dimensions are fixed apart from the first. Label
+    tensors of strings and ZipMap outputs (sequences of maps) are left to ONNX Runtime to allocate.
+    """
+    preallocatable = {}
+    for output in outputs:
+        dtype = ONNX_TENSOR_TYPES.get(output.type)
+        shape = output.shape
+        if dtype is None or not shape or not all(isinstance(dim, int) for dim in shape[1:]):
+            continue
+        preallocatable[output.name] = (tuple(shape[1:]), dtype)
+    return preallocatable
+
+
+def top_k_predictions(probabilities: ndarray, labels: Sequence[str], k: int) -> List[List[tuple[str, float]]]:
+    """
+    Returns the k most probable labels and their probabilities for each row of the probability matrix, in
+    descending order of probability. The top k columns of each row are selected with a partial sort
+    (argpartition), so only those k are fully sorted.
+
+    Args:
+        probabilities (ndarray): Array with shape (n_samples, n_classes).
+        labels (Sequence[str]): Class labels, in the column order of the probability matrix.
+        k (int): Number of labels to return for each row; capped at the number of classes.
+
+    Raises:
+        ValueError: If k is not greater than zero.
+    """
+    if k <= 0:
+        raise ValueError("k must be greater than zero")
+    k = min(k, probabilities.shape[1])
+    top = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(probabilities, top, axis=1), axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    return [[(labels[j], float(probabilities[i, j])) for j in row] for i, row in enumerate(top)]
@@ -0,0 +1,256 @@
+"""
+ML inference server, so that API worker processes can share a single loaded ML classifier.
+
+Each API worker process normally loads its own ONNX session and vectorizer. In inference server mode
+one process holds the classifier and serves predictions over a Unix socket; the API workers use a
+RemoteMLClassifier, which has the same interface as MLClassifier, and do not load the model at all.
+
+Connections are authenticated with a shared key (the ML_INFERENCE_SERVER_AUTHKEY environment variable),
+and messages are exchanged as JSON.
+
+Usage: (from the codebase root directory, alongside the API workers)
+    ML_INFERENCE_SERVER_AUTHKEY=... poetry run python -m python_src.util.ml_inference_server
+
+Classes:
+    MLInferenceServer: Serves predictions from an MLClassifier over a Unix socket.
+    RemoteMLClassifier: Client for the inference server with the interface of MLClassifier.
+"""
+
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+from multiprocessing.connection import Client, Connection, Listener, answer_challenge, deliver_challenge
+from typing import Any, Dict, List, Optional
+
+from .ml_classifier import MLClassifier
+
+AUTHKEY_ENV_VAR = "ML_INFERENCE_SERVER_AUTHKEY"
+
+
+def get_authkey() -> bytes:
+    """
+    Returns the key used to authenticate connections to the inference server
+
+    Raises:
+        ValueError: If the ML_INFERENCE_SERVER_AUTHKEY environment variable is not set.
+    """
+    authkey = os.environ.get(AUTHKEY_ENV_VAR)
+    if not authkey:
+        raise ValueError(f"{AUTHKEY_ENV_VAR} must be set to use the ML inference server")
+    return authkey.encode()
+
+
+class MLInferenceServer:
+    """
+    Serves predictions from an MLClassifier over a Unix socket, handling each connection on its own thread.
+
+    Attributes:
+        classifier (MLClassifier): The classifier used for predictions.
+        socket_path (str): Path of the Unix socket the server listens on.
+    """
+
+    def __init__(self, classifier: MLClassifier, socket_path: str, authkey: bytes) -> None:
+        self.classifier = classifier
+        self.socket_path = socket_path
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self._authkey = authkey
+        self._listener = Listener(socket_path, family="AF_UNIX", authkey=authkey)
+        self._closed = threading.Event()
+
+    def serve_forever(self) -> None:
+        """
+        Accepts connections until the server is closed
+        """
+        logging.info(f"ML inference server listening on {self.socket_path}")
+        while not self._closed.is_set():
+            try:
+                connection = self._listener.accept()
+            except Exception as e:
+                if self._closed.is_set():
+                    break
+                # eg a client that failed authentication, or closed the connection during the handshake
+                logging.warning(f"ML inference server rejected a connection: {e}")
+                continue
+            if self._closed.is_set():
+                connection.close()
+                break
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def close(self) -> None:
+        self._closed.set()
+        # closing the listener does not interrupt a blocked accept(), so wake it with a connection
+        try:
+            Client(self.socket_path, family="AF_UNIX", authkey=self._authkey).close()
+        except Exception as e:
+            logging.debug(f"ML inference server was not accepting connections: {e}")
+        self._listener.close()
+
+    def _handle(self, connection: Connection) -> None:
+        with connection:
+            while True:
+                try:
+                    request = json.loads(connection.recv_bytes())
+                except (EOFError, OSError):
+                    return
+                try:
+                    response = self._respond(request)
+                except Exception as e:
+                    logging.error(f"ML inference server request failed: {e}")
+                    response = {"error": str(e)}
+                try:
+                    connection.send_bytes(json.dumps(response).encode())
+                except OSError:
+                    # the client closed the connection, eg after timing out waiting for the response
+                    return
+
+    def _respond(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        method = request.get("method")
+        if method == "predict":
+            predictions = self.classifier.make_predictions(request["texts"])
+            return {"predictions": [(str(label), float(probability)) for label, probability in predictions]}
+        if method == "predict_top_k":
+            top_k = self.classifier.make_top_k_predictions(request["texts"], request["k"])
+            return {"predictions": [[(str(label), float(probability)) for label, probability in row] for row in top_k]}
+        if method == "version":
+            return {"version": self.classifier.get_version()}
+        return {"error": f"Unknown method: {method}"}
+
+
+class RemoteMLClassifier:
+    """
+    Makes predictions with the ML classifier held by an MLInferenceServer. Each thread uses its own
+    connection to the server, and reconnects if the connection is lost.
+
+    Attributes:
+        socket_path (str): Path of the inference server's Unix socket.
+        timeout_seconds (float): How long to wait to connect to the server, and for each of its responses.
+        version: Version of the server's classifier, fetched on first use.
+    """
+
+    def __init__(self, socket_path: str, authkey: bytes, timeout_seconds: float = 5.0) -> None:
+        self.socket_path = socket_path
+        self.timeout_seconds = timeout_seconds
+        self._authkey = authkey
+        self._local = threading.local()
+        self.version: Optional[Any] = None
+
+    def _connect(self) -> Connection:
+        """
+        Connects and authenticates to the server, as multiprocessing.connection.Client does, but bounding the
+        connection and the authentication handshake by timeout_seconds
+        """
+        # Connection reads and writes the file descriptor directly, so the timeouts are set on the socket itself
+        # rather than with settimeout (which makes it non-blocking); a connect that waits for the server to accept
+        # it is bounded by the send timeout
+        seconds, fraction = divmod(self.timeout_seconds, 1)
+        timeval = struct.pack("ll", int(seconds), int(fraction * 1_000_000))
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, timeval)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, timeval)
+            try:
+                sock.connect(self.socket_path)
+            except BlockingIOError as e:
+                raise self._timeout_error() from e
+            connection = Connection(sock.detach())
+        try:
+            answer_challenge(connection, self._authkey)
+            deliver_challenge(connection, self._authkey)
+        except BlockingIOError as e:
+            connection.close()
+            raise self._timeout_error() from e
+        except BaseException:
+            connection.close()
+            raise
+        return connection
+
+    def _timeout_error(self) -> TimeoutError:
+        return TimeoutError(f"ML inference server did not respond within {self.timeout_seconds} seconds")
+
+    def _request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        connection: Optional[Connection] = getattr(self._local, "connection", None)
+        for attempt in range(2):
+            if connection is None:
+                connection = self._connect()
+                self._local.connection = connection
+            try:
+                connection.send_bytes(json.dumps(request).encode())
+                if connection.poll(self.timeout_seconds):
+                    response: Dict[str, Any] = json.loads(connection.recv_bytes())
+                    return response
+            except (EOFError, OSError):
+                # the server may have restarted; retry once on a new connection
+                connection.close()
+                connection = self._local.connection = None
+                if attempt:
+                    raise
+                continue
+            # the server is not responding; the connection is dropped so that a late response is not read as the
+            # response to the next request, and the request is not retried so a hung server doesn't hold the
+            # classification threads for longer
+            connection.close()
+            self._local.connection = None
+            raise self._timeout_error()
+        raise ConnectionError("Could not reach the ML inference server")  # pragma: no cover
+
+    def make_predictions(self, conditions: list[str]) -> List[tuple[str, float]]:
+        """
+        Classify a list of medical conditions with the server's classifier.
+
+        Returns:
+            List[tuple[str, float]]: The predicted classification name and probability for each condition,
+                or ("error", 0.0) for each condition if the server could not be reached.
+        """
+        try:
+            response = self._request({"method": "predict", "texts": conditions})
+            return [(label, probability) for label, probability in response["predictions"]]
+        except Exception as e:
+            logging.error(f"ML inference server request failed: {e}")
+            return [("error", 0.0)] * len(conditions)
+
+    def make_top_k_predictions(self, conditions: list[str], k: int) -> List[List[tuple[str, float]]]:
+        """
+        Classify a list of medical conditions with the server's classifier, returning the k most probable
+        classifications of each.
+
+        Returns:
+            List[List[tuple[str, float]]]: The classification names and probabilities for each condition, or
+                [("error", 0.0)] for each condition if the server could not be reached.
+        """
+        try:
+            response = self._request({"method": "predict_top_k", "texts": conditions, "k": k})
+            return [[(label, probability) for label, probability in row] for row in response["predictions"]]
+        except Exception as e:
+            logging.error(f"ML inference server request failed: {e}")
+            return [[("error", 0.0)] for _ in conditions]
+
+    def get_version(self) -> Any:
+        """
+        Get the version of the server's classifier, as a tuple of the model and vectorizer filenames.
+        """
+        if self.version is None:
+            try:
+                self.version = tuple(self._request({"method": "version"})["version"])
+            except Exception as e:
+                logging.error(f"ML inference server request failed: {e}")
+                return "unknown"
+        return self.version
+
+
+def main() -> None:
+    from .app_utilities import app_config
+    from .ml_utilities import load_ml_classifier
+
+    classifier = load_ml_classifier(app_config, allow_remote=False)
+    if not isinstance(classifier, MLClassifier):
+        raise SystemExit("ML classifier could not be initialized")
+
+    socket_path = app_config["ml_classifier"]["inference"]["server"]["socket_path"]
+    MLInferenceServer(classifier, socket_path, get_authkey()).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
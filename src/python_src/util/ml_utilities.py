@@ -17,9 +17,10 @@ ml_classifier
 
 import logging
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 
 from .ml_classifier import MLClassifier
+from .ml_inference_server import RemoteMLClassifier, get_authkey
 from .s3_utilities import download_ml_models_from_s3, verify_file_sha256
 
 
@@ -39,7 +40,9 @@ def get_model_file_paths(app_config: Dict[str, Any]) -> tuple[str, str]:
     return model_file, vectorizer_file
 
 
-def load_ml_classifier(app_config: Dict[str, Any]) -> Optional[MLClassifier]:
+def load_ml_classifier(
+    app_config: Dict[str, Any], allow_remote: bool = True
+) -> Optional[Union[MLClassifier, RemoteMLClassifier]]:
     """
     Load and initialize the ML classifier with proper model verification.
 
@@ -50,18 +53,35 @@ def load_ml_classifier(app_config: Dict[str, Any]) -> Optional[MLClassifier]:
     - S3 download when needed
     - Classifier initialization
 
+    When the ML inference server is enabled, a client for the server is returned instead and no
+    model files are loaded.
+
     Args:
         app_config (Dict[str, Any]): Application configuration dictionary containing
                                    ML classifier settings, file paths, and verification options.
+        allow_remote (bool): Return a client for the ML inference server if it is enabled. The
+                           inference server itself passes False to load the model.
 
     Returns:
-        Optional[MLClassifier]: Initialized ML classifier instance if successful,
+        Optional[Union[MLClassifier, RemoteMLClassifier]]: Initialized ML classifier instance if successful,
                               None if initialization fails.
 
     Note:
         SHA verification can be disabled via the DISABLE_SHA_VERIFICATION environment
         variable for development purposes.
     """
+    server_config = app_config["ml_classifier"].get("inference", {}).get("server", {})
+    if allow_remote and server_config.get("enabled"):
+        try:
+            remote_classifier = RemoteMLClassifier(
+                server_config["socket_path"], get_authkey(), server_config.get("timeout_seconds", 5.0)
+            )
+            logging.info(f"ML classifier using the inference server at {server_config['socket_path']}")
+            return remote_classifier
+        except ValueError as e:
+            logging.error(f"ML classifier will not be available - {e}")
+            return None
+
     # Load ML classifier configuration
     model_directory = os.path.join(os.path.dirname(__file__), app_config["ml_classifier"]["storage"]["local_directory"])
 
@@ -131,7 +151,16 @@ def load_ml_classifier(app_config: Dict[str, Any]) -> Optional[MLClassifier]:
     ml_classifier = None
     if os.path.exists(model_file) and os.path.exists(vectorizer_file):
         try:
-            ml_classifier = MLClassifier(model_file, vectorizer_file)
+            inference_config = app_config["ml_classifier"].get("inference", {})
+            io_binding_config = inference_config.get("io_binding", {})
+            ml_classifier = MLClassifier(
+                model_file,
+                vectorizer_file,
+                sparse_inference=inference_config.get("sparse_scoring", False),
+                io_binding=io_binding_config.get("enabled", False),
+                preallocated_batch_sizes=io_binding_config.get("preallocated_batch_sizes", []),
+                session_options=inference_config.get("session_options"),
+            )
             logging.info("ML classifier initialized successfully")
         except Exception as e:
             logging.error(f"Failed to initialize ML classifier: {e}")
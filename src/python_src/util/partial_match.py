@@ -0,0 +1,70 @@
+"""
+Partial matching of contention text against the expanded lookup table.
+
+The expanded lookup table only matches when the normalized words of the contention text are exactly the
+words of one of its keys, so text with a single extra word falls through to the ML classifier. The
+PartialMatcher finds the largest key whose words are all contained in the text, using an inverted index
+from each word to the keys that contain it, and scores the match by the share of the text's words that
+the key accounts for.
+
+Classes:
+    PartialMatcher: Finds the largest lookup table key contained in a set of words.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+
+class PartialMatcher:
+    """
+    Inverted index over the keys of the expanded lookup table.
+
+    Attributes:
+        min_confidence (float): Smallest share of the text's words that a matched key must account for.
+        max_input_tokens (int): Texts with more words than this are not matched, which bounds the work done
+            per lookup (and long texts are unlikely to describe a single condition).
+    """
+
+    def __init__(
+        self, lookup_table: Mapping[FrozenSet[str], Dict[str, Any]], min_confidence: float, max_input_tokens: int
+    ) -> None:
+        if not 0 < min_confidence <= 1:
+            raise ValueError("min_confidence must be greater than 0 and at most 1")
+        if max_input_tokens <= 0:
+            raise ValueError("max_input_tokens must be greater than zero")
+        self.lookup_table = lookup_table
+        self.min_confidence = min_confidence
+        self.max_input_tokens = max_input_tokens
+
+        index: Dict[str, List[FrozenSet[str]]] = defaultdict(list)
+        for key in lookup_table:
+            for token in key:
+                index[token].append(key)
+        self.index = dict(index)
+
+    def match(self, tokens: FrozenSet[str]) -> Optional[Tuple[FrozenSet[str], float]]:
+        """
+        Finds the largest key whose words are all in tokens, returning the key and its confidence (the share
+        of tokens it accounts for). Returns None if there is no such key, if its confidence is below
+        min_confidence, or if the largest keys contained in tokens map to different classifications.
+        """
+        if not tokens or len(tokens) > self.max_input_tokens:
+            return None
+
+        # a key is contained in the tokens when each of its words was seen
+        hits: Dict[FrozenSet[str], int] = defaultdict(int)
+        for token in tokens:
+            for key in self.index.get(token, ()):
+                hits[key] += 1
+        contained = [key for key, count in hits.items() if count == len(key)]
+        if not contained:
+            return None
+
+        largest = max(len(key) for key in contained)
+        confidence = largest / len(tokens)
+        if confidence < self.min_confidence:
+            return None
+        best = [key for key in contained if len(key) == largest]
+        if len({self.lookup_table[key]["classification_code"] for key in best}) > 1:
+            return None
+        return min(best, key=sorted), confidence
@@ -0,0 +1,374 @@
+"""
+Lazily constructed shared resources.
+
+Building the lookup tables and loading the ML classifier (which may include an S3 download and SHA-256
+verification of the model files) is too slow to do whenever app_utilities is imported, eg by the
+documentation and simulation scripts. Instead each resource is registered with a factory and built the
+first time it is used, or when the registry is warmed up at application startup.
+
+The resources of each generation are held by an immutable snapshot. A reload builds a whole new snapshot and
+swaps it in with a single assignment, and each request pins the snapshot that was current when it started (see
+ResourceRegistry.pin_snapshot), so a request never sees a mix of old and new resources.
+
+Classes
+-------
+LazyResource
+    A resource that is constructed on first use
+ResourceSnapshot
+    The resources of one generation
+RegisteredResource
+    A registered resource, resolved in the snapshot in use
+ResourceProxy
+    Stands in for a resource (or one of its attributes), constructing it when it is first used
+ResourceRegistry
+    The set of shared resources, with a warm-up hook that constructs them all concurrently and a reload
+    hook that rebuilds them and swaps them in
+ReloadSignal
+    Tells the other worker processes that the resources were reloaded, through a file shared by the workers
+
+Exceptions
+----------
+ReloadInProgressError
+    Raised when a reload is requested while another one is still running
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, Token
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Generic, Iterator, List, Mapping, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class ReloadInProgressError(RuntimeError):
+    """
+    Raised by ResourceRegistry.reload when another reload is still running
+    """
+
+
+class LazyResource(Generic[T]):
+    """
+    A resource that is constructed by its factory the first time it is used. Construction is thread-safe:
+    if several threads use the resource at once, the factory runs once and the other threads wait for it.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]) -> None:
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value: Optional[T] = None
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> T:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    start_time = time.perf_counter()
+                    self._value = self._factory()
+                    self.load_seconds = time.perf_counter() - start_time
+                    self._loaded = True
+                    logging.info(f"Loaded {self.name} in {self.load_seconds:.3f}s")
+        return self._value  # type: ignore[return-value]
+
+    @classmethod
+    def loaded_with(cls, name: str, factory: Callable[[], T], value: T, load_seconds: float) -> "LazyResource[T]":
+        """
+        Returns a resource that has already been constructed, eg by a reload
+        """
+        resource = cls(name, factory)
+        resource._value = value
+        resource.load_seconds = load_seconds
+        resource._loaded = True
+        return resource
+
+    @property
+    def value(self) -> Optional[T]:
+        """
+        The constructed value, or None if the resource has not been constructed; unlike get, never constructs it
+        """
+        return self._value
+
+    @property
+    def factory(self) -> Callable[[], T]:
+        return self._factory
+
+    def proxy(self, attribute: Optional[str] = None) -> "ResourceProxy":
+        return ResourceProxy(self, attribute)
+
+
+class ResourceSnapshot:
+    """
+    The resources of one generation, by name. Snapshots are not changed once they are in use: a reload
+    creates a new one, with the next generation number.
+    """
+
+    __slots__ = ("generation", "_resources")
+
+    def __init__(self, generation: int, resources: Mapping[str, LazyResource[Any]]) -> None:
+        self.generation = generation
+        self._resources: Mapping[str, LazyResource[Any]] = MappingProxyType(dict(resources))
+
+    def __getitem__(self, name: str) -> LazyResource[Any]:
+        return self._resources[name]
+
+    def __iter__(self) -> Iterator[LazyResource[Any]]:
+        return iter(self._resources.values())
+
+    def with_resource(self, resource: LazyResource[Any]) -> "ResourceSnapshot":
+        return ResourceSnapshot(self.generation, {**self._resources, resource.name: resource})
+
+
+class RegisteredResource(Generic[T]):
+    """
+    A registered resource. Its value is looked up in the registry's snapshot in use (see
+    ResourceRegistry.snapshot), so it refers to the new value once a reload has swapped it in.
+    """
+
+    def __init__(self, registry: "ResourceRegistry", name: str) -> None:
+        self.registry = registry
+        self.name = name
+
+    @property
+    def resource(self) -> LazyResource[T]:
+        return self.registry.snapshot()[self.name]
+
+    @property
+    def loaded(self) -> bool:
+        return self.resource.loaded
+
+    @property
+    def load_seconds(self) -> Optional[float]:
+        return self.resource.load_seconds
+
+    @property
+    def factory(self) -> Callable[[], T]:
+        return self.resource.factory
+
+    def get(self) -> T:
+        return self.resource.get()
+
+    def proxy(self, attribute: Optional[str] = None) -> "ResourceProxy":
+        return ResourceProxy(self, attribute)
+
+
+class ResourceProxy:
+    """
+    Stands in for a lazy resource, or for an attribute of it, so that modules can import the resource
+    by name without constructing it. Attribute access (including setting attributes, eg by mock.patch),
+    len, iteration, membership and truth testing are forwarded to the resource, constructing it if needed.
+    isinstance checks against the resource's class also pass.
+    """
+
+    __slots__ = ("_resource", "_attribute")
+
+    def __init__(self, resource: "LazyResource[Any] | RegisteredResource[Any]", attribute: Optional[str] = None) -> None:
+        self._resource = resource
+        self._attribute = attribute
+
+    def _target(self) -> Any:
+        value = self._resource.get()
+        return getattr(value, self._attribute) if self._attribute else value
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._target(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in ResourceProxy.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._target(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._target(), name)
+
+    @property  # type: ignore[misc]
+    def __class__(self) -> type:
+        return type(self._target())
+
+    def __len__(self) -> int:
+        return len(self._target())
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._target())
+
+    def __contains__(self, item: object) -> bool:
+        return item in self._target()
+
+    def __bool__(self) -> bool:
+        return bool(self._target())
+
+    def __repr__(self) -> str:
+        name = f"{self._resource.name}.{self._attribute}" if self._attribute else self._resource.name
+        if not self._resource.loaded:
+            return f"<ResourceProxy {name} (not loaded)>"
+        return f"<ResourceProxy {name}: {self._target()!r}>"
+
+
+class ResourceRegistry:
+    """
+    The shared resources of the application, in the order they were registered.
+
+    The current snapshot holds the resources in use. Requests pin the snapshot that is current when they start
+    (pin_snapshot), and use it until they finish, even if a reload swaps in a new one in the meantime.
+    """
+
+    def __init__(self) -> None:
+        self._snapshot = ResourceSnapshot(0, {})
+        self._pinned: ContextVar[Optional[ResourceSnapshot]] = ContextVar("pinned_resource_snapshot", default=None)
+        self._reload_lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], T]) -> RegisteredResource[T]:
+        if name in self.names():
+            raise ValueError(f"Resource {name} is already registered")
+        self._snapshot = self._snapshot.with_resource(LazyResource(name, factory))
+        return RegisteredResource(self, name)
+
+    def names(self) -> List[str]:
+        return [r.name for r in self._snapshot]
+
+    def snapshot(self) -> ResourceSnapshot:
+        """
+        Returns the snapshot pinned by the current request, or the current snapshot outside of a request
+        """
+        pinned = self._pinned.get()
+        return pinned if pinned is not None else self._snapshot
+
+    def pin_snapshot(self) -> Token[Optional[ResourceSnapshot]]:
+        """
+        Pins the current snapshot for the rest of the current context (and the contexts copied from it, eg by
+        run_in_classification_executor), returning a token for unpin_snapshot
+        """
+        return self._pinned.set(self._snapshot)
+
+    def unpin_snapshot(self, token: Token[Optional[ResourceSnapshot]]) -> None:
+        self._pinned.reset(token)
+
+    def __getitem__(self, name: str) -> LazyResource[Any]:
+        return self.snapshot()[name]
+
+    def __iter__(self) -> Iterator[LazyResource[Any]]:
+        return iter(self.snapshot())
+
+    @property
+    def ready(self) -> bool:
+        return all(r.loaded for r in self._snapshot)
+
+    def pending(self) -> List[str]:
+        return [r.name for r in self._snapshot if not r.loaded]
+
+    def warm_up(self) -> Dict[str, float]:
+        """
+        Constructs every resource that has not been constructed yet, each on its own thread (the slow parts of
+        loading, such as downloading and hashing the model files, release the GIL), and returns the time taken
+        to construct each resource in seconds. Raises the first error raised by a factory, once all of the
+        resources have finished loading.
+        """
+        resources = list(self._snapshot)
+        with ThreadPoolExecutor(max_workers=max(len(resources), 1), thread_name_prefix="warm-up") as executor:
+            futures = [executor.submit(r.get) for r in resources]
+        for future in futures:
+            future.result()
+        return self.load_times()
+
+    def load_times(self) -> Dict[str, float]:
+        return {r.name: r.load_seconds for r in self._snapshot if r.load_seconds is not None}
+
+    @property
+    def reloading(self) -> bool:
+        return self._reload_lock.locked()
+
+    def reload(self, factories: Optional[Dict[str, Callable[[], Any]]] = None) -> Dict[str, Any]:
+        """
+        Builds a new value for every resource, using the given factories in place of the registered ones,
+        while the current values stay in use. Once all of them have been built, a new snapshot holding them is
+        swapped in with a single assignment. Requests already in progress keep the snapshot they pinned, so
+        they finish with the values they started with. If any of them fails to build, the error is raised and
+        nothing is swapped in.
+
+        Raises ReloadInProgressError (without waiting) if another reload is still running.
+
+        Returns the values that were replaced (None for resources that had not been constructed), so that the
+        caller can release them.
+        """
+        factories = factories or {}
+        # checked and taken in one step, so that two concurrent reloads cannot both start
+        if not self._reload_lock.acquire(blocking=False):
+            raise ReloadInProgressError("A reload is already in progress")
+        try:
+            current = self._snapshot
+            resources = list(current)
+            with ThreadPoolExecutor(max_workers=max(len(resources), 1), thread_name_prefix="reload") as executor:
+                futures = {r.name: executor.submit(_timed, factories.get(r.name, r.factory)) for r in resources}
+            new_values = {name: future.result() for name, future in futures.items()}
+            self._snapshot = ResourceSnapshot(
+                current.generation + 1,
+                {
+                    r.name: LazyResource.loaded_with(r.name, factories.get(r.name, r.factory), *new_values[r.name])
+                    for r in resources
+                },
+            )
+            for name, (_, load_seconds) in new_values.items():
+                logging.info(f"Reloaded {name} in {load_seconds:.3f}s")
+        finally:
+            self._reload_lock.release()
+        return {r.name: r.value for r in resources}
+
+
+class ReloadSignal:
+    """
+    Tells the other uvicorn workers that the shared resources were reloaded. Each worker has its own registry,
+    so a reload request only reloads the worker that handles it; that worker then publishes the signal by
+    replacing a file shared by the workers, and each worker checks the file on every request (a stat call) to
+    find out that it should reload too.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # a worker that starts after a reload already uses the reloaded configuration
+        self._seen = self._version()
+
+    def _version(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # the file is replaced by each signal, so its inode changes even if its modification time does not
+        return stat.st_ino, stat.st_mtime_ns
+
+    def publish(self) -> None:
+        """
+        Signals the other workers to reload
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(f"{time.time()} {os.getpid()}\n")
+        os.replace(temp_path, self.path)
+        self._seen = self._version()
+
+    def check(self) -> bool:
+        """
+        Returns True, once, if another worker has published the signal since this one last published or saw it
+        """
+        version = self._version()
+        if version == self._seen:
+            return False
+        self._seen = version
+        return True
+
+
+def _timed(factory: Callable[[], T]) -> Tuple[T, float]:
+    start_time = time.perf_counter()
+    value = factory()
+    return value, time.perf_counter() - start_time
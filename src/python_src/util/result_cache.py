@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Bounded, thread-safe least-recently-used cache for classification results.
+
+    Attributes:
+    ----------
+    max_size: int
+        Maximum number of entries held before the least recently used entry is evicted.
+        A max_size of 0 disables the cache.
+    hits: int
+        Number of lookups that found a cached value
+    misses: int
+        Number of lookups that did not find a cached value
+    evictions: int
+        Number of entries evicted to keep the cache within max_size
+    """
+
+    def __init__(self, max_size: int) -> None:
+        if max_size < 0:
+            raise ValueError("max_size must be zero or greater")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[K, V] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> Optional[V]:
+        """
+        Returns the cached value for the key, or None if it is not cached
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: K, value: V) -> None:
+        """
+        Caches the value for the key, evicting the least recently used entry if the cache is full
+        """
+        if not self.max_size:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Invalidates all cached values, eg when the lookup tables or ML model are reloaded
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
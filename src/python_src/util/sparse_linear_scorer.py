@@ -0,0 +1,143 @@
+"""
+Sparse scoring engine for linear classifier ONNX models.
+
+The ONNX model produced for the logistic regression classifier expects a dense float32 feature matrix,
+which forces the (very sparse) TF-IDF output of the vectorizer to be densified into an
+n x vocabulary array on every request. This module pulls the weights out of the ONNX graph and
+scores the sparse feature matrix directly, producing the same labels and probabilities as the
+ONNX session.
+
+Classes:
+    SparseLinearScorer: Scores sparse feature matrices with the weights of a linear classifier ONNX graph.
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+import onnx
+from numpy import float32, ndarray
+from onnx import helper
+
+# operators that can appear in the graph alongside the LinearClassifier without changing its scores
+SUPPORTED_PASSTHROUGH_OPS = {"Identity", "Cast", "ZipMap"}
+SUPPORTED_POST_TRANSFORMS = {"NONE", "LOGISTIC", "SOFTMAX"}
+
+
+class SparseLinearScorer:
+    """
+    Scores sparse feature matrices using the coefficients and intercepts of a linear classifier.
+
+    Attributes:
+        coefficients (ndarray): Transposed coefficient matrix with shape (n_features, n_classes).
+        intercepts (ndarray): Intercepts with shape (n_classes,).
+        labels (list[str]): Class labels, in the column order of the coefficient matrix.
+        post_transform (str): Transform applied to the raw scores, one of NONE, LOGISTIC or SOFTMAX.
+        l1_normalize (bool): Whether the transformed scores are L1-normalized into probabilities.
+    """
+
+    def __init__(
+        self,
+        coefficients: ndarray,
+        intercepts: ndarray,
+        labels: List[str],
+        post_transform: str = "NONE",
+        l1_normalize: bool = False,
+    ) -> None:
+        if post_transform not in SUPPORTED_POST_TRANSFORMS:
+            raise ValueError(f"Unsupported post_transform: {post_transform}")
+        if coefficients.shape[0] != len(labels) or intercepts.shape[0] != len(labels):
+            raise ValueError("Coefficients and intercepts must have one row per class label")
+
+        self.coefficients = np.ascontiguousarray(coefficients.T, dtype=float32)
+        self.intercepts = intercepts.astype(float32)
+        self.labels = labels
+        self.post_transform = post_transform
+        self.l1_normalize = l1_normalize
+
+    @classmethod
+    def from_onnx_model(cls, model_file: str) -> "SparseLinearScorer":
+        """
+        Build a scorer from the LinearClassifier node of an ONNX model file.
+
+        Args:
+            model_file (str): Path to the ONNX model file.
+
+        Raises:
+            ValueError: If the graph contains anything other than a single LinearClassifier, an optional
+                L1 Normalizer and pass-through operators (in which case the ONNX session must be used).
+        """
+        graph = onnx.load(model_file).graph
+
+        linear_classifiers = [n for n in graph.node if n.op_type == "LinearClassifier"]
+        if len(linear_classifiers) != 1:
+            raise ValueError("Expected exactly one LinearClassifier node in the ONNX graph")
+
+        l1_normalize = False
+        for node in graph.node:
+            if node.op_type == "Normalizer":
+                attributes = _get_attributes(node)
+                if attributes.get("norm") != "L1":
+                    raise ValueError(f"Unsupported Normalizer norm: {attributes.get('norm')}")
+                l1_normalize = True
+            elif node.op_type != "LinearClassifier" and node.op_type not in SUPPORTED_PASSTHROUGH_OPS:
+                raise ValueError(f"Unsupported operator in the ONNX graph: {node.op_type}")
+
+        attributes = _get_attributes(linear_classifiers[0])
+        labels = attributes.get("classlabels_strings")
+        if not labels:
+            raise ValueError("LinearClassifier does not define string class labels")
+
+        coefficients = np.asarray(attributes["coefficients"], dtype=float32).reshape(len(labels), -1)
+        intercepts = np.asarray(attributes.get("intercepts", [0.0] * len(labels)), dtype=float32)
+
+        return cls(coefficients, intercepts, labels, attributes.get("post_transform", "NONE"), l1_normalize)
+
+    def predict_proba(self, features: Any) -> ndarray:
+        """
+        Compute class probabilities for a sparse (or dense) feature matrix.
+
+        Args:
+            features: Matrix with shape (n_samples, n_features), typically the scipy sparse
+                output of the vectorizer.
+
+        Returns:
+            ndarray: float32 array with shape (n_samples, n_classes).
+        """
+        scores: ndarray = np.asarray(features.astype(float32) @ self.coefficients, dtype=float32)
+        scores += self.intercepts
+
+        if self.post_transform == "LOGISTIC":
+            scores = 1.0 / (1.0 + np.exp(-scores))
+        elif self.post_transform == "SOFTMAX":
+            scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+            scores /= scores.sum(axis=1, keepdims=True)
+
+        if self.l1_normalize:
+            norms = np.abs(scores).sum(axis=1, keepdims=True)
+            scores = np.divide(scores, norms, out=np.zeros_like(scores), where=norms != 0)
+
+        return scores.astype(float32, copy=False)
+
+    def predict(self, features: Any) -> List[tuple[str, float]]:
+        """
+        Predict the most likely label and its probability for each row of the feature matrix.
+
+        Returns:
+            List[tuple[str, float]]: The predicted label and probability for each row.
+        """
+        probabilities = self.predict_proba(features)
+        best = probabilities.argmax(axis=1)
+        return [(self.labels[j], float(probabilities[i, j])) for i, j in enumerate(best)]
+
+
+def _get_attributes(node: onnx.NodeProto) -> Dict[str, Any]:
+    """Returns the node attributes as python values, with byte strings decoded"""
+    attributes = {}
+    for attribute in node.attribute:
+        value = helper.get_attribute_value(attribute)
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        elif isinstance(value, list) and value and isinstance(value[0], bytes):
+            value = [v.decode("utf-8") for v in value]
+        attributes[attribute.name] = value
+    return attributes
@@ -0,0 +1,159 @@
+"""
+Timing of the stages of the classification pipeline.
+
+The process time middleware only records the total time taken by each request, which does not show where the
+time goes when latency regresses. The stages of the pipeline (request validation, the lookups, the ML
+classifier's vectorizer and inference, logging and response serialization) are timed with timed_stage, which
+reads the monotonic performance counter on entry and exit. Each stage's time is added to the stage's latency
+histogram (served by /metrics, see metrics.py), and to the stage times of the current request, which the API can
+return in a Server-Timing header and log alongside the process time.
+
+The stage times of a request are held in a context variable, so stages timed on other threads are attributed to
+the request as long as the context is copied to them (as run_in_classification_executor does). Work done on a
+thread shared by several requests, such as the ML prediction batcher's, is only counted in the histograms.
+
+Methods
+-------
+timed_stage
+    Context manager (or decorator) that times a stage
+start_request_stages
+    Start collecting the stage times of a request
+finish_request_stages
+    Stop collecting the stage times of a request and return them
+format_server_timing
+    Format stage times as a Server-Timing header value
+stage_latency_snapshot
+    Return the latency histogram of each stage, in seconds
+
+Classes
+-------
+StageTimedRoute
+    FastAPI route that times request validation and response serialization
+"""
+
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from functools import wraps
+from typing import Any, Callable, Coroutine, Dict, Iterator, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from .metrics import STAGE_DURATION, metrics
+
+_request_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stages", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    metrics.observe(STAGE_DURATION, seconds, stage=stage)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """
+    Times the enclosed block (or, used as a decorator, each call of the function) as the given stage. A stage
+    timed more than once during a request is reported as the total of its times.
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start_time)
+
+
+def start_request_stages() -> Token[Optional[Dict[str, float]]]:
+    return _request_stages.set({})
+
+
+def finish_request_stages(token: Token[Optional[Dict[str, float]]]) -> Dict[str, float]:
+    """
+    Returns the time in seconds spent in each stage since the matching start_request_stages call
+    """
+    stages = _request_stages.get() or {}
+    _request_stages.reset(token)
+    return stages
+
+
+def format_server_timing(stages: Dict[str, float], total_seconds: Optional[float] = None) -> str:
+    """
+    Formats the stage times as a Server-Timing header value, with durations in milliseconds
+    """
+    timings = [f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in stages.items()]
+    if total_seconds is not None:
+        timings.append(f"total;dur={total_seconds * 1000:.3f}")
+    return ", ".join(timings)
+
+
+def stage_latency_snapshot() -> Dict[str, Dict[str, Any]]:
+    """
+    Returns the latency histogram of each stage timed so far in this process
+    """
+    histograms = metrics.histogram_snapshot(STAGE_DURATION)
+    return {dict(labels)["stage"]: histogram for labels, histogram in sorted(histograms.items())}
+
+
+# times marked by StageTimedRoute's handler and endpoint wrapper: when the handler started and when the endpoint
+# returned (a dict rather than separate context variables, since sync endpoints run on another thread)
+_route_marks: ContextVar[Optional[Dict[str, float]]] = ContextVar("route_marks", default=None)
+
+
+def _timed_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    def mark_call() -> Optional[Dict[str, float]]:
+        marks = _route_marks.get()
+        if marks is not None:
+            record_stage("validate_request", time.perf_counter() - marks["started"])
+        return marks
+
+    if inspect.iscoroutinefunction(endpoint):
+
+        @wraps(endpoint)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            marks = mark_call()
+            result = await endpoint(*args, **kwargs)
+            if marks is not None:
+                marks["returned"] = time.perf_counter()
+            return result
+
+        return async_wrapper
+
+    @wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        marks = mark_call()
+        result = endpoint(*args, **kwargs)
+        if marks is not None:
+            marks["returned"] = time.perf_counter()
+        return result
+
+    return wrapper
+
+
+class StageTimedRoute(APIRoute):
+    """
+    Route that times the validation of the request (from the start of the route handler until the endpoint is
+    called, which is mostly pydantic parsing the body) as the validate_request stage, and the serialization of
+    the endpoint's result as the serialize_response stage.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            marks = {"started": time.perf_counter()}
+            token = _route_marks.set(marks)
+            try:
+                response = await handler(request)
+            finally:
+                _route_marks.reset(token)
+            if "returned" in marks:
+                record_stage("serialize_response", time.perf_counter() - marks["returned"])
+            return response
+
+        return timed_handler
@@ -0,0 +1,230 @@
+"""
+Precompiled taxonomy artifact, so that the lookup tables do not have to be rebuilt from the CSV files at startup.
+
+Building the lookup tables parses the diagnostic code and taxonomy CSVs and runs the expanded lookup table's
+normalization over every taxonomy term. The compile-taxonomy command does this once and writes the resulting
+tables to a JSON artifact, which the app loads at startup instead. JSON is used rather than pickle so that
+loading the artifact cannot execute code.
+
+The artifact records a hash of its source CSVs and of the config sections used to build it; if either has
+changed since the artifact was compiled, or the artifact's content hash does not match, the artifact is ignored
+and the tables are built from the CSVs.
+
+Usage: (from the codebase root directory)
+    poetry run compile-taxonomy
+
+Classes:
+    TaxonomyTables: The lookup tables and dropdown catalog built from the taxonomy.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .expanded_lookup_table import ExpandedLookupTable
+from .logging_dropdown_selections import DropdownCatalog, DropdownSelection, build_logging_table
+from .lookup_table import ContentionTextLookupTable, DiagnosticCodeLookupTable
+from .lookup_tables_utilities import InitValues
+
+ARTIFACT_FORMAT_VERSION = 1
+
+# config sections that change the contents of the tables
+TAXONOMY_CONFIG_SECTIONS = [
+    "lut_default_value",
+    "condition_dropdown_table",
+    "diagnostic_code_table",
+    "autosuggestion_table",
+    "common_words",
+    "musculoskeletal_lut",
+]
+
+
+@dataclass
+class TaxonomyTables:
+    dc_lookup_table: DiagnosticCodeLookupTable
+    dropdown_lookup_table: ContentionTextLookupTable
+    expanded_lookup_table: ExpandedLookupTable
+    dropdown_values: DropdownCatalog
+
+
+def build_taxonomy_tables(
+    app_config: Dict[str, Any],
+    diagnostic_code_inits: InitValues,
+    contention_text_inits: InitValues,
+    autosuggestions_path: str,
+) -> TaxonomyTables:
+    """
+    Builds the lookup tables and dropdown catalog from the CSV files
+    """
+    return TaxonomyTables(
+        dc_lookup_table=DiagnosticCodeLookupTable(init_values=diagnostic_code_inits),
+        dropdown_lookup_table=ContentionTextLookupTable(contention_text_inits),
+        expanded_lookup_table=ExpandedLookupTable(
+            init_values=contention_text_inits,
+            common_words=app_config["common_words"],
+            musculoskeletal_lut=app_config["musculoskeletal_lut"],
+            partial_match=app_config["expanded_lookup"]["partial_match"],
+            fuzzy_match=app_config["expanded_lookup"]["fuzzy_match"],
+        ),
+        dropdown_values=build_logging_table(
+            autosuggestions_path,
+            app_config["autosuggestion_table"]["autocomplete_terms"],
+            app_config["autosuggestion_table"]["active_autocomplete"],
+        ),
+    )
+
+
+def compute_source_hash(app_config: Dict[str, Any], source_files: List[str]) -> str:
+    """
+    Hashes the source CSV files and the config sections that the tables are built from
+    """
+    sha256 = hashlib.sha256()
+    sha256.update(f"format {ARTIFACT_FORMAT_VERSION}".encode())
+    sha256.update(json.dumps({k: app_config.get(k) for k in TAXONOMY_CONFIG_SECTIONS}, sort_keys=True).encode())
+    for source_file in source_files:
+        with open(source_file, "rb") as f:
+            sha256.update(hashlib.sha256(f.read()).digest())
+    return sha256.hexdigest()
+
+
+def _content_hash(tables: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(tables, sort_keys=True).encode()).hexdigest()
+
+
+def _serialize_tables(taxonomy: TaxonomyTables) -> Dict[str, Any]:
+    dropdown_selections = [taxonomy.dropdown_values.get(term) for term in taxonomy.dropdown_values]
+    return {
+        "dc_lookup_table": {
+            k: [v["classification_code"], v["classification_name"]]
+            for k, v in taxonomy.dc_lookup_table.classification_code_mappings.items()
+        },
+        "dropdown_lookup_table": {
+            k: [v["classification_code"], v["classification_name"]]
+            for k, v in taxonomy.dropdown_lookup_table.classification_code_mappings.items()
+        },
+        "expanded_lookup_table": [
+            [sorted(k), v["classification_code"], v["classification_name"]]
+            for k, v in taxonomy.expanded_lookup_table.contention_text_lookup_table.items()
+        ],
+        "dropdown_values": {
+            "terms": list(taxonomy.dropdown_values),
+            "selections": [[s.term, s.autosuggestion_column, s.row_index] for s in dropdown_selections if s is not None],
+            "rows": {str(s.row_index): s.row for s in dropdown_selections if s is not None},
+        },
+    }
+
+
+def _deserialize_tables(
+    tables: Dict[str, Any],
+    app_config: Dict[str, Any],
+    diagnostic_code_inits: InitValues,
+    contention_text_inits: InitValues,
+) -> TaxonomyTables:
+    rows = {int(k): v for k, v in tables["dropdown_values"]["rows"].items()}
+    selections = {
+        term: DropdownSelection(term, column, row_index, rows[row_index])
+        for term, column, row_index in tables["dropdown_values"]["selections"]
+    }
+    return TaxonomyTables(
+        dc_lookup_table=DiagnosticCodeLookupTable.from_mappings(
+            diagnostic_code_inits,
+            {
+                k: {"classification_code": code, "classification_name": name}
+                for k, (code, name) in tables["dc_lookup_table"].items()
+            },
+        ),
+        dropdown_lookup_table=ContentionTextLookupTable.from_mappings(
+            contention_text_inits,
+            {
+                k: {"classification_code": code, "classification_name": name}
+                for k, (code, name) in tables["dropdown_lookup_table"].items()
+            },
+        ),
+        expanded_lookup_table=ExpandedLookupTable.from_mappings(
+            contention_text_inits,
+            app_config["common_words"],
+            app_config["musculoskeletal_lut"],
+            {
+                frozenset(terms): {"classification_code": code, "classification_name": name}
+                for terms, code, name in tables["expanded_lookup_table"]
+            },
+            app_config["expanded_lookup"]["partial_match"],
+            app_config["expanded_lookup"]["fuzzy_match"],
+        ),
+        # terms can repeat in the catalog, so each one is looked up rather than zipped with the selections
+        dropdown_values=DropdownCatalog([selections[term] for term in tables["dropdown_values"]["terms"]]),
+    )
+
+
+def compile_taxonomy(taxonomy: TaxonomyTables, source_hash: str, artifact_path: str) -> str:
+    """
+    Writes the tables to the artifact file, returning the content hash of the tables
+    """
+    tables = _serialize_tables(taxonomy)
+    content_hash = _content_hash(tables)
+    artifact = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "source_hash": source_hash,
+        "content_hash": content_hash,
+        "tables": tables,
+    }
+    os.makedirs(os.path.dirname(artifact_path), exist_ok=True)
+    with open(artifact_path, "w") as f:
+        json.dump(artifact, f)
+    return content_hash
+
+
+def load_taxonomy_artifact(
+    artifact_path: str,
+    source_hash: str,
+    app_config: Dict[str, Any],
+    diagnostic_code_inits: InitValues,
+    contention_text_inits: InitValues,
+) -> Optional[TaxonomyTables]:
+    """
+    Loads the tables from the artifact file. Returns None (so that the tables are built from the CSVs instead)
+    if the artifact is missing, was compiled from different sources, or fails its content hash check.
+    """
+    if not os.path.exists(artifact_path):
+        logging.info("Taxonomy artifact not found - building lookup tables from CSV")
+        return None
+
+    try:
+        start_time = time.perf_counter()
+        with open(artifact_path) as f:
+            artifact = json.load(f)
+        if artifact.get("format_version") != ARTIFACT_FORMAT_VERSION or artifact.get("source_hash") != source_hash:
+            logging.warning("Taxonomy artifact is out of date - building lookup tables from CSV")
+            return None
+        if _content_hash(artifact["tables"]) != artifact.get("content_hash"):
+            logging.warning("Taxonomy artifact failed its content hash check - building lookup tables from CSV")
+            return None
+        taxonomy = _deserialize_tables(artifact["tables"], app_config, diagnostic_code_inits, contention_text_inits)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logging.warning(f"Taxonomy artifact could not be loaded ({e}) - building lookup tables from CSV")
+        return None
+
+    logging.info(f"Loaded taxonomy artifact in {time.perf_counter() - start_time:.3f}s")
+    return taxonomy
+
+
+def main() -> None:
+    from . import app_utilities
+
+    source_hash = compute_source_hash(app_utilities.app_config, app_utilities.taxonomy_source_files)
+    taxonomy = build_taxonomy_tables(
+        app_utilities.app_config,
+        app_utilities.diagnostic_code_inits,
+        app_utilities.dropdown_expanded_table_inits,
+        app_utilities.autosuggestions_path,
+    )
+    content_hash = compile_taxonomy(taxonomy, source_hash, app_utilities.taxonomy_artifact_path)
+    print(f"Wrote {app_utilities.taxonomy_artifact_path} (content hash {content_hash})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import re
+from string import ascii_letters, punctuation
+from typing import List
+
+# apostrophes are dropped so that 's and s' collapse onto the base word; all other punctuation becomes a space.
+# the backslash is kept, matching the original regex character class in which it acted as an escape
+_PUNCTUATION_TABLE = str.maketrans({c: ("" if c == "'" else " ") for c in punctuation if c != "\\"})
+_WORD_SPLIT = re.compile(r"(\w+)")
+_DIGITS = re.compile(r"\d")
+_SPACES = re.compile(r"\s{2,}")
+
+
+class TextNormalizer:
+    """
+    Normalizes contention text into the form used for keys of the expanded lookup table.
+
+    Produces the same output as the original regex pipeline (punctuation removal, removal of digits and
+    single letters, removal of common words, lowercasing) in a single tokenizing pass over the text. All
+    patterns are compiled once when the normalizer is built.
+
+    Attributes:
+    ----------
+    common_words: list[str]
+        List of common words that are removed from the text
+    """
+
+    def __init__(self, common_words: List[str]) -> None:
+        self.common_words = common_words
+        self._ascii_common_words = frozenset(w.lower() for w in common_words)
+        # unicode case-insensitive matching has special cases (eg "ſ" matches "s"), so non-ascii words are
+        # checked with the same regex the original pipeline used
+        self.common_words_regex = re.compile(rf"\b({'|'.join(common_words)})\b", re.IGNORECASE)
+
+    def _is_common_word(self, word: str) -> bool:
+        if word.isascii():
+            return word.lower() in self._ascii_common_words
+        return self.common_words_regex.fullmatch(word) is not None
+
+    def _normalize_word(self, word: str) -> str:
+        """
+        Returns the replacement for a single run of word characters
+        """
+        if len(word) == 1 and word in ascii_letters:
+            return " "
+        if not any(c.isdecimal() for c in word):
+            return " " if self._is_common_word(word) else word
+
+        # digits split the word into smaller words, each of which may be a common word
+        sub_words = _WORD_SPLIT.split(_DIGITS.sub(" ", word))
+        sub_words[1::2] = [" " if self._is_common_word(w) else w for w in sub_words[1::2]]
+        return "".join(sub_words)
+
+    def normalize(self, text: str) -> str:
+        """
+        Removes punctuation, digits, single letters and common words from the text, then collapses spaces
+        and lowercases the result
+        """
+        segments = _WORD_SPLIT.split(text.translate(_PUNCTUATION_TABLE))
+        segments[1::2] = [self._normalize_word(w) for w in segments[1::2]]
+        return _SPACES.sub(" ", "".join(segments)).strip().lower()
@@ -2,13 +2,14 @@
 
 import csv
 import json
-from typing import Dict, Union
+from typing import Dict, Iterator, Union
 from unittest.mock import mock_open, patch
 
 import pytest
 from fastapi.testclient import TestClient
 
 from src.python_src.api import app
+from src.python_src.util.result_cache import LRUCache
 
 # Export commonly used imports
 __all__ = ["pytest", "json", "csv", "mock_open", "patch", "TestClient"]
@@ -21,6 +22,16 @@ def setup_test_data() -> None:
     TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def empty_result_caches() -> Iterator[None]:
+    """Give each test empty result caches so that cached classifications do not leak between tests."""
+    with (
+        patch("src.python_src.util.classifier_utilities.contention_text_cache", LRUCache(1000)),
+        patch("src.python_src.util.classifier_utilities.ml_prediction_cache", LRUCache(1000)),
+    ):
+        yield
+
+
 # Common mock functions
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_env() -> None:
@@ -0,0 +1,86 @@
+"""
+ONNX graphs and training texts shared by the tests of the ML classifier and the sparse scoring engine, shaped like
+the linear classifiers exported from scikit-learn.
+"""
+
+import numpy as np
+import onnx
+from onnx import TensorProto, helper
+
+LABELS = ["Hearing Loss", "Knee", "Mental Disorders", "Tinnitus"]
+TRAINING_TEXTS = ["hearing loss", "knee pain", "ptsd anxiety depression", "ringing in ears", "left knee", "sleep"]
+
+
+def build_linear_classifier_model(
+    model_file: str, n_features: int, post_transform: str, norm: str = "L1", seed: int = 7
+) -> None:
+    """Writes an ONNX graph with the same structure as a scikit-learn logistic regression export"""
+    rng = np.random.default_rng(seed)
+    coefficients = rng.normal(size=(len(LABELS), n_features)).astype(np.float32)
+    intercepts = rng.normal(size=len(LABELS)).astype(np.float32)
+
+    nodes = [
+        helper.make_node(
+            "LinearClassifier",
+            ["input"],
+            ["label", "probability_tensor"],
+            domain="ai.onnx.ml",
+            classlabels_strings=LABELS,
+            coefficients=coefficients.flatten().tolist(),
+            intercepts=intercepts.tolist(),
+            multi_class=1,
+            post_transform=post_transform,
+        ),
+        helper.make_node("Identity", ["label"], ["output_label"]),
+        helper.make_node("Normalizer", ["probability_tensor"], ["probabilities"], domain="ai.onnx.ml", norm=norm),
+        helper.make_node("ZipMap", ["probabilities"], ["output_probability"], domain="ai.onnx.ml", classlabels_strings=LABELS),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "linear_classifier",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [None, n_features])],
+        [
+            helper.make_tensor_value_info("output_label", TensorProto.STRING, [None]),
+            helper.make_value_info(
+                "output_probability",
+                helper.make_sequence_type_proto(
+                    helper.make_map_type_proto(TensorProto.STRING, helper.make_tensor_type_proto(TensorProto.FLOAT, None))
+                ),
+            ),
+        ],
+    )
+    model = helper.make_model(
+        graph, opset_imports=[helper.make_opsetid("", 13), helper.make_opsetid("ai.onnx.ml", 1)], ir_version=8
+    )
+    onnx.save(model, model_file)
+
+
+def build_tensor_output_model(model_file: str, n_features: int, seed: int = 7) -> None:
+    """Writes a linear classifier graph whose outputs are numeric tensors (integer labels and no ZipMap)"""
+    rng = np.random.default_rng(seed)
+    coefficients = rng.normal(size=(len(LABELS), n_features)).astype(np.float32)
+    intercepts = rng.normal(size=len(LABELS)).astype(np.float32)
+    node = helper.make_node(
+        "LinearClassifier",
+        ["input"],
+        ["output_label", "output_probability"],
+        domain="ai.onnx.ml",
+        classlabels_ints=list(range(len(LABELS))),
+        coefficients=coefficients.flatten().tolist(),
+        intercepts=intercepts.tolist(),
+        multi_class=1,
+        post_transform="SOFTMAX",
+    )
+    graph = helper.make_graph(
+        [node],
+        "linear_classifier",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [None, n_features])],
+        [
+            helper.make_tensor_value_info("output_label", TensorProto.INT64, [None]),
+            helper.make_tensor_value_info("output_probability", TensorProto.FLOAT, [None, len(LABELS)]),
+        ],
+    )
+    model = helper.make_model(
+        graph, opset_imports=[helper.make_opsetid("", 13), helper.make_opsetid("ai.onnx.ml", 1)], ir_version=8
+    )
+    onnx.save(model, model_file)
@@ -0,0 +1,145 @@
+"""Tests for reloading the lookup tables and ML classifier without a restart."""
+
+import threading
+from pathlib import Path
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+from pytest import MonkeyPatch
+
+from src.python_src.util import app_utilities
+from src.python_src.util.app_utilities import app_config
+from src.python_src.util.ml_batcher import MLPredictionBatcher
+from src.python_src.util.resource_registry import RegisteredResource, ReloadInProgressError, ReloadSignal, ResourceRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch: MonkeyPatch) -> Iterator[ResourceRegistry]:
+    """Replaces the shared resources with stand-ins, so that reloading does not affect other tests."""
+    old_batcher = MagicMock(spec=MLPredictionBatcher)
+    registry = ResourceRegistry()
+    registry.register("taxonomy", lambda: "old tables")
+    ml_classifier_resource: RegisteredResource[object] = registry.register("ml_classifier", lambda: old_batcher)
+    registry.register("ml_confidence_thresholds", lambda: (0.0, {}))
+    registry.warm_up()
+    monkeypatch.setattr(app_utilities, "resources", registry)
+    monkeypatch.setattr(app_utilities, "ml_classifier_resource", ml_classifier_resource)
+    yield registry
+
+
+def test_reload_resources(registry: ResourceRegistry, monkeypatch: MonkeyPatch) -> None:
+    new_classifier = MagicMock()
+    monkeypatch.setattr(app_utilities, "load_taxonomy", lambda config: "new tables")
+    monkeypatch.setattr(app_utilities, "load_predictor", lambda config: new_classifier)
+    monkeypatch.setattr(app_utilities, "get_ml_confidence_thresholds", lambda config: (0.5, {3140: 0.8}))
+    old_batcher = registry["ml_classifier"].get()
+    app_utilities.contention_text_cache.put("key", ({}, None))
+
+    load_times = app_utilities.reload_resources()
+
+    assert set(load_times) == {"taxonomy", "ml_classifier", "ml_confidence_thresholds"}
+    assert registry["ml_confidence_thresholds"].get() == (0.5, {3140: 0.8})
+    assert registry["taxonomy"].get() == "new tables"
+    assert registry["ml_classifier"].get() is new_classifier
+    old_batcher.close.assert_called_once()
+    assert app_utilities.contention_text_cache.get("key") is None
+
+
+def test_reload_keeps_ml_classifier_that_cannot_be_replaced(registry: ResourceRegistry, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(app_utilities, "load_taxonomy", lambda config: "new tables")
+    monkeypatch.setattr(app_utilities, "load_predictor", lambda config: None)
+    old_batcher = registry["ml_classifier"].get()
+
+    with pytest.raises(ValueError):
+        app_utilities.reload_resources()
+
+    assert registry["taxonomy"].get() == "old tables"
+    assert registry["ml_classifier"].get() is old_batcher
+    old_batcher.close.assert_not_called()
+
+
+def test_reload_endpoint_is_disabled_without_token(test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.delenv("ADMIN_RELOAD_TOKEN", raising=False)
+    response = test_client.post("/admin/reload", headers={"X-Admin-Token": ""})
+    assert response.status_code == 404
+
+
+def test_reload_endpoint_rejects_invalid_token(test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("ADMIN_RELOAD_TOKEN", "secret")
+    response = test_client.post("/admin/reload", headers={"X-Admin-Token": "guess"})
+    assert response.status_code == 403
+    assert response.json() == {"detail": "Invalid admin token"}
+
+
+@patch("src.python_src.api.reload_resources", return_value={"taxonomy": 0.03, "ml_classifier": 0.5})
+def test_reload_endpoint(mock_reload: MagicMock, test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("ADMIN_RELOAD_TOKEN", "secret")
+    response = test_client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json() == {"status": "reloaded", "load_seconds": {"taxonomy": 0.03, "ml_classifier": 0.5}}
+    mock_reload.assert_called_once()
+
+
+@patch("src.python_src.api.reload_resources", side_effect=FileNotFoundError("no such taxonomy"))
+def test_reload_endpoint_failure(mock_reload: MagicMock, test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("ADMIN_RELOAD_TOKEN", "secret")
+    response = test_client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Reload failed, the current resources are still in use: no such taxonomy"}
+
+
+@patch("src.python_src.api.reload_resources", side_effect=ReloadInProgressError("A reload is already in progress"))
+def test_reload_endpoint_reload_in_progress(mock_reload: MagicMock, test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("ADMIN_RELOAD_TOKEN", "secret")
+    response = test_client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 409
+    assert response.json() == {"detail": "A reload is already in progress"}
+
+
+@patch("src.python_src.api.reload_resources", return_value={"taxonomy": 0.03})
+def test_reload_endpoint_signals_other_workers(
+    mock_reload: MagicMock, test_client: TestClient, monkeypatch: MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setenv("ADMIN_RELOAD_TOKEN", "secret")
+    signal_path = str(tmp_path / "reload_signal")
+    other_worker = ReloadSignal(signal_path)
+    monkeypatch.setattr("src.python_src.api.reload_signal", ReloadSignal(signal_path))
+
+    response = test_client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == 200
+    assert other_worker.check()
+
+
+def test_reload_endpoint_refuses_several_workers_without_signal(test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("ADMIN_RELOAD_TOKEN", "secret")
+    monkeypatch.setattr("src.python_src.api.reload_signal", None)
+    monkeypatch.setitem(app_config["metrics"], "multiprocess_dir", "/tmp/metrics")
+
+    response = test_client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == 409
+
+
+def test_worker_follows_reload_of_another_worker(test_client: TestClient, monkeypatch: MonkeyPatch, tmp_path: Path) -> None:
+    signal_path = str(tmp_path / "reload_signal")
+    monkeypatch.setattr("src.python_src.api.reload_signal", ReloadSignal(signal_path))
+    reloaded = threading.Event()
+
+    def reload() -> dict[str, float]:
+        reloaded.set()
+        return {"taxonomy": 0.03}
+
+    mock_reload = MagicMock(side_effect=reload)
+    monkeypatch.setattr("src.python_src.api.reload_resources", mock_reload)
+
+    test_client.get("/health")
+    assert not reloaded.is_set()
+
+    ReloadSignal(signal_path).publish()
+    test_client.get("/health")
+    assert reloaded.wait(timeout=5)
+    test_client.get("/health")
+    mock_reload.assert_called_once()
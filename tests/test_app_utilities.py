@@ -46,8 +46,9 @@ def test_skip_download_when_files_exist(
     mock_os_remove: MagicMock,
 ) -> None:
     """Test that S3 download is skipped when model files exist locally."""
-    # Reload module to trigger import-time logic
+    # Reload module to get a fresh resource registry, then load the ML classifier
     reload(app_utilities)
+    app_utilities.ml_classifier_resource.get()
 
     # Verify download was not called since files exist
     mock_download.assert_not_called()
@@ -56,3 +57,26 @@ def test_skip_download_when_files_exist(
     # mock_onnx_session.assert_called_once_with(app_utilities.model_file)
     # mock_joblib.assert_called_once_with(app_utilities.vectorizer_file)
     assert app_utilities.ml_classifier is not None
+
+
+@patch("src.python_src.util.ml_classifier.ort.InferenceSession")
+@patch("src.python_src.util.ml_classifier.joblib.load")
+def test_import_does_not_load_resources(mock_joblib: MagicMock, mock_onnx_session: MagicMock) -> None:
+    """Test that the lookup tables and ML classifier are not built when the module is imported."""
+    reload(app_utilities)
+
+    assert not any(resource.loaded for resource in app_utilities.resources)
+    mock_onnx_session.assert_not_called()
+    mock_joblib.assert_not_called()
+
+    # using a table builds the tables, but not the ML classifier
+    assert len(app_utilities.dc_lookup_table) > 0
+    assert app_utilities.taxonomy_resource.loaded
+    assert not app_utilities.ml_classifier_resource.loaded
+
+
+def test_ml_confidence_thresholds_config() -> None:
+    assert app_utilities.get_ml_confidence_thresholds(app_utilities.app_config) == (0.0, {})
+
+    config = {"ml_classifier": {"confidence_thresholds": {"default": 0.5, "by_classification_code": {"3140": 0.8}}}}
+    assert app_utilities.get_ml_confidence_thresholds(config) == (0.5, {3140: 0.8})
@@ -1,3 +1,4 @@
+from typing import Any, Dict, Optional, Tuple, cast
 from unittest.mock import MagicMock, call, patch
 
 from fastapi import Request
@@ -12,12 +13,22 @@ from src.python_src.pydantic_models import (
     VaGovClaim,
 )
 from src.python_src.util.classifier_utilities import (
+    LookupTable,
+    accept_ml_classifications,
     build_ai_request,
+    classify_claim,
     classify_contention,
+    get_cached_classification,
+    get_cached_classifications,
+    lookup_contention_texts,
     ml_classify_claim,
+    result_caches,
+    supplement_batch_with_ml_classification,
     supplement_with_ml_classification,
     update_classifications,
 )
+from src.python_src.util.expanded_lookup_table import ExpandedLookupTable
+from src.python_src.util.resource_registry import ResourceRegistry
 
 TEST_CLAIM = VaGovClaim(
     claim_id=100,
@@ -278,6 +289,58 @@ def test_ml_classify_claim(mock_ml_classifier: MagicMock, mock_get_classificatio
     ]
 
 
+@patch("src.python_src.util.classifier_utilities.ml_classifier")
+def test_ml_classify_claim_top_k(mock_ml_classifier: MagicMock) -> None:
+    mock_ml_classifier.make_top_k_predictions.return_value = [
+        [("Hearing Loss", 0.8), ("Tinnitus", 0.15)],
+        [("Eye (Vision)", 0.6), ("not a classification", 0.3)],
+    ]
+    request = AiRequest(contentions=TEST_AI_REQUEST.contentions, top_k=2)
+
+    ai_response = ml_classify_claim(request)
+
+    mock_ml_classifier.make_top_k_predictions.assert_called_once_with(["lower back", "blurry vision"], 2)
+    mock_ml_classifier.make_predictions.assert_not_called()
+    first, second = ai_response.classified_contentions
+    assert first.classification_name == "Hearing Loss"
+    assert first.classification_code == first.top_classifications[0].classification_code  # type: ignore[index]
+    assert [(c.classification_name, c.probability) for c in first.top_classifications] == [  # type: ignore[union-attr]
+        ("Hearing Loss", 0.8),
+        ("Tinnitus", 0.15),
+    ]
+    assert second.top_classifications[1].classification_code is None  # type: ignore[index]
+
+
+@patch("src.python_src.util.classifier_utilities.ml_confidence_thresholds", (0.5, {9012: 0.9}))
+def test_accept_ml_classifications() -> None:
+    accepted = accept_ml_classifications([3140, 3140, 9012, 9012, None], [0.5, 0.49, 0.85, 0.95, 0.0])
+
+    assert accepted == [True, False, False, True, True]
+
+
+@patch("src.python_src.util.classifier_utilities.ml_confidence_thresholds", (0.0, {}))
+def test_accept_ml_classifications_without_thresholds() -> None:
+    assert accept_ml_classifications([3140, None], [0.01, 0.0]) == [True, True]
+
+
+@patch("src.python_src.util.classifier_utilities.ml_confidence_thresholds", (0.5, {}))
+@patch("src.python_src.util.classifier_utilities.ml_classifier")
+def test_ml_classify_claim_rejects_classifications_below_threshold(mock_ml_classifier: MagicMock) -> None:
+    mock_ml_classifier.make_predictions.return_value = [("Hearing Loss", 0.4), ("Eye (Vision)", 0.6)]
+
+    ai_response = ml_classify_claim(TEST_AI_REQUEST)
+
+    rejected, accepted = ai_response.classified_contentions
+    assert rejected.classification_code is None
+    assert rejected.classification_name is None
+    assert rejected.rejected_classification is not None
+    assert rejected.rejected_classification.classification_name == "Hearing Loss"
+    assert rejected.rejected_classification.classification_code is not None
+    assert rejected.rejected_classification.probability == 0.4
+    assert accepted.classification_name == "Eye (Vision)"
+    assert accepted.rejected_classification is None
+
+
 @patch("src.python_src.util.classifier_utilities.ml_classifier", None)
 def test_ml_classify_claim_returns_list_of_no_classification_codes_if_no_ml_model() -> None:
     ai_response = ml_classify_claim(TEST_AI_REQUEST)
@@ -300,3 +363,248 @@ def test_supplement_with_ml_classifier(
     mock_build_ai_request.assert_called_once()
     mock_ml_classify_claim.assert_called_once()
     mock_update_classifications.assert_called_once()
+
+
+@patch("src.python_src.util.classifier_utilities.ml_classify_claim")
+@patch("src.python_src.util.logging_utilities.log_as_json")
+def test_supplement_batch_with_ml_classification_makes_single_ml_call(
+    mock_log: MagicMock, mock_ml_classify_claim: MagicMock
+) -> None:
+    fully_classified = ClassifierResponse(
+        contentions=[
+            ClassifiedContention(classification_code=8998, classification_name="back", contention_type="NEW"),
+        ],
+        claim_id=2,
+        form526_submission_id=2,
+        is_fully_classified=True,
+        num_processed_contentions=1,
+        num_classified_contentions=1,
+    )
+    fully_classified_claim = VaGovClaim(
+        claim_id=2,
+        form526_submission_id=2,
+        contentions=[Contention(contention_text="lower back", contention_type="NEW")],
+    )
+    mock_ml_classify_claim.return_value = AiResponse(
+        classified_contentions=[
+            ClassifiedContention(classification_code=1111, classification_name="ml one", contention_type="NEW"),
+            ClassifiedContention(classification_code=2222, classification_name="ml two", contention_type="NEW"),
+        ]
+    )
+    partially_classified = ClassifierResponse(
+        contentions=[
+            ClassifiedContention(classification_code=1215, classification_name="shoulder pain", contention_type="NEW"),
+            ClassifiedContention(classification_code=None, classification_name=None, contention_type="NEW"),
+            ClassifiedContention(
+                classification_code=None, classification_name=None, diagnostic_code=5678, contention_type="claim_for_increase"
+            ),
+        ],
+        claim_id=1,
+        form526_submission_id=1,
+        is_fully_classified=False,
+        num_processed_contentions=3,
+        num_classified_contentions=1,
+    )
+    responses = [partially_classified, fully_classified]
+
+    results = supplement_batch_with_ml_classification(
+        responses, [TEST_CLAIM, fully_classified_claim], TEST_HYBRID_CLASSIFIER_REQUEST
+    )
+
+    mock_ml_classify_claim.assert_called_once()
+    ai_request = mock_ml_classify_claim.call_args[0][0]
+    assert [c.contention_text for c in ai_request.contentions] == ["Free Text Entry", "Not classifiable by CC team"]
+    assert [c.classification_code for c in results[0].contentions] == [1215, 1111, 2222]
+    assert results[0].num_classified_contentions == 3
+    assert results[0].is_fully_classified
+    assert results[1] == fully_classified
+
+
+@patch("src.python_src.util.classifier_utilities.ml_confidence_thresholds", (0.7, {}))
+@patch("src.python_src.util.classifier_utilities.ml_classifier")
+@patch("src.python_src.util.logging_utilities.log_as_json")
+def test_supplement_batch_with_ml_classification_leaves_rejected_classifications_unclassified(
+    mock_log: MagicMock, mock_ml_classifier: MagicMock
+) -> None:
+    mock_ml_classifier.make_predictions.return_value = [("Hearing Loss", 0.9), ("Eye (Vision)", 0.3)]
+    partially_classified = ClassifierResponse(
+        contentions=[
+            ClassifiedContention(classification_code=8998, classification_name="back", contention_type="NEW"),
+            ClassifiedContention(classification_code=None, classification_name=None, contention_type="NEW"),
+            ClassifiedContention(
+                classification_code=None, classification_name=None, diagnostic_code=5678, contention_type="claim_for_increase"
+            ),
+        ],
+        claim_id=1,
+        form526_submission_id=1,
+        is_fully_classified=False,
+        num_processed_contentions=3,
+        num_classified_contentions=1,
+    )
+
+    (result,) = supplement_batch_with_ml_classification([partially_classified], [TEST_CLAIM], TEST_HYBRID_CLASSIFIER_REQUEST)
+
+    assert [c.classification_name for c in result.contentions] == ["back", "Hearing Loss", None]
+    assert result.contentions[2].rejected_classification is not None
+    assert result.contentions[2].rejected_classification.probability == 0.3
+    assert result.num_classified_contentions == 2
+    assert not result.is_fully_classified
+
+
+@patch("src.python_src.util.classifier_utilities.ml_classify_claim")
+def test_supplement_batch_with_ml_classification_skips_ml_when_fully_classified(
+    mock_ml_classify_claim: MagicMock,
+) -> None:
+    fully_classified = ClassifierResponse(
+        contentions=[
+            ClassifiedContention(classification_code=8998, classification_name="back", contention_type="NEW"),
+        ],
+        claim_id=2,
+        form526_submission_id=2,
+        is_fully_classified=True,
+        num_processed_contentions=1,
+        num_classified_contentions=1,
+    )
+    claim = VaGovClaim(
+        claim_id=2,
+        form526_submission_id=2,
+        contentions=[Contention(contention_text="lower back", contention_type="NEW")],
+    )
+
+    results = supplement_batch_with_ml_classification([fully_classified], [claim], TEST_HYBRID_CLASSIFIER_REQUEST)
+
+    mock_ml_classify_claim.assert_not_called()
+    assert results == [fully_classified]
+
+
+def test_get_cached_classification_only_looks_up_text_once() -> None:
+    lookup_table = MagicMock()
+    lookup_table.get.return_value = {"classification_code": 3140, "classification_name": "Hearing Loss"}
+
+    first = get_cached_classification("hearing loss", lookup_table)
+    second = get_cached_classification("hearing loss", lookup_table)
+
+    lookup_table.get.assert_called_once_with("hearing loss")
+    assert first == second == ({"classification_code": 3140, "classification_name": "Hearing Loss"}, None)
+
+
+def test_get_cached_classification_is_keyed_on_lookup_table() -> None:
+    first_table = MagicMock()
+    first_table.get.return_value = {"classification_code": 1, "classification_name": "first"}
+    second_table = MagicMock()
+    second_table.get.return_value = {"classification_code": 2, "classification_name": "second"}
+
+    assert get_cached_classification("knee", first_table)[0]["classification_code"] == 1
+    assert get_cached_classification("knee", second_table)[0]["classification_code"] == 2
+
+
+def test_reload_during_lookup_does_not_leave_stale_cached_classifications() -> None:
+    registry = ResourceRegistry()
+    old_table = MagicMock()
+    new_table = MagicMock()
+    new_table.get.return_value = {"classification_code": 2, "classification_name": "new"}
+    lookup_table = cast(LookupTable, registry.register("lookup_table", lambda: old_table).proxy())
+    registry.warm_up()
+
+    def get_during_reload(text: str) -> Dict[str, Any]:
+        # the reload finishes (and clears the caches) while the lookup in the old table is in flight
+        registry.reload({"lookup_table": lambda: new_table})
+        result_caches()["contention_text"].clear()
+        return {"classification_code": 1, "classification_name": "old"}
+
+    old_table.get.side_effect = get_during_reload
+
+    with patch("src.python_src.util.classifier_utilities.resources", registry):
+        token = registry.pin_snapshot()
+        try:
+            assert get_cached_classification("knee", lookup_table)[0]["classification_code"] == 1
+        finally:
+            registry.unpin_snapshot(token)
+
+        # the result of the old table was cached after the caches were cleared, but is not used with the new table
+        assert get_cached_classification("knee", lookup_table)[0]["classification_code"] == 2
+    new_table.get.assert_called_once_with("knee")
+
+
+@patch("src.python_src.util.classifier_utilities.get_classification_code")
+@patch("src.python_src.util.classifier_utilities.ml_classifier")
+def test_ml_classify_claim_only_predicts_uncached_text(
+    mock_ml_classifier: MagicMock, mock_get_classification_code: MagicMock
+) -> None:
+    mock_get_classification_code.return_value = 8998
+    mock_ml_classifier.make_predictions.side_effect = [
+        [("Musculoskeletal - Mid/Lower Back (Thoracolumbar Spine)", 0.9)],
+        [("Eye (Vision)", 0.8)],
+    ]
+    ml_classify_claim(AiRequest(contentions=[Contention(contention_text="lower back", contention_type="NEW")]))
+
+    ai_response = ml_classify_claim(
+        AiRequest(
+            contentions=[
+                Contention(contention_text="lower back", contention_type="NEW"),
+                Contention(contention_text="blurry vision", contention_type="NEW"),
+                Contention(contention_text="blurry vision", contention_type="NEW"),
+            ]
+        )
+    )
+
+    assert mock_ml_classifier.make_predictions.call_args_list == [call(["lower back"]), call(["blurry vision"])]
+    assert [c.classification_name for c in ai_response.classified_contentions] == [
+        "Musculoskeletal - Mid/Lower Back (Thoracolumbar Spine)",
+        "Eye (Vision)",
+        "Eye (Vision)",
+    ]
+
+
+@patch("src.python_src.util.classifier_utilities.ml_classifier")
+def test_ml_classify_claim_does_not_cache_errors(mock_ml_classifier: MagicMock) -> None:
+    mock_ml_classifier.make_predictions.return_value = [("error", 0.0)]
+    request = AiRequest(contentions=[Contention(contention_text="lower back", contention_type="NEW")])
+
+    ml_classify_claim(request)
+    ml_classify_claim(request)
+
+    assert mock_ml_classifier.make_predictions.call_count == 2
+
+
+def test_get_cached_classifications_looks_up_distinct_uncached_texts_once() -> None:
+    lookup_table = MagicMock()
+    lookup_table.get.side_effect = lambda text: {"classification_code": len(text), "classification_name": text}
+    get_cached_classification("knee", lookup_table)
+    lookup_table.get.reset_mock()
+
+    results = get_cached_classifications(["knee", "hearing loss", "knee", "hearing loss"], lookup_table)
+
+    lookup_table.get.assert_called_once_with("hearing loss")
+    assert [r[0]["classification_code"] for r in results] == [4, 12, 4, 12]
+    assert get_cached_classifications([], lookup_table) == []
+
+
+def test_lookup_contention_texts_uses_lookup_many() -> None:
+    other_claim = VaGovClaim(
+        claim_id=101,
+        form526_submission_id=501,
+        contentions=[Contention(contention_text="lower back", contention_type="NEW")],
+    )
+    with patch("src.python_src.util.classifier_utilities.expanded_lookup_table", spec=ExpandedLookupTable) as mock_table:
+        mock_table.lookup_many.side_effect = lambda texts: [({"classification_code": 1}, text) for text in texts]
+        results = lookup_contention_texts([TEST_CLAIM, other_claim])
+
+    mock_table.lookup_many.assert_called_once_with(["lower back", "Free Text Entry", "Not classifiable by CC team"])
+    assert results["lower back"] == ({"classification_code": 1}, "lower back")
+
+
+def test_classify_claim_uses_given_text_classifications() -> None:
+    claim = VaGovClaim(
+        claim_id=100,
+        form526_submission_id=500,
+        contentions=[Contention(contention_text="made up condition", contention_type="NEW")],
+    )
+    text_classifications: Dict[str, Tuple[Dict[str, Any], Optional[str]]] = {
+        "made up condition": ({"classification_code": 1234, "classification_name": "Made Up"}, "made up condition")
+    }
+
+    response = classify_claim(claim, TEST_EXPANDED_CLASSIFIER_REQUEST, text_classifications)
+
+    assert response.contentions[0].classification_code == 1234
+    assert response.num_classified_contentions == 1
@@ -0,0 +1,29 @@
+"""Tests for the classification executor."""
+
+import asyncio
+import contextvars
+import threading
+
+from src.python_src.util.app_utilities import app_config
+from src.python_src.util.executor_utilities import classification_executor, run_in_classification_executor
+
+request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="unset")
+
+
+def _current_thread_and_request_id(suffix: str) -> tuple[str, str]:
+    return threading.current_thread().name, request_id.get() + suffix
+
+
+def test_run_in_classification_executor_uses_classification_threads() -> None:
+    async def run() -> tuple[str, str]:
+        request_id.set("abc")
+        return await run_in_classification_executor(_current_thread_and_request_id, "-1")
+
+    thread_name, value = asyncio.run(run())
+
+    assert thread_name.startswith("classification")
+    assert value == "abc-1"
+
+
+def test_classification_executor_size_matches_config() -> None:
+    assert classification_executor._max_workers == app_config["executor"]["classification_threads"]
@@ -374,3 +374,19 @@ def test_add_to_lut_if_new_allows_same_code_overwrite() -> None:
     assert len(mappings) == 1
     entry = next(iter(mappings.values()))
     assert entry["classification_code"] == 8997
+
+
+def test_get_many() -> None:
+    texts = ["PTSD", "knee pain", "totally free text", "PTSD", "loss of teeth due to bone loss"]
+
+    assert TEST_LUT.get_many(texts) == [TEST_LUT.get(text) for text in texts]
+    assert TEST_LUT.lookup_many(texts) == [TEST_LUT.lookup(text) for text in texts]
+    assert TEST_LUT.get_many([]) == []
+
+
+def test_get_many_looks_up_each_text_once() -> None:
+    with patch.object(TEST_LUT, "lookup", wraps=TEST_LUT.lookup) as mock_lookup:
+        results = TEST_LUT.get_many(["PTSD", "knee", "PTSD", "PTSD"])
+
+    assert mock_lookup.call_count == 2
+    assert [r["classification_code"] for r in results] == [8989, 8997, 8989, 8989]
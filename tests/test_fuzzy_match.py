@@ -0,0 +1,110 @@
+"""Tests for spelling correction against the expanded lookup table."""
+
+from typing import FrozenSet, List
+from unittest.mock import patch
+
+import pytest
+
+from src.python_src.util.app_utilities import dropdown_expanded_table_inits, load_config
+from src.python_src.util.expanded_lookup_table import ExpandedLookupTable
+from src.python_src.util.fuzzy_match import SpellingCorrector, edit_distance
+
+KEYS: List[FrozenSet[str]] = [
+    frozenset(["tinnitus"]),
+    frozenset(["sciatica"]),
+    frozenset(["sciatic", "nerve"]),
+    frozenset(["hearing", "loss"]),
+    frozenset(["migraine"]),
+]
+
+
+def _corrector(max_distance: int = 2, min_word_length: int = 5, max_lookup_ms: float = 1000) -> SpellingCorrector:
+    return SpellingCorrector(KEYS, max_distance, min_word_length, max_lookup_ms)
+
+
+@pytest.mark.parametrize(
+    "a, b, max_distance, expected",
+    [
+        ("tinnitus", "tinnitus", 2, 0),
+        ("tinitus", "tinnitus", 2, 1),
+        ("migrane", "migraine", 2, 1),
+        ("athsma", "asthma", 2, 2),
+        ("sicaitca", "sciatica", 2, 2),
+        ("hearnig", "hearing", 1, 1),
+        ("tnitus", "tinnitus", 1, None),
+        ("knee", "tinnitus", 2, None),
+    ],
+)
+def test_edit_distance(a: str, b: str, max_distance: int, expected: int) -> None:
+    assert edit_distance(a, b, max_distance) == expected
+
+
+def test_misspelled_words_are_corrected() -> None:
+    corrector = _corrector()
+
+    assert corrector.correct_word("tinitus") == ("tinnitus", 1)
+    assert corrector.correct_word("migrane") == ("migraine", 1)
+    assert corrector.correct(["hearnig", "loss"]) == (frozenset(["hearing", "loss"]), 1)
+
+
+def test_closest_word_is_preferred() -> None:
+    # "sciatia" is one edit from both "sciatica" and "sciatic", so the word in more keys is used
+    corrector = SpellingCorrector(KEYS + [frozenset(["sciatica", "pain"])], 2, 5, 1000)
+
+    assert corrector.correct_word("sciatia") == ("sciatica", 1)
+    assert corrector.correct_word("sciaticaa") == ("sciatica", 1)
+
+
+def test_words_that_are_not_corrected() -> None:
+    corrector = _corrector()
+
+    # in the vocabulary, too short, or too far from any vocabulary word
+    assert corrector.correct_word("loss") == ("loss", 0)
+    assert corrector.correct_word("lost") == ("lost", 0)
+    assert corrector.correct_word("africa") == ("africa", 0)
+
+
+def test_words_are_not_corrected_once_time_budget_is_spent() -> None:
+    corrector = _corrector(max_lookup_ms=0)
+
+    with patch("src.python_src.util.fuzzy_match.time.perf_counter", side_effect=[0.0, 1.0]):
+        assert corrector.correct(["tinitus"]) == (frozenset(["tinitus"]), 0)
+
+
+def test_invalid_settings() -> None:
+    with pytest.raises(ValueError):
+        _corrector(max_distance=0)
+
+
+def test_expanded_lookup_spelling_correction() -> None:
+    app_config = load_config("src/python_src/util/app_config.yaml")
+    fuzzy_match = {"enabled": True, "max_distance": 2, "min_word_length": 5, "max_lookup_ms": 1000}
+    lookup_table = ExpandedLookupTable(
+        dropdown_expanded_table_inits, app_config["common_words"], app_config["musculoskeletal_lut"], None, fuzzy_match
+    )
+
+    classification, processed_text = lookup_table.lookup("Tinitus")
+
+    assert processed_text == "tinitus"
+    assert classification == {
+        "classification_code": 3140,
+        "classification_name": "Hearing Loss",
+        "matched_key": frozenset(["tinnitus"]),
+        "match_confidence": pytest.approx(6 / 7),
+    }
+    assert lookup_table.get("Africa")["classification_code"] is None
+
+    # with partial matching also enabled, corrected text can be partially matched
+    partial_match = {"enabled": True, "min_confidence": 0.5, "max_input_tokens": 12}
+    lookup_table = ExpandedLookupTable.from_mappings(
+        dropdown_expanded_table_inits,
+        app_config["common_words"],
+        app_config["musculoskeletal_lut"],
+        lookup_table.contention_text_lookup_table,
+        partial_match,
+        fuzzy_match,
+    )
+    classification = lookup_table.get("tinitus constant")
+    assert classification["matched_key"] == frozenset(["tinnitus"])
+    # one of the 15 characters was edited, and the matched key is half of the words
+    assert classification["match_confidence"] == pytest.approx(14 / 15 * 0.5)
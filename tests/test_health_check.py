@@ -1,10 +1,24 @@
+import threading
+from typing import Any, Dict
 from unittest.mock import Mock, patch
 
+import pytest
 from fastapi.testclient import TestClient
 from pytest import MonkeyPatch
 
+from src.python_src.util.resource_registry import ResourceRegistry
 
-def test_health_check_success(test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
+
+def _ml_classifier_resource(classifier: Any, loaded: bool = True) -> Mock:
+    return Mock(loaded=loaded, get=Mock(return_value=classifier))
+
+
+@pytest.fixture
+def taxonomy_loaded(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr("src.python_src.api.taxonomy_resource", Mock(loaded=True))
+
+
+def test_health_check_success(test_client: TestClient, monkeypatch: MonkeyPatch, taxonomy_loaded: None) -> None:
     monkeypatch.setattr("src.python_src.api.dc_lookup_table", {"key1": "value:1"})
     monkeypatch.setattr("src.python_src.api.dropdown_lookup_table", {"key2": "value:2"})
     monkeypatch.setattr("src.python_src.api.expanded_lookup_table", {"key3": "value:3"})
@@ -13,7 +27,7 @@ def test_health_check_success(test_client: TestClient, monkeypatch: MonkeyPatch)
     assert response.json() == {"status": "ok"}
 
 
-def test_health_check_empty_dc_lookup(test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
+def test_health_check_empty_dc_lookup(test_client: TestClient, monkeypatch: MonkeyPatch, taxonomy_loaded: None) -> None:
     monkeypatch.setattr("src.python_src.api.dc_lookup_table", {})
     monkeypatch.setattr("src.python_src.api.dropdown_lookup_table", {"key2": "value:2"})
     monkeypatch.setattr("src.python_src.api.expanded_lookup_table", {"key3": "value:3"})
@@ -22,7 +36,7 @@ def test_health_check_empty_dc_lookup(test_client: TestClient, monkeypatch: Monk
     assert response.json() == {"detail": "DC Lookup table is empty"}
 
 
-def test_health_check_empty_expanded_lookup(test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
+def test_health_check_empty_expanded_lookup(test_client: TestClient, monkeypatch: MonkeyPatch, taxonomy_loaded: None) -> None:
     monkeypatch.setattr("src.python_src.api.dc_lookup_table", {})
     monkeypatch.setattr("src.python_src.api.dropdown_lookup_table", {})
     monkeypatch.setattr("src.python_src.api.expanded_lookup_table", {"key3": "value:3"})
@@ -31,7 +45,9 @@ def test_health_check_empty_expanded_lookup(test_client: TestClient, monkeypatch
     assert response.json() == {"detail": "DC Lookup, Contention Text Lookup tables are empty"}
 
 
-def test_health_check_empty_contention_text_lookup(test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
+def test_health_check_empty_contention_text_lookup(
+    test_client: TestClient, monkeypatch: MonkeyPatch, taxonomy_loaded: None
+) -> None:
     monkeypatch.setattr("src.python_src.api.dc_lookup_table", {})
     monkeypatch.setattr("src.python_src.api.dropdown_lookup_table", {})
     monkeypatch.setattr("src.python_src.api.expanded_lookup_table", {})
@@ -40,10 +56,53 @@ def test_health_check_empty_contention_text_lookup(test_client: TestClient, monk
     assert response.json() == {"detail": "DC Lookup, Expanded Lookup, Contention Text Lookup tables are empty"}
 
 
+def test_health_check_does_not_wait_for_warm_up(test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
+    released = threading.Event()
+    registry = ResourceRegistry()
+
+    def load_taxonomy() -> Dict[str, Any]:
+        released.wait(timeout=5)
+        return {"dc_lookup_table": {"key1": "value:1"}}
+
+    taxonomy_resource = registry.register("taxonomy", load_taxonomy)
+    monkeypatch.setattr("src.python_src.api.resources", registry)
+    monkeypatch.setattr("src.python_src.api.taxonomy_resource", taxonomy_resource)
+    # using this table would block until the warm-up has finished
+    monkeypatch.setattr("src.python_src.api.dc_lookup_table", taxonomy_resource.proxy("dc_lookup_table"))
+    warm_up = threading.Thread(target=registry.warm_up)
+    warm_up.start()
+
+    try:
+        health_response = test_client.get("/health")
+        ready_response = test_client.get("/ready")
+        assert not taxonomy_resource.loaded
+    finally:
+        released.set()
+        warm_up.join(timeout=5)
+
+    assert health_response.status_code == 200
+    assert health_response.json() == {"status": "loading"}
+    assert ready_response.status_code == 503
+
+
+def test_ready_check(test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr("src.python_src.api.resources.pending", lambda: [])
+    response = test_client.get("/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready"}
+
+
+def test_ready_check_while_loading(test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr("src.python_src.api.resources.pending", lambda: ["taxonomy", "ml_classifier"])
+    response = test_client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == {"detail": "Loading taxonomy, ml_classifier"}
+
+
 @patch("boto3.client")
 def test_ml_health_check(mock_boto3_client: Mock, test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
     mock_boto3_client.get_caller_identity.return_value = {"Arn": "arn-value"}
-    monkeypatch.setattr("src.python_src.api.ml_classifier", "not-none")
+    monkeypatch.setattr("src.python_src.api.ml_classifier_resource", _ml_classifier_resource("not-none"))
     response = test_client.get("/health-ml-classifier")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
@@ -52,7 +111,7 @@ def test_ml_health_check(mock_boto3_client: Mock, test_client: TestClient, monke
 def test_ml_health_check_ml_classifier_not_defined(mock_boto3_client: Mock, test_client: TestClient, \
         monkeypatch: MonkeyPatch) -> None:
     mock_boto3_client.get_caller_identity.return_value = {"Arn": "arn-value"}
-    monkeypatch.setattr("src.python_src.api.ml_classifier", None)
+    monkeypatch.setattr("src.python_src.api.ml_classifier_resource", _ml_classifier_resource(None))
     response = test_client.get("/health-ml-classifier")
     assert response.status_code == 500
     assert response.json() == {"detail": "ML Classifier is not initialized"}
@@ -60,7 +119,7 @@ def test_ml_health_check_ml_classifier_not_defined(mock_boto3_client: Mock, test
 @patch("boto3.client")
 def test_ml_health_check_aws_sts_exception(mock_boto3_client: Mock, test_client: TestClient, monkeypatch: MonkeyPatch) -> None:
     mock_boto3_client.side_effect = Exception()
-    monkeypatch.setattr("src.python_src.api.ml_classifier", "not-none")
+    monkeypatch.setattr("src.python_src.api.ml_classifier_resource", _ml_classifier_resource("not-none"))
     response = test_client.get("/health-ml-classifier")
     assert response.status_code == 500
     assert response.json() == {"detail": "Undefined AWS STS caller identity"}
@@ -69,7 +128,20 @@ def test_ml_health_check_aws_sts_exception(mock_boto3_client: Mock, test_client:
 def test_ml_health_check_aws_sts_and_ml_classifier_errors(mock_boto3_client: Mock, test_client: TestClient, 
     monkeypatch: MonkeyPatch) -> None:
     mock_boto3_client.side_effect = Exception()
-    monkeypatch.setattr("src.python_src.api.ml_classifier", None)
+    monkeypatch.setattr("src.python_src.api.ml_classifier_resource", _ml_classifier_resource(None))
     response = test_client.get("/health-ml-classifier")
     assert response.status_code == 500
     assert response.json() == {"detail": "ML Classifier is not initialized, Undefined AWS STS caller identity"}
+
+
+@patch("boto3.client")
+def test_ml_health_check_does_not_load_ml_classifier(
+    mock_boto3_client: Mock, test_client: TestClient, monkeypatch: MonkeyPatch
+) -> None:
+    mock_boto3_client.get_caller_identity.return_value = {"Arn": "arn-value"}
+    ml_classifier_resource = _ml_classifier_resource(None, loaded=False)
+    monkeypatch.setattr("src.python_src.api.ml_classifier_resource", ml_classifier_resource)
+    response = test_client.get("/health-ml-classifier")
+    assert response.status_code == 500
+    assert response.json() == {"detail": "ML Classifier is still loading"}
+    ml_classifier_resource.get.assert_not_called()
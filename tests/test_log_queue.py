@@ -0,0 +1,85 @@
+"""Tests for the queue-backed log sink."""
+
+import io
+import logging
+import queue
+from typing import Iterator
+
+import pytest
+
+from src.python_src.util import log_queue
+from src.python_src.util.log_queue import (
+    DroppingQueueHandler,
+    queue_logging_stats,
+    start_queue_logging,
+    stop_queue_logging,
+)
+
+
+@pytest.fixture
+def stream_handler() -> Iterator[logging.StreamHandler[io.StringIO]]:
+    """Runs the test with a single in-memory stream handler on the root logger, restoring the log queue after."""
+    was_running = log_queue._queue_handler is not None
+    stop_queue_logging()
+    root = logging.getLogger()
+    saved_handlers = list(root.handlers)
+    for handler in saved_handlers:
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(io.StringIO())
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    root.addHandler(handler)
+
+    yield handler
+
+    stop_queue_logging()
+    root.removeHandler(handler)
+    for saved in saved_handlers:
+        root.addHandler(saved)
+    if was_running:
+        start_queue_logging(10000)
+
+
+def test_queued_records_are_written_to_original_handlers(stream_handler: logging.StreamHandler[io.StringIO]) -> None:
+    queue_handler = start_queue_logging(100)
+
+    assert queue_handler in logging.getLogger().handlers
+    assert stream_handler not in logging.getLogger().handlers
+    logging.info("first")
+    logging.info("second")
+    stop_queue_logging()
+
+    assert stream_handler.stream.getvalue() == "first\nsecond\n"
+    assert stream_handler in logging.getLogger().handlers
+    assert queue_handler not in logging.getLogger().handlers
+
+
+def test_start_queue_logging_is_idempotent(stream_handler: logging.StreamHandler[io.StringIO]) -> None:
+    assert start_queue_logging(100) is start_queue_logging(100)
+
+
+def test_start_queue_logging_rejects_invalid_size(stream_handler: logging.StreamHandler[io.StringIO]) -> None:
+    with pytest.raises(ValueError):
+        start_queue_logging(0)
+
+
+def test_full_queue_drops_records_without_blocking() -> None:
+    log_records: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_records)
+
+    for i in range(5):
+        handler.handle(logging.LogRecord("test", logging.INFO, __file__, 0, f"message {i}", None, None))
+
+    assert handler.enqueued == 2
+    assert handler.dropped == 3
+    assert log_records.qsize() == 2
+
+
+def test_queue_logging_stats(stream_handler: logging.StreamHandler[io.StringIO]) -> None:
+    assert queue_logging_stats() == {"enqueued": 0, "dropped": 0, "queue_size": 0}
+
+    start_queue_logging(100)
+    logging.info("message")
+    stats = queue_logging_stats()
+
+    assert stats["enqueued"] == 1
+    assert stats["dropped"] == 0
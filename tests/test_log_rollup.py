@@ -0,0 +1,112 @@
+"""Tests for the rollup logging mode of the per-contention log events."""
+
+from typing import Any, Dict
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from src.python_src.pydantic_models import ClassifiedContention, Contention, VaGovClaim
+from src.python_src.util.log_rollup import ContentionStatsRollup
+from src.python_src.util.logging_utilities import log_contention_stats
+
+SAMPLE_REQUEST = Request(
+    scope={"type": "http", "method": "POST", "path": "/expanded-contention-classification", "headers": Headers()}
+)
+TEST_CLAIM: Dict[str, Any] = {
+    "claim_id": 100,
+    "form526_submission_id": 500,
+    "contentions": [
+        {"contention_text": "PTSD", "contention_type": "NEW"},
+        {"contention_text": "", "contention_type": "INCREASE", "diagnostic_code": 7710},
+    ],
+}
+
+
+def test_rollup_logs_the_counts_of_each_window() -> None:
+    emit = Mock()
+    rollup = ContentionStatsRollup(window_seconds=60, emit=emit)
+    rollup.add("/expanded-contention-classification", "contention_text", 8989)
+    rollup.add("/expanded-contention-classification", "contention_text", 8989)
+    rollup.add("/expanded-contention-classification", "not classified", None)
+
+    rollup.flush()
+
+    lines = [call.args[0] for call in emit.call_args_list]
+    assert [(line["classification_method"], line["classification_code"], line["count"]) for line in lines] == [
+        ("contention_text", 8989, 2),
+        ("not classified", None, 1),
+    ]
+    assert all(line["endpoint"] == "/expanded-contention-classification" for line in lines)
+    assert all(line["message"] == "contention stats rollup" for line in lines)
+
+    emit.reset_mock()
+    rollup.flush()
+    emit.assert_not_called()
+
+
+def test_rollup_logs_the_last_window_when_stopped() -> None:
+    emit = Mock()
+    rollup = ContentionStatsRollup(window_seconds=60, emit=emit)
+    rollup.start()
+    rollup.add("/ml-contention-classification", "ml_classifier", 3140)
+
+    rollup.stop()
+
+    emit.assert_called_once()
+    assert emit.call_args.args[0]["count"] == 1
+
+
+def test_rollup_window_must_be_positive() -> None:
+    with pytest.raises(ValueError):
+        ContentionStatsRollup(window_seconds=0, emit=Mock())
+
+
+@pytest.mark.parametrize("sample_rate, expected_lines", [(0.0, 0), (1.0, 1)])
+@patch("src.python_src.util.logging_utilities.log_as_json")
+def test_log_contention_stats_in_rollup_mode(mock_log: Mock, sample_rate: float, expected_lines: int) -> None:
+    emit = Mock()
+    rollup = ContentionStatsRollup(window_seconds=60, emit=emit)
+    contention = Contention(contention_text="PTSD", contention_type="NEW")
+    classified_contention = ClassifiedContention(
+        classification_code=8989, classification_name="Mental Disorders", diagnostic_code=None, contention_type="NEW"
+    )
+    claim = VaGovClaim(claim_id=100, form526_submission_id=500, contentions=[contention])
+
+    with (
+        patch("src.python_src.util.logging_utilities.contention_stats_rollup", rollup),
+        patch("src.python_src.util.logging_utilities.log_sample_rate", sample_rate),
+    ):
+        log_contention_stats(contention, classified_contention, claim, SAMPLE_REQUEST, "contention_text")
+
+    assert mock_log.call_count == expected_lines
+    if expected_lines:
+        # sampled lines keep the fields of the raw log lines
+        assert mock_log.call_args.args[0]["classification_method"] == "contention_text"
+        assert mock_log.call_args.args[0]["vagov_claim_id"] == 100
+    rollup.flush()
+    assert emit.call_args.args[0]["count"] == 1
+
+
+@patch("src.python_src.api.log_as_json")
+def test_request_lines_are_sampled_in_rollup_mode(mock_api_log: MagicMock, test_client: TestClient) -> None:
+    emit = Mock()
+    rollup = ContentionStatsRollup(window_seconds=60, emit=emit)
+    with (
+        patch("src.python_src.util.logging_utilities.contention_stats_rollup", rollup),
+        patch("src.python_src.util.logging_utilities.log_sample_rate", 0.0),
+        patch("src.python_src.util.logging_utilities.log_as_json") as mock_contention_log,
+    ):
+        response = test_client.post("/expanded-contention-classification", json=TEST_CLAIM)
+
+    assert response.status_code == 200
+    mock_api_log.assert_not_called()
+    # only the claim stats line is logged for the claim
+    assert [call.args[0].get("classification_method") for call in mock_contention_log.call_args_list] == [None]
+    rollup.flush()
+    assert sorted(call.args[0]["classification_method"] for call in emit.call_args_list) == [
+        "contention_text",
+        "diagnostic_code",
+    ]
@@ -19,8 +19,9 @@ from src.python_src.pydantic_models import (
     Contention,
     VaGovClaim,
 )
-from src.python_src.util.app_utilities import expanded_lookup_table
+from src.python_src.util.app_utilities import dropdown_expanded_table_inits, expanded_lookup_table
 from src.python_src.util.classifier_utilities import get_classification_code_name
+from src.python_src.util.expanded_lookup_table import ExpandedLookupTable
 from src.python_src.util.logging_utilities import (
     log_claim_stats_v2,
     log_contention_stats,
@@ -65,7 +66,7 @@ def test_create_classification_method_new() -> None:
         contention_text="acl tear right",
         contention_type="NEW",
     )
-    classification_method_expanded = get_classification_code_name(test_contention, expanded_lookup_table)[2]
+    classification_method_expanded = get_classification_code_name(test_contention, expanded_lookup_table).classified_by
     assert classification_method_expanded == "contention_text"
 
 
@@ -84,8 +85,8 @@ def test_create_classification_method_inc() -> None:
         diagnostic_code=501,
     )
 
-    classification_method_dc = get_classification_code_name(test_contention_dc, expanded_lookup_table)[2]
-    classification_method_lookup = get_classification_code_name(test_contention_lookup, expanded_lookup_table)[2]
+    classification_method_dc = get_classification_code_name(test_contention_dc, expanded_lookup_table).classified_by
+    classification_method_lookup = get_classification_code_name(test_contention_lookup, expanded_lookup_table).classified_by
     assert classification_method_dc == "diagnostic_code"
     assert classification_method_lookup == "contention_text"
 
@@ -98,7 +99,7 @@ def test_create_classification_method_not_classed() -> None:
         contention_text="free text entry",
         contention_type="NEW",
     )
-    classification_method = get_classification_code_name(test_contention_test, expanded_lookup_table)[2]
+    classification_method = get_classification_code_name(test_contention_test, expanded_lookup_table).classified_by
     assert classification_method == "not classified"
 
 
@@ -145,6 +146,102 @@ def test_log_contention_stats_expanded(mocked_func: Mock) -> None:
     mocked_func.assert_called_once_with(expected_logging_dict)
 
 
+@patch("src.python_src.util.logging_utilities.log_as_json")
+def test_log_contention_stats_reuses_classification_result(mocked_func: Mock) -> None:
+    """
+    Tests that the expanded lookup is not repeated when the classification result is passed to the logger
+    """
+    test_contention = Contention(
+        contention_text="Knee pain!",
+        contention_type="NEW",
+    )
+    test_claim = VaGovClaim(claim_id=100, form526_submission_id=500, contentions=[test_contention])
+    classification = get_classification_code_name(test_contention, expanded_lookup_table)
+    assert classification.processed_text == "knee"
+    assert classification.is_expanded_match is True
+    assert classification.matched_key == frozenset(["knee"])
+
+    classified_contention = ClassifiedContention(
+        classification_code=classification.classification_code,
+        classification_name=classification.classification_name,
+        diagnostic_code=None,
+        contention_type="NEW",
+    )
+    with patch.object(expanded_lookup_table, "lookup") as mock_lookup:
+        log_contention_stats(
+            test_contention,
+            classified_contention,
+            test_claim,
+            SAMPLE_REQUEST_EXPANDED_LOOKUP,
+            classification.classified_by,
+            classification,
+        )
+        mock_lookup.assert_not_called()
+
+    logged = mocked_func.call_args[0][0]
+    assert logged["processed_contention_text"] == "knee"
+    assert logged["contention_text"] == "unmapped contention text ['knee']"
+
+
+@patch("src.python_src.util.logging_utilities.log_as_json")
+def test_log_contention_stats_partial_match(mocked_func: Mock) -> None:
+    """
+    Tests that only the matched words of a partial match are logged, along with the match confidence
+    """
+    test_contention = Contention(contention_text="sleep apnea john smith", contention_type="NEW")
+    test_claim = VaGovClaim(claim_id=100, form526_submission_id=500, contentions=[test_contention])
+    partial_lookup_table = ExpandedLookupTable.from_mappings(
+        dropdown_expanded_table_inits,
+        expanded_lookup_table.common_words,
+        expanded_lookup_table.musculoskeletal_lookup,
+        expanded_lookup_table.contention_text_lookup_table,
+        {"enabled": True, "min_confidence": 0.5, "max_input_tokens": 12},
+    )
+    classification = get_classification_code_name(test_contention, partial_lookup_table)
+    assert classification.classification_code == 9012
+    assert classification.matched_key == frozenset(["sleep", "apnea"])
+    assert classification.match_confidence == 0.5
+
+    classified_contention = ClassifiedContention(
+        classification_code=classification.classification_code,
+        classification_name=classification.classification_name,
+        diagnostic_code=None,
+        contention_type="NEW",
+    )
+    log_contention_stats(
+        test_contention,
+        classified_contention,
+        test_claim,
+        SAMPLE_REQUEST_EXPANDED_LOOKUP,
+        classification.classified_by,
+        classification,
+    )
+
+    logged = mocked_func.call_args[0][0]
+    assert logged["processed_contention_text"] == "apnea sleep"
+    assert logged["contention_text"] == "unmapped contention text ['apnea sleep']"
+    assert logged["match_confidence"] == 0.5
+    assert "john" not in str(logged)
+
+
+def test_classification_result_for_diagnostic_code_does_not_report_expanded_lookup() -> None:
+    """
+    Tests that a contention classified by diagnostic code leaves the expanded lookup fields unset, so the
+    logger falls back to its own lookup
+    """
+    test_contention = Contention(
+        contention_text="acl tear, right",
+        contention_type="INCREASE",
+        diagnostic_code=5012,
+    )
+    classification = get_classification_code_name(test_contention, expanded_lookup_table)
+
+    assert classification.classified_by == "diagnostic_code"
+    assert classification.processed_text is None
+    assert classification.is_expanded_match is None
+    assert classification.matched_key is None
+
+
 @patch("src.python_src.util.logging_utilities.log_as_json")
 @patch("src.python_src.util.logging_utilities.log_expanded_contention_text")
 def test_requests_for_hybrid_endpoint_calls_expanded_logging(
@@ -217,6 +314,48 @@ def test_requests_for_hybrid_endpoint_does_not_log_failed_expanded_lookup(
     log_expanded_contention_text.assert_not_called()
 
 
+def test_classification_carries_contention_text_table_match() -> None:
+    """
+    Tests that the classification step records whether the text is in the contention text (dropdown) lookup table
+    """
+    mapped = Contention(contention_text="tinnitus", contention_type="NEW")
+    unmapped = Contention(contention_text="acl tear right", contention_type="NEW")
+    no_text = Contention(contention_text="", contention_type="INCREASE", diagnostic_code=5012)
+
+    assert get_classification_code_name(mapped, expanded_lookup_table).is_mapped_text is True
+    assert get_classification_code_name(unmapped, expanded_lookup_table).is_mapped_text is False
+    assert get_classification_code_name(no_text, expanded_lookup_table).is_mapped_text is False
+
+
+@patch("src.python_src.util.logging_utilities.dropdown_lookup_table")
+@patch("src.python_src.util.logging_utilities.log_as_json")
+def test_log_contention_stats_uses_contention_text_table_match(mocked_func: Mock, mock_dropdown_table: Mock) -> None:
+    """
+    Tests that the contention text table is not looked up again when the classification result is given
+    """
+    test_contention = Contention(contention_text="tinnitus", contention_type="NEW")
+    test_claim = VaGovClaim(claim_id=100, form526_submission_id=500, contentions=[test_contention])
+    classification = get_classification_code_name(test_contention, expanded_lookup_table)
+    classified_contention = ClassifiedContention(
+        classification_code=classification.classification_code,
+        classification_name=classification.classification_name,
+        diagnostic_code=None,
+        contention_type="NEW",
+    )
+
+    log_contention_stats(
+        test_contention,
+        classified_contention,
+        test_claim,
+        SAMPLE_REQUEST_EXPANDED_LOOKUP,
+        classification.classified_by,
+        classification,
+    )
+
+    mock_dropdown_table.get.assert_not_called()
+    assert mocked_func.call_args[0][0]["contention_text"] == "tinnitus"
+
+
 @patch("src.python_src.util.logging_utilities.log_as_json")
 def test_non_classified_contentions(mocked_func: Mock) -> None:
     """
@@ -738,3 +877,41 @@ def test_normalize_log_special_chars() -> None:
     assert normalize_log("test\ttest") == "test\ttest"
     assert normalize_log("test\vtest") == "test\vtest"
     assert normalize_log("test\ftest") == "test\ftest"
+
+
+@patch("src.python_src.util.logging_utilities.log_claim_stats_v2")
+def test_log_claim_stats_decorator_async(mock_log_claim_stats: Mock) -> None:
+    """
+    Tests that the claim stats decorator awaits coroutine functions before logging their result
+    """
+    import asyncio
+
+    from src.python_src.util.logging_utilities import log_claim_stats_decorator
+
+    test_claim = VaGovClaim(
+        claim_id=100, form526_submission_id=500, contentions=[Contention(contention_text="knee", contention_type="NEW")]
+    )
+    classifier_response = ClassifierResponse(
+        contentions=[
+            ClassifiedContention(
+                classification_code=8997,
+                classification_name="Musculoskeletal - Knee",
+                diagnostic_code=None,
+                contention_type="NEW",
+            )
+        ],
+        claim_id=100,
+        form526_submission_id=500,
+        is_fully_classified=True,
+        num_processed_contentions=1,
+        num_classified_contentions=1,
+    )
+
+    @log_claim_stats_decorator
+    async def endpoint(claim: VaGovClaim, request: Request) -> ClassifierResponse:
+        return classifier_response
+
+    result = asyncio.run(endpoint(claim=test_claim, request=SAMPLE_REQUEST_EXPANDED_LOOKUP))
+
+    assert result is classifier_response
+    mock_log_claim_stats.assert_called_once_with(test_claim, classifier_response, SAMPLE_REQUEST_EXPANDED_LOOKUP)
@@ -29,7 +29,7 @@ def test_first_function(test_client: TestClient, mock_csv_data: str) -> None:
             app_config["autosuggestion_table"]["autocomplete_terms"],
             app_config["autosuggestion_table"]["active_autocomplete"],
         )
-        assert result == [
+        assert list(result) == [
             "tinnitus (ringing in ears)",
             "ptsd (post-traumatic stress disorder)",
             "knee pain",
@@ -54,7 +54,7 @@ def test_second_function(test_client: TestClient) -> None:
         )
         print(result)
         # Function processes all rows regardless of missing columns
-        assert result == [
+        assert list(result) == [
             "tinnitus (ringing in ears)",
             "acl tear (anterior cruciate ligament tear), right",
             "acl tear (anterior cruciate ligament tear), left",
@@ -81,4 +81,33 @@ def test_fourth_function(test_client: TestClient) -> None:
             app_config["autosuggestion_table"]["autocomplete_terms"],
             app_config["autosuggestion_table"]["active_autocomplete"],
         )
-        assert result == []
+        assert list(result) == []
+
+
+def test_dropdown_catalog_indexes_terms(test_client: TestClient) -> None:
+    """Test the catalog maps each term to its autosuggestion column and taxonomy row."""
+    csv_data = (
+        "Autosuggestion term 1,Autosuggestion term 2,Autosuggestion term 3,"
+        "Autosuggestion term 4,Autosuggestion term 5,Autosuggestion term 6,"
+        "Active autosuggestion terms\n"
+        "Tinnitus (ringing in ears),,,,,,Active\n"
+        "Knee pain,,,,,,Inactive\n"
+        '"ACL tear, right"," ACL tear, left",,,,,Active\n'
+    )
+    with patch("builtins.open", mock_open(read_data=csv_data)):
+        result = build_logging_table(
+            "mock_csv_filepath.csv",
+            app_config["autosuggestion_table"]["autocomplete_terms"],
+            app_config["autosuggestion_table"]["active_autocomplete"],
+        )
+
+    assert len(result) == 3
+    assert result.terms == frozenset(["tinnitus (ringing in ears)", "acl tear, right", "acl tear, left"])
+    assert "knee pain" not in result
+
+    selection = result.get("acl tear, left")
+    assert selection is not None
+    assert selection.autosuggestion_column == "Autosuggestion term 2"
+    assert selection.row_index == 2
+    assert selection.row["Autosuggestion term 1"] == "ACL tear, right"
+    assert result.get("knee pain") is None
@@ -0,0 +1,182 @@
+"""Tests for the in-process metrics and the /metrics endpoint."""
+
+import json
+import os
+import threading
+from typing import Any, Dict
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.python_src.util.metrics import (
+    CLASSIFICATIONS,
+    Histogram,
+    MetricsFlusher,
+    MetricsRegistry,
+    merge_snapshots,
+    render_metrics,
+)
+
+TEST_CLAIM: Dict[str, Any] = {
+    "claim_id": 100,
+    "form526_submission_id": 500,
+    "contentions": [
+        {"contention_text": "PTSD", "contention_type": "NEW"},
+        {"contention_text": "", "contention_type": "INCREASE", "diagnostic_code": 7710},
+        {"contention_text": "xyzzy", "contention_type": "NEW"},
+    ],
+}
+
+
+def _counter(snapshot: Dict[str, Any], name: str, **labels: str) -> float:
+    return float(sum(c["value"] for c in snapshot["counters"] if c["name"] == name and c["labels"] == labels))
+
+
+def _sample(text: str, sample: str) -> float:
+    values = [float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.rsplit(" ", 1)[0] == sample]
+    return values[0] if values else 0.0
+
+
+def test_histogram() -> None:
+    histogram = Histogram(buckets=(1.0, 10.0))
+    for value in [0.5, 1.0, 5.0, 500.0]:
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+
+    assert snapshot["count"] == 4
+    assert snapshot["sum"] == pytest.approx(506.5)
+    assert snapshot["buckets"] == {"1": 2, "10": 3, "+Inf": 4}
+
+
+def test_counters_from_several_threads_are_added_up() -> None:
+    registry = MetricsRegistry()
+    registry.describe("test_total", "counter", "Test counter.")
+
+    def count() -> None:
+        for _ in range(1000):
+            registry.inc("test_total", label="a")
+
+    threads = [threading.Thread(target=count) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    registry.inc("test_total", 2.5, label="b")
+
+    snapshot = registry.snapshot()
+    assert _counter(snapshot, "test_total", label="a") == 4000
+    assert _counter(snapshot, "test_total", label="b") == 2.5
+
+
+def test_collectors_are_read_at_snapshot() -> None:
+    registry = MetricsRegistry()
+    hits = {"value": 1}
+    registry.add_collector(lambda: [("cache_hits_total", {"cache": "test"}, hits["value"])])
+
+    assert _counter(registry.snapshot(), "cache_hits_total", cache="test") == 1
+    hits["value"] = 5
+    assert _counter(registry.snapshot(), "cache_hits_total", cache="test") == 5
+
+
+def test_merged_snapshot_adds_up_the_snapshots_of_other_processes(tmp_path: Any) -> None:
+    registry = MetricsRegistry()
+    registry.describe("test_seconds", "histogram", "Test histogram.", buckets=(1.0,))
+    registry.inc("test_total", 3)
+    registry.observe("test_seconds", 0.5)
+    other_process = {
+        "counters": [{"name": "test_total", "labels": {}, "value": 4}],
+        "histograms": [{"name": "test_seconds", "labels": {}, "count": 2, "sum": 3.0, "buckets": {"1": 1, "+Inf": 2}}],
+    }
+    (tmp_path / "metrics-1.json").write_text(json.dumps(other_process))
+    (tmp_path / "metrics-2.json").write_text("not json")
+
+    snapshot, num_processes = registry.merged_snapshot(str(tmp_path))
+
+    assert num_processes == 2
+    assert _counter(snapshot, "test_total") == 7
+    assert snapshot["histograms"] == [
+        {"name": "test_seconds", "labels": {}, "count": 3, "sum": 3.5, "buckets": {"1": 2, "+Inf": 3}}
+    ]
+
+
+def test_flusher_writes_the_snapshot_of_the_process(tmp_path: Any) -> None:
+    registry = MetricsRegistry()
+    registry.inc("test_total")
+    flusher = MetricsFlusher(registry, str(tmp_path / "metrics"), flush_seconds=60)
+    flusher.start()
+    flusher.stop()
+
+    with open(tmp_path / "metrics" / f"metrics-{os.getpid()}.json") as f:
+        assert _counter(json.load(f), "test_total") == 1
+    # the process's own file is not added to its live snapshot a second time
+    snapshot, num_processes = registry.merged_snapshot(str(tmp_path / "metrics"))
+    assert num_processes == 1
+    assert _counter(snapshot, "test_total") == 1
+
+
+def test_render_metrics() -> None:
+    registry = MetricsRegistry()
+    registry.describe("requests_total", "counter", "Requests.")
+    registry.describe("latency_seconds", "histogram", "Latency.", buckets=(0.1,))
+    registry.describe("queue_size", "gauge", "Queue size.")
+    registry.inc("requests_total", method='say "hi"')
+    registry.observe("latency_seconds", 0.05, route="/test")
+
+    text = render_metrics(registry, merge_snapshots([registry.snapshot()]), [("queue_size", {}, 3)])
+
+    assert text.splitlines() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/test",le="0.1"} 1',
+        'latency_seconds_bucket{route="/test",le="+Inf"} 1',
+        'latency_seconds_sum{route="/test"} 0.05',
+        'latency_seconds_count{route="/test"} 1',
+        "# HELP queue_size Queue size.",
+        "# TYPE queue_size gauge",
+        "queue_size 3",
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{method="say \\"hi\\""} 1',
+    ]
+
+
+def test_metrics_endpoint(test_client: TestClient) -> None:
+    before = test_client.get("/metrics").text
+    mock_classifier = MagicMock()
+    mock_classifier.make_predictions.return_value = [("Hearing Loss", 0.9)]
+
+    with patch("src.python_src.util.classifier_utilities.ml_classifier", mock_classifier):
+        assert test_client.post("/hybrid-contention-classification", json=TEST_CLAIM).status_code == 200
+    response = test_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    for method, count in [("contention_text", 1), ("diagnostic_code", 1), ("ml_classifier", 1)]:
+        sample = f'{CLASSIFICATIONS}{{endpoint="/hybrid-contention-classification",method="{method}"}}'
+        assert _sample(text, sample) - _sample(before, sample) == count
+    duration = 'http_request_duration_seconds_count{route="/hybrid-contention-classification"}'
+    assert _sample(text, duration) - _sample(before, duration) == 1
+    assert 'classification_stage_duration_seconds_count{stage="expanded_lookup"}' in text
+    assert 'result_cache_hit_ratio{cache="contention_text"}' in text
+    assert 'lookup_table_entries{table="expanded"}' in text
+    assert "metrics_processes 1" in text
+
+
+def test_ml_endpoint_counts_unclassified_contentions(test_client: TestClient) -> None:
+    sample = f'{CLASSIFICATIONS}{{endpoint="/ml-contention-classification",method="not classified"}}'
+    before = _sample(test_client.get("/metrics").text, sample)
+
+    with patch("src.python_src.util.classifier_utilities.ml_classifier", None):
+        response = test_client.post(
+            "/ml-contention-classification", json={"contentions": [{"contention_text": "xyzzy", "contention_type": "NEW"}]}
+        )
+
+    assert response.status_code == 200
+    assert _sample(test_client.get("/metrics").text, sample) - before == 1
+
+
+def test_metrics_endpoint_is_not_in_the_openapi_schema(test_client: TestClient) -> None:
+    assert "/metrics" not in test_client.get("/openapi.json").json()["paths"]
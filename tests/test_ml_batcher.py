@@ -0,0 +1,136 @@
+"""Tests for the ML prediction micro-batcher."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.python_src.util.ml_batcher import MLPredictionBatcher
+
+
+def _echo_classifier() -> MagicMock:
+    classifier = MagicMock()
+    classifier.make_predictions.side_effect = lambda texts: [(f"label {text}", 0.5) for text in texts]
+    classifier.get_version.return_value = ("model.onnx", "vectorizer.pkl")
+    return classifier
+
+
+def test_concurrent_requests_are_coalesced() -> None:
+    classifier = _echo_classifier()
+    batcher = MLPredictionBatcher(classifier, max_wait_ms=200, max_batch_size=6)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(batcher.make_predictions, [f"a{i}", f"b{i}"]) for i in range(3)]
+        results = [f.result(timeout=5) for f in futures]
+
+    for i, result in enumerate(results):
+        assert result == [(f"label a{i}", 0.5), (f"label b{i}", 0.5)]
+    # the batch is sent as soon as it is full, in a single classifier call
+    classifier.make_predictions.assert_called_once()
+    assert sorted(classifier.make_predictions.call_args[0][0]) == sorted(f"{c}{i}" for i in range(3) for c in "ab")
+    assert batcher.stats()["mean_batch_size"] == 6
+
+
+def test_batches_are_limited_to_max_batch_size() -> None:
+    classifier = _echo_classifier()
+    release = threading.Event()
+    batch_sizes: List[int] = []
+
+    def predict(texts: List[str]) -> List[tuple[str, float]]:
+        release.wait(timeout=5)
+        batch_sizes.append(len(texts))
+        return [("label", 0.5)] * len(texts)
+
+    classifier.make_predictions.side_effect = predict
+    batcher = MLPredictionBatcher(classifier, max_wait_ms=0, max_batch_size=2)
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(batcher.make_predictions, [f"text {i}"]) for i in range(5)]
+        release.set()
+        results = [f.result(timeout=5) for f in futures]
+
+    assert results == [[("label", 0.5)]] * 5
+    assert max(batch_sizes) <= 2
+    assert sum(batch_sizes) == 5
+
+
+def test_top_k_predictions_go_straight_to_the_classifier() -> None:
+    classifier = _echo_classifier()
+    classifier.make_top_k_predictions.return_value = [[("label", 0.5), ("other label", 0.25)]]
+    batcher = MLPredictionBatcher(classifier, max_wait_ms=0, max_batch_size=2)
+
+    assert batcher.make_top_k_predictions(["text"], 2) == [[("label", 0.5), ("other label", 0.25)]]
+    classifier.make_top_k_predictions.assert_called_once_with(["text"], 2)
+    classifier.make_predictions.assert_not_called()
+
+
+def test_classifier_failure_returns_error_predictions() -> None:
+    classifier = MagicMock()
+    classifier.make_predictions.side_effect = RuntimeError("inference failed")
+    batcher = MLPredictionBatcher(classifier, max_wait_ms=0, max_batch_size=8)
+
+    assert batcher.make_predictions(["tinnitus", "acne"]) == [("error", 0.0), ("error", 0.0)]
+
+
+def test_mismatched_predictions_return_error_predictions() -> None:
+    classifier = MagicMock()
+    classifier.make_predictions.return_value = [("label", 0.5)]
+    batcher = MLPredictionBatcher(classifier, max_wait_ms=0, max_batch_size=8)
+
+    assert batcher.make_predictions(["tinnitus", "acne"]) == [("error", 0.0), ("error", 0.0)]
+
+
+def test_empty_request_does_not_call_classifier() -> None:
+    classifier = _echo_classifier()
+    batcher = MLPredictionBatcher(classifier, max_wait_ms=0, max_batch_size=8)
+
+    assert batcher.make_predictions([]) == []
+    classifier.make_predictions.assert_not_called()
+
+
+def test_get_version_and_stats() -> None:
+    batcher = MLPredictionBatcher(_echo_classifier(), max_wait_ms=0, max_batch_size=8)
+    assert batcher.stats() == {
+        "batches": 0,
+        "requests": 0,
+        "mean_batch_size": 0.0,
+        "max_batch_size": 0,
+        "mean_queue_wait_ms": 0.0,
+        "max_queue_wait_ms": 0.0,
+    }
+
+    batcher.make_predictions(["tinnitus"])
+    stats = batcher.stats()
+
+    assert batcher.get_version() == ("model.onnx", "vectorizer.pkl")
+    assert stats["batches"] == 1
+    assert stats["requests"] == 1
+    assert stats["max_batch_size"] == 1
+    assert stats["max_queue_wait_ms"] >= 0
+
+
+def test_invalid_settings() -> None:
+    with pytest.raises(ValueError):
+        MLPredictionBatcher(_echo_classifier(), max_wait_ms=-1, max_batch_size=8)
+    with pytest.raises(ValueError):
+        MLPredictionBatcher(_echo_classifier(), max_wait_ms=0, max_batch_size=0)
+
+
+def test_close_finishes_queued_requests() -> None:
+    classifier = _echo_classifier()
+    batcher = MLPredictionBatcher(classifier, max_wait_ms=100, max_batch_size=64)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(batcher.make_predictions, ["tinnitus"])
+        time.sleep(0.02)
+        batcher.close()
+        assert future.result(timeout=5) == [("label tinnitus", 0.5)]
+
+    batcher._worker.join(timeout=5)
+    assert not batcher._worker.is_alive()
+    # once closed, predictions are made without batching
+    assert batcher.make_predictions(["acne"]) == [("label acne", 0.5)]
+    assert batcher.stats()["batches"] == 1
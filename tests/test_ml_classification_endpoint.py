@@ -2,7 +2,14 @@ from unittest.mock import MagicMock, patch
 
 from fastapi.testclient import TestClient
 
-from src.python_src.pydantic_models import AiResponse, ClassifiedContention, ClassifierResponse, Contention, VaGovClaim
+from src.python_src.pydantic_models import (
+    AiResponse,
+    ClassifiedContention,
+    ClassifierResponse,
+    Contention,
+    MLClassification,
+    VaGovClaim,
+)
 
 
 @patch("src.python_src.api.classify_claim")
@@ -165,3 +172,105 @@ def test_api_endpoint(mock_ml_classify_claim: MagicMock, test_client: TestClient
             },
         ]
     }
+
+
+@patch("src.python_src.api.ml_classify_claim")
+def test_api_endpoint_top_k(mock_ml_classify_claim: MagicMock, test_client: TestClient) -> None:
+    mock_ml_classify_claim.return_value = AiResponse(
+        classified_contentions=[
+            ClassifiedContention(
+                classification_code=3140,
+                classification_name="Hearing Loss",
+                contention_type="NEW",
+                top_classifications=[
+                    MLClassification(classification_code=3140, classification_name="Hearing Loss", probability=0.75),
+                    MLClassification(classification_code=3244, classification_name="Tinnitus", probability=0.25),
+                ],
+            ),
+        ]
+    )
+
+    json_post_data = {"contentions": [{"contention_text": "hearing", "contention_type": "NEW"}], "top_k": 2}
+    response = test_client.post("/ml-contention-classification", json=json_post_data)
+
+    assert response.status_code == 200
+    assert mock_ml_classify_claim.call_args.args[0].top_k == 2
+    assert response.json()["classified_contentions"][0]["top_classifications"] == [
+        {"classification_code": 3140, "classification_name": "Hearing Loss", "probability": 0.75},
+        {"classification_code": 3244, "classification_name": "Tinnitus", "probability": 0.25},
+    ]
+
+
+def test_api_endpoint_rejects_invalid_top_k(test_client: TestClient) -> None:
+    for top_k in [0, 21]:
+        json_post_data = {"contentions": [{"contention_text": "hearing", "contention_type": "NEW"}], "top_k": top_k}
+        response = test_client.post("/ml-contention-classification", json=json_post_data)
+        assert response.status_code == 422
+
+
+@patch("src.python_src.api.classify_claim")
+@patch("src.python_src.api.supplement_batch_with_ml_classification")
+def test_batch_hybrid_classifier(
+    mock_supplement_batch: MagicMock, mock_classify_claim: MagicMock, test_client: TestClient
+) -> None:
+    test_claims = [
+        VaGovClaim(
+            claim_id=100,
+            form526_submission_id=500,
+            contentions=[Contention(contention_text="lower back", contention_type="NEW")],
+        ),
+        VaGovClaim(
+            claim_id=101,
+            form526_submission_id=501,
+            contentions=[Contention(contention_text="Unclassifiable", contention_type="NEW")],
+        ),
+    ]
+    classified_responses = [
+        ClassifierResponse(
+            contentions=[
+                ClassifiedContention(
+                    classification_code=8998,
+                    classification_name="Musculoskeletal - Mid/Lower Back (Thoracolumbar Spine)",
+                    diagnostic_code=None,
+                    contention_type="NEW",
+                ),
+            ],
+            claim_id=100,
+            form526_submission_id=500,
+            is_fully_classified=True,
+            num_processed_contentions=1,
+            num_classified_contentions=1,
+        ),
+        ClassifierResponse(
+            contentions=[
+                ClassifiedContention(
+                    classification_code=9999,
+                    classification_name="ml classification",
+                    diagnostic_code=None,
+                    contention_type="NEW",
+                ),
+            ],
+            claim_id=101,
+            form526_submission_id=501,
+            is_fully_classified=True,
+            num_processed_contentions=1,
+            num_classified_contentions=1,
+        ),
+    ]
+    mock_classify_claim.side_effect = classified_responses
+    mock_supplement_batch.return_value = classified_responses
+
+    test_response = test_client.post(
+        "/batch/hybrid-contention-classification",
+        json={"claims": [c.model_dump() for c in test_claims]},
+    )
+    assert test_response.status_code == 200
+    assert mock_classify_claim.call_count == 2
+    mock_supplement_batch.assert_called_once()
+    assert [c["claim_id"] for c in test_response.json()["claims"]] == [100, 101]
+    assert test_response.json()["claims"][1]["contentions"][0]["classification_code"] == 9999
+
+
+def test_batch_hybrid_classifier_requires_claims(test_client: TestClient) -> None:
+    test_response = test_client.post("/batch/hybrid-contention-classification", json={"claims": []})
+    assert test_response.status_code == 422
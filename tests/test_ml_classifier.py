@@ -18,13 +18,23 @@ import os
 import string
 from unittest.mock import MagicMock, call, patch
 
+import joblib
+import numpy as np
+import onnxruntime as ort
 import pytest
 from numpy import float32, ndarray
 from onnx.helper import make_node
 from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
 
 from src.python_src.util import app_utilities
-from src.python_src.util.ml_classifier import MLClassifier
+from src.python_src.util.ml_classifier import (
+    MLClassifier,
+    _preallocatable_outputs,
+    create_inference_session,
+    top_k_predictions,
+)
+from tests.onnx_models import TRAINING_TEXTS, build_linear_classifier_model, build_tensor_output_model
 
 
 @patch("src.python_src.util.ml_classifier.os.path.exists")
@@ -141,18 +151,46 @@ def test_inputs_is_dictionary_of_transformed_values_as_ndarray(
 
     classifier.vectorizer = MagicMock()
     classifier.vectorizer.transform.return_value = csr_matrix(1)
+    classifier.input_name = make_node("A", ["X"], ["Y"], name="node_name").name
     classifier.session = MagicMock()
-    classifier.session.get_inputs.return_value = [
-        make_node("A", ["X"], ["Y"], name="node_name"),
-    ]
 
     inputs = classifier.get_inputs_for_session(["asthma", "lorem ipsum", "dolor sit amit"])
     classifier.vectorizer.transform.assert_called_with(["asthma", "lorem ipsum", "dolor sit amit"])
-    classifier.session.get_inputs.assert_called_once()
+    classifier.session.get_inputs.assert_not_called()
 
     assert inputs == {"node_name": csr_matrix(1).toarray().astype(float32)}
 
 
+@patch("src.python_src.util.ml_classifier.os.path.exists")
+@patch("src.python_src.util.ml_classifier.ort.InferenceSession")
+@patch("src.python_src.util.ml_classifier.joblib.load")
+def test_session_metadata_is_read_once(mock_joblib: MagicMock, mock_onnx_session: MagicMock, mock_os_path: MagicMock) -> None:
+    """Test that the input and output names of the session are read at construction, not on every prediction."""
+    mock_os_path.return_value = True
+    session = mock_onnx_session.return_value
+    session.get_inputs.return_value = [MagicMock()]
+    session.get_inputs.return_value[0].name = "float_input"
+    outputs = [MagicMock(), MagicMock()]
+    outputs[0].name, outputs[1].name = "output_label", "output_probability"
+    session.get_outputs.return_value = outputs
+    session.run.return_value = [["lorem"], [{"lorem": 0.9, "ipsum": 0.1}]]
+
+    classifier = MLClassifier("model.onnx", "vectorizer.pkl")
+    classifier.vectorizer = MagicMock()
+    classifier.vectorizer.transform.return_value = csr_matrix(np.ones((1, 2)))
+    session.get_inputs.reset_mock()
+    session.get_outputs.reset_mock()
+
+    assert classifier.make_predictions(["asthma"]) == [("lorem", 0.9)]
+    assert classifier.make_predictions(["acne"]) == [("lorem", 0.9)]
+    session.get_inputs.assert_not_called()
+    session.get_outputs.assert_not_called()
+    assert session.run.call_args.args[0] == ["output_label", "output_probability"]
+    assert list(session.run.call_args.args[1]) == ["float_input"]
+    # the same run options are reused by each call
+    assert session.run.call_args_list[0].args[2] is session.run.call_args_list[1].args[2]
+
+
 @patch("src.python_src.util.ml_classifier.os.path.exists")
 @patch("src.python_src.util.ml_classifier.ort.InferenceSession")
 @patch("src.python_src.util.ml_classifier.joblib.load")
@@ -268,6 +306,51 @@ def test_make_predictions_handles_exceptions(
     mock_logging.error.assert_called_once()
 
 
+def test_top_k_predictions() -> None:
+    """Test that the top k labels of each row are returned in descending order of probability."""
+    probabilities = np.array([[0.1, 0.6, 0.05, 0.25], [0.4, 0.1, 0.3, 0.2]], dtype=float32)
+    labels = ["a", "b", "c", "d"]
+
+    top_k = top_k_predictions(probabilities, labels, 3)
+
+    assert [[label for label, _ in row] for row in top_k] == [["b", "d", "a"], ["a", "c", "d"]]
+    assert top_k[0][0][1] == pytest.approx(0.6)
+    assert [len(row) for row in top_k_predictions(probabilities, labels, 10)] == [4, 4]
+    with pytest.raises(ValueError, match="k must be greater than zero"):
+        top_k_predictions(probabilities, labels, 0)
+
+
+@patch("src.python_src.util.ml_classifier.os.path.exists")
+@patch("src.python_src.util.ml_classifier.ort.InferenceSession")
+@patch("src.python_src.util.ml_classifier.joblib.load")
+@patch("src.python_src.util.ml_classifier.MLClassifier.get_inputs_for_session")
+@patch("src.python_src.util.ml_classifier.MLClassifier.get_outputs_for_session")
+def test_make_top_k_predictions(
+    mock_outputs_for_session: MagicMock,
+    mock_inputs_for_session: MagicMock,
+    mock_joblib: MagicMock,
+    mock_onnx_session: MagicMock,
+    mock_os_path: MagicMock,
+) -> None:
+    """Test that the top k classifications are taken from the probabilities output of the session."""
+    mock_os_path.return_value = True
+    classifier = MLClassifier("model.onnx", "vectorizer.pkl")
+    classifier.session.run = MagicMock()
+    classifier.session.run.return_value = [
+        ["lorem", "dolor"],
+        [{"lorem": 0.74, "ipsum": 0.16, "dolor": 0.1}, {"lorem": 0.04, "ipsum": 0.01, "dolor": 0.95}],
+    ]
+
+    predictions = classifier.make_top_k_predictions(["asthma", "acne"], 2)
+
+    assert [[label for label, _ in row] for row in predictions] == [["lorem", "ipsum"], ["dolor", "lorem"]]
+    assert predictions[1][0][1] == pytest.approx(0.95)
+    assert classifier.make_top_k_predictions([], 2) == []
+
+    classifier.session.run.side_effect = Exception("Test exception")
+    assert classifier.make_top_k_predictions(["asthma", "acne"], 2) == [[("error", 0.0)], [("error", 0.0)]]
+
+
 @patch("src.python_src.util.ml_classifier.os.path.exists")
 @patch("src.python_src.util.ml_classifier.ort.InferenceSession")
 @patch("src.python_src.util.ml_classifier.joblib.load")
@@ -396,3 +479,115 @@ def test_ml_classifier_initialization_with_version(
         "LR_tfidf_fit_False_features_20250521_20250623_151434_vectorizer.pkl",
     )
     assert version == expected, f"Expected {expected}, got {version}"
+
+
+def test_preallocatable_outputs() -> None:
+    """Test that only numeric tensor outputs with a fixed shape apart from the batch dimension are preallocated."""
+    outputs = []
+    for name, output_type, shape in [
+        ("label", "tensor(string)", [None]),
+        ("zipmap", "seq(map(string,tensor(float)))", []),
+        ("probabilities", "tensor(float)", ["N", 4]),
+        ("variable", "tensor(float)", ["N", "M"]),
+        ("class_index", "tensor(int64)", ["N"]),
+    ]:
+        output = MagicMock()
+        output.name, output.type, output.shape = name, output_type, shape
+        outputs.append(output)
+
+    assert _preallocatable_outputs(outputs) == {"probabilities": ((4,), np.float32), "class_index": ((), np.int64)}
+
+
+@patch("src.python_src.util.ml_classifier.ort.InferenceSession")
+def test_create_inference_session_rejects_unknown_options(mock_onnx_session: MagicMock) -> None:
+    """Test that unknown graph optimization levels and execution modes are rejected."""
+    with pytest.raises(ValueError, match="Unknown graph optimization level"):
+        create_inference_session("model.onnx", {"graph_optimization_level": "fastest"})
+    with pytest.raises(ValueError, match="Unknown execution mode"):
+        create_inference_session("model.onnx", {"execution_mode": "concurrent"})
+    mock_onnx_session.assert_not_called()
+
+
+@patch("src.python_src.util.ml_classifier.ort.InferenceSession")
+def test_create_inference_session_sets_session_options(mock_onnx_session: MagicMock) -> None:
+    """Test that the configured session options are passed to the session."""
+    create_inference_session(
+        "model.onnx", {"intra_op_num_threads": 2, "execution_mode": "parallel", "enable_cpu_mem_arena": False}
+    )
+
+    sess_options = mock_onnx_session.call_args.kwargs["sess_options"]
+    assert mock_onnx_session.call_args.args == ("model.onnx",)
+    assert sess_options.intra_op_num_threads == 2
+    assert sess_options.execution_mode == ort.ExecutionMode.ORT_PARALLEL
+    assert not sess_options.enable_cpu_mem_arena
+    assert sess_options.graph_optimization_level == ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+
+def test_ml_classifier_session_options_and_saved_optimized_model(tmp_path: str) -> None:
+    vectorizer_file = os.path.join(tmp_path, "vectorizer.pkl")
+    model_file = os.path.join(tmp_path, "model.onnx")
+    vectorizer = TfidfVectorizer().fit(TRAINING_TEXTS)
+    joblib.dump(vectorizer, vectorizer_file)
+    build_linear_classifier_model(model_file, len(vectorizer.vocabulary_), "SOFTMAX")
+    session_options = {
+        "intra_op_num_threads": 1,
+        "inter_op_num_threads": 1,
+        "graph_optimization_level": "extended",
+        "execution_mode": "sequential",
+        "enable_cpu_mem_arena": False,
+        "enable_mem_pattern": False,
+        "save_optimized_model": True,
+    }
+    conditions = ["Hearing loss, left ear", "knee PAIN", "ptsd"]
+    expected = MLClassifier(model_file, vectorizer_file).make_predictions(conditions)
+
+    classifier = MLClassifier(model_file, vectorizer_file, session_options=session_options)
+    optimized_model_file = os.path.join(tmp_path, "model.extended.optimized.onnx")
+    assert os.path.exists(optimized_model_file)
+    assert classifier.session.get_session_options().intra_op_num_threads == 1
+    assert classifier.make_predictions(conditions) == expected
+
+    # a later start loads the saved graph
+    with patch("src.python_src.util.ml_classifier.ort.InferenceSession", wraps=ort.InferenceSession) as mock_session:
+        reloaded = MLClassifier(model_file, vectorizer_file, session_options=session_options)
+    assert mock_session.call_args.args[0] == optimized_model_file
+    assert reloaded.make_predictions(conditions) == expected
+
+
+def test_ml_classifier_io_binding_matches_session_run(tmp_path: str) -> None:
+    vectorizer_file = os.path.join(tmp_path, "vectorizer.pkl")
+    model_file = os.path.join(tmp_path, "model.onnx")
+    vectorizer = TfidfVectorizer().fit(TRAINING_TEXTS)
+    joblib.dump(vectorizer, vectorizer_file)
+    build_tensor_output_model(model_file, len(vectorizer.vocabulary_))
+
+    classifier = MLClassifier(model_file, vectorizer_file)
+    io_binding_classifier = MLClassifier(model_file, vectorizer_file, io_binding=True, preallocated_batch_sizes=[1, 4])
+    assert io_binding_classifier.io_binding
+
+    batches = [["knee pain"], ["Hearing loss, left ear", "knee PAIN", "ptsd", "ringing in my ears"], ["sleep", "ptsd"]]
+    for conditions in batches * 2:
+        assert io_binding_classifier.make_predictions(conditions) == classifier.make_predictions(conditions)
+    # the preallocated buffers of batch sizes 1 and 4 are reused, and batch size 2 is allocated by ONNX Runtime
+    assert sorted(io_binding_classifier._output_buffers.buffers) == [
+        ("output_label", 1),
+        ("output_label", 4),
+        ("output_probability", 1),
+        ("output_probability", 4),
+    ]
+
+
+def test_ml_classifier_io_binding_falls_back_for_non_tensor_outputs(tmp_path: str) -> None:
+    vectorizer_file = os.path.join(tmp_path, "vectorizer.pkl")
+    model_file = os.path.join(tmp_path, "model.onnx")
+    vectorizer = TfidfVectorizer().fit(TRAINING_TEXTS)
+    joblib.dump(vectorizer, vectorizer_file)
+    build_linear_classifier_model(model_file, len(vectorizer.vocabulary_), "SOFTMAX")
+
+    classifier = MLClassifier(model_file, vectorizer_file)
+    io_binding_classifier = MLClassifier(model_file, vectorizer_file, io_binding=True, preallocated_batch_sizes=[1, 4])
+    assert not io_binding_classifier.io_binding
+
+    conditions = ["Hearing loss, left ear", "knee PAIN", "ptsd", "ringing in my ears"]
+    assert io_binding_classifier.make_predictions(conditions) == classifier.make_predictions(conditions)
+    assert io_binding_classifier.make_top_k_predictions(conditions, 2) == classifier.make_top_k_predictions(conditions, 2)
@@ -0,0 +1,169 @@
+"""Tests for the ML inference server and its client."""
+
+import os
+import socket
+import tempfile
+import threading
+import time
+from typing import Any, Iterator, cast
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.python_src.util.ml_inference_server import MLInferenceServer, RemoteMLClassifier, get_authkey
+from src.python_src.util.ml_utilities import load_ml_classifier
+
+AUTHKEY = b"test-authkey"
+
+
+@pytest.fixture
+def socket_path() -> Iterator[str]:
+    with tempfile.TemporaryDirectory() as directory:
+        yield os.path.join(directory, "ml.sock")
+
+
+@pytest.fixture
+def server(socket_path: str) -> Iterator[MLInferenceServer]:
+    classifier = MagicMock()
+    classifier.make_predictions.side_effect = lambda texts: [("Hearing Loss", 0.9)] * len(texts)
+    classifier.make_top_k_predictions.side_effect = lambda texts, k: (
+        [[("Hearing Loss", 0.9), ("Tinnitus", 0.1)][:k]] * len(texts)
+    )
+    classifier.get_version.return_value = ("model.onnx", "vectorizer.pkl")
+
+    server = MLInferenceServer(classifier, socket_path, AUTHKEY)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.close()
+    thread.join(timeout=5)
+
+
+def test_remote_classifier_predictions(server: MLInferenceServer) -> None:
+    remote = RemoteMLClassifier(server.socket_path, AUTHKEY)
+
+    assert remote.make_predictions(["hearing loss", "ringing in ears"]) == [("Hearing Loss", 0.9), ("Hearing Loss", 0.9)]
+    cast(MagicMock, server.classifier).make_predictions.assert_called_once_with(["hearing loss", "ringing in ears"])
+
+
+def test_remote_classifier_top_k_predictions(server: MLInferenceServer) -> None:
+    remote = RemoteMLClassifier(server.socket_path, AUTHKEY)
+
+    assert remote.make_top_k_predictions(["hearing loss"], 2) == [[("Hearing Loss", 0.9), ("Tinnitus", 0.1)]]
+    cast(MagicMock, server.classifier).make_top_k_predictions.assert_called_once_with(["hearing loss"], 2)
+
+
+def test_remote_classifier_version(server: MLInferenceServer) -> None:
+    remote = RemoteMLClassifier(server.socket_path, AUTHKEY)
+
+    assert remote.get_version() == ("model.onnx", "vectorizer.pkl")
+    assert remote.get_version() == ("model.onnx", "vectorizer.pkl")
+    cast(MagicMock, server.classifier).get_version.assert_called_once()
+
+
+def test_remote_classifier_connections_are_per_thread(server: MLInferenceServer) -> None:
+    remote = RemoteMLClassifier(server.socket_path, AUTHKEY)
+    results = []
+
+    def predict() -> None:
+        results.append(remote.make_predictions(["tinnitus"]))
+
+    threads = [threading.Thread(target=predict) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [[("Hearing Loss", 0.9)]] * 4
+
+
+def test_remote_classifier_wrong_authkey(server: MLInferenceServer) -> None:
+    remote = RemoteMLClassifier(server.socket_path, b"wrong-authkey")
+
+    assert remote.make_predictions(["tinnitus"]) == [("error", 0.0)]
+    assert remote.get_version() == "unknown"
+
+
+def test_remote_classifier_server_unavailable(socket_path: str) -> None:
+    remote = RemoteMLClassifier(socket_path, AUTHKEY)
+
+    assert remote.make_predictions(["tinnitus", "acne"]) == [("error", 0.0), ("error", 0.0)]
+
+
+def test_remote_classifier_times_out_when_server_hangs(server: MLInferenceServer) -> None:
+    released = threading.Event()
+
+    def hang(texts: list[str]) -> list[tuple[str, float]]:
+        released.wait(timeout=5)
+        return [("Hearing Loss", 0.9)] * len(texts)
+
+    cast(MagicMock, server.classifier).make_predictions.side_effect = hang
+    remote = RemoteMLClassifier(server.socket_path, AUTHKEY, timeout_seconds=0.1)
+
+    assert remote.make_predictions(["tinnitus", "acne"]) == [("error", 0.0), ("error", 0.0)]
+
+    # the next request uses a new connection, so it doesn't read the late response to the one that timed out
+    released.set()
+    cast(MagicMock, server.classifier).make_predictions.side_effect = None
+    cast(MagicMock, server.classifier).make_predictions.return_value = [("Tinnitus", 0.8)]
+    assert remote.make_predictions(["tinnitus"]) == [("Tinnitus", 0.8)]
+
+
+def test_remote_classifier_times_out_when_server_does_not_authenticate(socket_path: str) -> None:
+    # a listener that accepts connections but never answers, like a hung server
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen()
+    accepted: list[tuple[socket.socket, Any]] = []
+    threading.Thread(target=lambda: accepted.extend(listener.accept() for _ in range(2)), daemon=True).start()
+    remote = RemoteMLClassifier(socket_path, AUTHKEY, timeout_seconds=0.2)
+
+    try:
+        start = time.perf_counter()
+        assert remote.make_predictions(["tinnitus"]) == [("error", 0.0)]
+        assert remote.make_predictions(["tinnitus"]) == [("error", 0.0)]
+        assert time.perf_counter() - start < 2
+    finally:
+        listener.close()
+        for connection, _ in accepted:
+            connection.close()
+
+
+def test_server_keeps_serving_after_client_closes_during_handshake(server: MLInferenceServer) -> None:
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(server.socket_path)
+    client.close()
+    remote = RemoteMLClassifier(server.socket_path, AUTHKEY)
+
+    assert remote.make_predictions(["tinnitus"]) == [("Hearing Loss", 0.9)]
+
+
+def test_get_authkey() -> None:
+    with patch.dict(os.environ, {"ML_INFERENCE_SERVER_AUTHKEY": "secret"}):
+        assert get_authkey() == b"secret"
+    with patch.dict(os.environ, {}, clear=True):
+        with pytest.raises(ValueError):
+            get_authkey()
+
+
+def test_load_ml_classifier_remote(socket_path: str) -> None:
+    mock_config = {"ml_classifier": {"inference": {"server": {"enabled": True, "socket_path": socket_path}}}}
+
+    with patch.dict(os.environ, {"ML_INFERENCE_SERVER_AUTHKEY": "secret"}):
+        result = load_ml_classifier(mock_config)
+    assert isinstance(result, RemoteMLClassifier)
+    assert result.socket_path == socket_path
+
+    with patch.dict(os.environ, {}, clear=True):
+        assert load_ml_classifier(mock_config) is None
+
+
+def test_server_reports_errors_to_client(server: MLInferenceServer) -> None:
+    cast(MagicMock, server.classifier).make_predictions.side_effect = RuntimeError("inference failed")
+    remote = RemoteMLClassifier(server.socket_path, AUTHKEY)
+
+    assert remote.make_predictions(["tinnitus"]) == [("error", 0.0)]
+    # the connection is still usable after an error
+    cast(MagicMock, server.classifier).make_predictions.side_effect = None
+    cast(MagicMock, server.classifier).make_predictions.return_value = [("Hearing Loss", 0.5)]
+    assert remote.make_predictions(["tinnitus"]) == [("Hearing Loss", 0.5)]
@@ -0,0 +1,84 @@
+"""Tests for partial matching against the expanded lookup table."""
+
+from typing import Any, Dict, FrozenSet
+
+import pytest
+
+from src.python_src.util.app_utilities import dropdown_expanded_table_inits, load_config
+from src.python_src.util.expanded_lookup_table import ExpandedLookupTable
+from src.python_src.util.partial_match import PartialMatcher
+
+LOOKUP_TABLE: Dict[FrozenSet[str], Dict[str, Any]] = {
+    frozenset(["knee"]): {"classification_code": 8997, "classification_name": "Musculoskeletal - Knee"},
+    frozenset(["ankle"]): {"classification_code": 8991, "classification_name": "Musculoskeletal - Ankle"},
+    frozenset(["hearing", "loss"]): {"classification_code": 3140, "classification_name": "Hearing Loss"},
+    frozenset(["loss"]): {"classification_code": 1234, "classification_name": "Loss"},
+    frozenset(["tinnitus"]): {"classification_code": 3140, "classification_name": "Hearing Loss"},
+}
+
+
+def _matcher(min_confidence: float = 0.5, max_input_tokens: int = 12) -> PartialMatcher:
+    return PartialMatcher(LOOKUP_TABLE, min_confidence, max_input_tokens)
+
+
+def test_largest_contained_key_is_matched() -> None:
+    assert _matcher().match(frozenset(["hearing", "loss", "constant"])) == (frozenset(["hearing", "loss"]), 2 / 3)
+
+
+def test_key_not_fully_contained_is_not_matched() -> None:
+    assert _matcher().match(frozenset(["hearing", "aids"])) is None
+
+
+def test_match_below_min_confidence() -> None:
+    assert _matcher().match(frozenset(["knee", "swelling", "stiffness"])) is None
+    assert _matcher(min_confidence=0.3).match(frozenset(["knee", "swelling", "stiffness"])) == (
+        frozenset(["knee"]),
+        1 / 3,
+    )
+
+
+def test_keys_with_different_classifications_are_ambiguous() -> None:
+    assert _matcher().match(frozenset(["knee", "ankle"])) is None
+
+
+def test_keys_with_the_same_classification_are_not_ambiguous() -> None:
+    assert _matcher().match(frozenset(["hearing", "loss", "tinnitus"])) == (frozenset(["hearing", "loss"]), 2 / 3)
+    assert _matcher().match(frozenset(["tinnitus", "hearing"])) == (frozenset(["tinnitus"]), 0.5)
+
+
+def test_long_and_empty_texts_are_not_matched() -> None:
+    assert _matcher(max_input_tokens=2).match(frozenset(["hearing", "loss", "constant"])) is None
+    assert _matcher().match(frozenset()) is None
+
+
+def test_invalid_settings() -> None:
+    with pytest.raises(ValueError):
+        _matcher(min_confidence=0)
+    with pytest.raises(ValueError):
+        _matcher(max_input_tokens=0)
+
+
+def test_expanded_lookup_partial_match() -> None:
+    app_config = load_config("src/python_src/util/app_config.yaml")
+    partial_match = {"enabled": True, "min_confidence": 0.5, "max_input_tokens": 12}
+    lookup_table = ExpandedLookupTable(
+        dropdown_expanded_table_inits, app_config["common_words"], app_config["musculoskeletal_lut"], partial_match
+    )
+
+    classification, processed_text = lookup_table.lookup("Sleep apnea, severe")
+
+    assert processed_text == "sleep apnea severe"
+    assert classification == {
+        "classification_code": 9012,
+        "classification_name": "Respiratory",
+        "matched_key": frozenset(["sleep", "apnea"]),
+        "match_confidence": 2 / 3,
+    }
+    # exact matches are unchanged
+    assert lookup_table.lookup("sleep apnea")[0] == {"classification_code": 9012, "classification_name": "Respiratory"}
+
+    # partial matching is off unless enabled
+    lookup_table = ExpandedLookupTable(
+        dropdown_expanded_table_inits, app_config["common_words"], app_config["musculoskeletal_lut"]
+    )
+    assert lookup_table.get("Sleep apnea, severe")["classification_code"] is None
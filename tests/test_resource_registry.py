@@ -0,0 +1,269 @@
+"""Tests for the lazily constructed shared resources."""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.python_src.util.resource_registry import LazyResource, ReloadInProgressError, ReloadSignal, ResourceRegistry
+
+
+def test_resource_is_built_on_first_use() -> None:
+    factory = MagicMock(return_value={"a": 1})
+    resource = LazyResource("table", factory)
+
+    assert not resource.loaded
+    factory.assert_not_called()
+
+    assert resource.get() == {"a": 1}
+    assert resource.get() == {"a": 1}
+    assert resource.loaded
+    assert resource.load_seconds is not None
+    factory.assert_called_once()
+
+
+def test_concurrent_first_use_builds_once() -> None:
+    calls: List[int] = []
+
+    def slow_factory() -> object:
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    resource = LazyResource("slow", slow_factory)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        values = list(executor.map(lambda _: resource.get(), range(8)))
+
+    assert len(calls) == 1
+    assert all(value is values[0] for value in values)
+
+
+def test_failed_construction_is_retried() -> None:
+    factory = MagicMock(side_effect=[RuntimeError("download failed"), "classifier"])
+    resource = LazyResource("classifier", factory)
+
+    with pytest.raises(RuntimeError):
+        resource.get()
+    assert not resource.loaded
+    assert resource.get() == "classifier"
+
+
+def test_proxy_forwards_to_resource() -> None:
+    table: Dict[str, Any] = {"knee": 8997, "ptsd": 8989}
+    holder = MagicMock(table=table, empty=[])
+    resource = LazyResource("tables", lambda: holder)
+    proxy = resource.proxy("table")
+
+    assert "not loaded" in repr(proxy)
+    assert not resource.loaded
+    assert len(proxy) == 2
+    assert "knee" in proxy
+    assert sorted(proxy) == ["knee", "ptsd"]
+    assert proxy.get("ptsd") == 8989
+    assert proxy
+    assert not resource.proxy("empty")
+    assert "knee" in repr(proxy)
+
+
+def test_proxy_passes_isinstance_checks() -> None:
+    proxy = LazyResource("table", lambda: {"knee": 8997}).proxy()
+
+    assert isinstance(proxy, dict)
+
+
+def test_proxy_attributes_can_be_patched() -> None:
+    class Table:
+        def lookup(self, text: str) -> str:
+            return "real"
+
+    table = Table()
+    proxy = LazyResource("table", lambda: table).proxy()
+
+    with patch.object(proxy, "lookup", return_value="patched"):
+        assert proxy.lookup("knee") == "patched"
+        assert table.lookup("knee") == "patched"
+    assert proxy.lookup("knee") == "real"
+
+
+def test_proxy_of_none_is_falsy() -> None:
+    proxy = LazyResource("classifier", lambda: None).proxy()
+
+    assert not proxy
+
+
+def test_registry_warm_up() -> None:
+    registry = ResourceRegistry()
+    order: List[str] = []
+    registry.register("first", lambda: order.append("first"))
+    registry.register("second", lambda: order.append("second"))
+
+    assert registry.load_times() == {}
+    load_times = registry.warm_up()
+
+    assert order == ["first", "second"]
+    assert set(load_times) == {"first", "second"}
+    assert registry["first"].loaded
+    # resources that are already built are not rebuilt
+    registry.warm_up()
+    assert order == ["first", "second"]
+
+
+def test_registry_rejects_duplicate_names() -> None:
+    registry = ResourceRegistry()
+    registry.register("table", lambda: None)
+
+    with pytest.raises(ValueError):
+        registry.register("table", lambda: None)
+
+
+def test_registry_warm_up_loads_resources_concurrently() -> None:
+    registry = ResourceRegistry()
+    # each factory waits for the other to start, so warm_up only finishes if they run at the same time
+    barrier = threading.Barrier(2, timeout=5)
+    registry.register("tables", barrier.wait)
+    registry.register("classifier", barrier.wait)
+
+    assert registry.pending() == ["tables", "classifier"]
+    assert not registry.ready
+
+    registry.warm_up()
+
+    assert registry.pending() == []
+    assert registry.ready
+
+
+def test_registry_warm_up_raises_factory_errors() -> None:
+    registry = ResourceRegistry()
+    registry.register("tables", lambda: "tables")
+    registry.register("classifier", MagicMock(side_effect=RuntimeError("download failed")))
+
+    with pytest.raises(RuntimeError):
+        registry.warm_up()
+    assert registry.pending() == ["classifier"]
+
+
+def test_lifespan_warms_up_resources() -> None:
+    from fastapi.testclient import TestClient
+
+    # the registry used by the app (app_utilities is reloaded by some tests, replacing its registry)
+    from src.python_src import api
+
+    with TestClient(api.app):
+        pass
+    # the warm-up runs in the background, and has finished once the app has shut down
+    assert api.resources.ready  # type: ignore[attr-defined]
+
+
+def test_registry_reload_swaps_in_new_values() -> None:
+    registry = ResourceRegistry()
+    tables = registry.register("tables", lambda: "old tables")
+    classifier = registry.register("classifier", lambda: "old classifier")
+    proxy = tables.proxy()
+    registry.warm_up()
+
+    replaced = registry.reload({"tables": lambda: "new tables"})
+
+    assert replaced == {"tables": "old tables", "classifier": "old classifier"}
+    assert tables.get() == "new tables"
+    assert repr(proxy) == "<ResourceProxy tables: 'new tables'>"
+    assert classifier.get() == "old classifier"
+    # the new factory replaces the registered one
+    assert tables.factory() == "new tables"
+
+
+def test_registry_reload_failure_keeps_current_values() -> None:
+    registry = ResourceRegistry()
+    tables = registry.register("tables", lambda: "old tables")
+    classifier = registry.register("classifier", lambda: "old classifier")
+    registry.warm_up()
+
+    with pytest.raises(RuntimeError):
+        registry.reload({"tables": lambda: "new tables", "classifier": MagicMock(side_effect=RuntimeError("bad model"))})
+
+    assert tables.get() == "old tables"
+    assert classifier.get() == "old classifier"
+    assert not registry.reloading
+
+
+def test_registry_rejects_concurrent_reload() -> None:
+    registry = ResourceRegistry()
+    registry.register("tables", lambda: "old tables")
+    registry.warm_up()
+    building = threading.Event()
+    release = threading.Event()
+
+    def build_slowly() -> str:
+        building.set()
+        release.wait(timeout=5)
+        return "new tables"
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        first = executor.submit(registry.reload, {"tables": build_slowly})
+        building.wait(timeout=5)
+        with pytest.raises(ReloadInProgressError):
+            registry.reload({"tables": lambda: "other tables"})
+        release.set()
+        first.result()
+
+    assert registry["tables"].get() == "new tables"
+    assert not registry.reloading
+
+
+def test_pinned_snapshot_is_kept_across_reload() -> None:
+    registry = ResourceRegistry()
+    tables = registry.register("tables", lambda: "old tables")
+    classifier = registry.register("classifier", lambda: "old classifier")
+    tables_proxy = tables.proxy()
+    registry.warm_up()
+
+    token = registry.pin_snapshot()
+    try:
+        registry.reload({"tables": lambda: "new tables", "classifier": lambda: "new classifier"})
+        # a request that started before the reload still sees the values it started with
+        assert repr(tables_proxy) == "<ResourceProxy tables: 'old tables'>"
+        assert classifier.get() == "old classifier"
+        assert registry.snapshot().generation == 0
+    finally:
+        registry.unpin_snapshot(token)
+
+    # both resources are swapped in together, by the same assignment
+    assert repr(tables_proxy) == "<ResourceProxy tables: 'new tables'>"
+    assert classifier.get() == "new classifier"
+    assert registry.snapshot().generation == 1
+
+
+def test_pinned_snapshot_is_copied_to_other_threads() -> None:
+    registry = ResourceRegistry()
+    tables = registry.register("tables", lambda: "old tables")
+    registry.warm_up()
+    token = registry.pin_snapshot()
+    try:
+        context = contextvars.copy_context()
+        registry.reload({"tables": lambda: "new tables"})
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(context.run, tables.get).result() == "old tables"
+    finally:
+        registry.unpin_snapshot(token)
+
+
+def test_reload_signal(tmp_path: Path) -> None:
+    path = str(tmp_path / "reload" / "signal")
+    first_worker = ReloadSignal(path)
+    second_worker = ReloadSignal(path)
+    assert not first_worker.check()
+
+    first_worker.publish()
+    # the worker that reloaded does not reload again, and the other one reloads once
+    assert not first_worker.check()
+    assert second_worker.check()
+    assert not second_worker.check()
+
+    second_worker.publish()
+    assert first_worker.check()
+    # a worker that starts after a reload uses the reloaded configuration already
+    assert not ReloadSignal(path).check()
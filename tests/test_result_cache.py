@@ -0,0 +1,78 @@
+"""Tests for the LRU result cache."""
+
+import threading
+
+import pytest
+
+from src.python_src.util.app_utilities import app_config
+from src.python_src.util.result_cache import LRUCache
+
+
+def test_get_returns_cached_value_and_counts_hits_and_misses() -> None:
+    cache: LRUCache[str, int] = LRUCache(2)
+    assert cache.get("tinnitus") is None
+    cache.put("tinnitus", 1)
+    assert cache.get("tinnitus") == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "size": 1, "max_size": 2}
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache: LRUCache[str, int] = LRUCache(2)
+    cache.put("tinnitus", 1)
+    cache.put("ptsd", 2)
+    cache.get("tinnitus")  # ptsd is now the least recently used
+    cache.put("lower back pain", 3)
+
+    assert cache.get("ptsd") is None
+    assert cache.get("tinnitus") == 1
+    assert cache.get("lower back pain") == 3
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+
+def test_clear_invalidates_entries_but_keeps_counters() -> None:
+    cache: LRUCache[str, int] = LRUCache(2)
+    cache.put("tinnitus", 1)
+    cache.get("tinnitus")
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.get("tinnitus") is None
+    assert cache.hits == 1
+
+
+def test_zero_size_disables_cache() -> None:
+    cache: LRUCache[str, int] = LRUCache(0)
+    cache.put("tinnitus", 1)
+    assert cache.get("tinnitus") is None
+    assert len(cache) == 0
+
+
+def test_negative_size_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        LRUCache(-1)
+
+
+def test_cache_is_bounded_under_concurrent_use() -> None:
+    cache: LRUCache[int, int] = LRUCache(50)
+
+    def worker(offset: int) -> None:
+        for i in range(1000):
+            cache.put(offset + i, i)
+            cache.get(offset + i - 1)
+
+    threads = [threading.Thread(target=worker, args=(n * 1000,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = cache.stats()
+    assert stats["size"] == 50
+    assert stats["hits"] + stats["misses"] == 4000
+    assert stats["evictions"] == 4000 - 50
+
+
+def test_cache_sizes_are_configured() -> None:
+    assert app_config["result_cache"]["contention_text_max_size"] >= 0
+    assert app_config["result_cache"]["ml_prediction_max_size"] >= 0
@@ -0,0 +1,108 @@
+"""
+Tests for the sparse scoring engine, including parity with the output of the ONNX session
+for linear classifier graphs shaped like the ones exported from scikit-learn.
+"""
+
+import os
+
+import joblib
+import numpy as np
+import onnxruntime as ort
+import pytest
+from scipy.sparse import random as sparse_random
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from src.python_src.util.ml_classifier import MLClassifier
+from src.python_src.util.sparse_linear_scorer import SparseLinearScorer
+from tests.onnx_models import LABELS, TRAINING_TEXTS, build_linear_classifier_model
+
+
+@pytest.mark.parametrize("post_transform", ["SOFTMAX", "LOGISTIC", "NONE"])
+def test_parity_with_onnx_session(tmp_path: str, post_transform: str) -> None:
+    model_file = os.path.join(tmp_path, "model.onnx")
+    n_features = 50
+    build_linear_classifier_model(model_file, n_features, post_transform)
+    features = sparse_random(40, n_features, density=0.1, format="csr", random_state=3, dtype=np.float64)
+
+    session = ort.InferenceSession(model_file)
+    onnx_labels, onnx_probabilities = session.run(
+        ["output_label", "output_probability"], {"input": features.toarray().astype(np.float32)}
+    )
+
+    scorer = SparseLinearScorer.from_onnx_model(model_file)
+    probabilities = scorer.predict_proba(features)
+    predictions = scorer.predict(features)
+
+    assert scorer.labels == LABELS
+    assert [label for label, _ in predictions] == list(onnx_labels)
+    for i, row in enumerate(onnx_probabilities):
+        np.testing.assert_allclose(probabilities[i], [row[label] for label in LABELS], rtol=1e-5, atol=1e-6)
+        assert predictions[i][1] == pytest.approx(row[onnx_labels[i]], rel=1e-5, abs=1e-6)
+
+
+def test_ml_classifier_sparse_inference_matches_onnx_session(tmp_path: str) -> None:
+    vectorizer_file = os.path.join(tmp_path, "vectorizer.pkl")
+    model_file = os.path.join(tmp_path, "model.onnx")
+    vectorizer = TfidfVectorizer().fit(TRAINING_TEXTS)
+    joblib.dump(vectorizer, vectorizer_file)
+    build_linear_classifier_model(model_file, len(vectorizer.vocabulary_), "SOFTMAX")
+
+    dense_classifier = MLClassifier(model_file, vectorizer_file)
+    sparse_classifier = MLClassifier(model_file, vectorizer_file, sparse_inference=True)
+    assert dense_classifier.sparse_scorer is None
+    assert sparse_classifier.sparse_scorer is not None
+
+    conditions = ["Hearing loss, left ear", "knee PAIN", "ptsd", "ringing in my ears", "unknown words only"]
+    dense_predictions = dense_classifier.make_predictions(conditions)
+    sparse_predictions = sparse_classifier.make_predictions(conditions)
+
+    assert [label for label, _ in sparse_predictions] == [label for label, _ in dense_predictions]
+    for (_, sparse_probability), (_, dense_probability) in zip(sparse_predictions, dense_predictions, strict=True):
+        assert sparse_probability == pytest.approx(dense_probability, rel=1e-5, abs=1e-6)
+
+
+def test_ml_classifier_top_k_predictions_match_predictions(tmp_path: str) -> None:
+    vectorizer_file = os.path.join(tmp_path, "vectorizer.pkl")
+    model_file = os.path.join(tmp_path, "model.onnx")
+    vectorizer = TfidfVectorizer().fit(TRAINING_TEXTS)
+    joblib.dump(vectorizer, vectorizer_file)
+    build_linear_classifier_model(model_file, len(vectorizer.vocabulary_), "SOFTMAX")
+
+    conditions = ["Hearing loss, left ear", "knee PAIN", "ptsd", "ringing in my ears"]
+    for classifier in [
+        MLClassifier(model_file, vectorizer_file),
+        MLClassifier(model_file, vectorizer_file, sparse_inference=True),
+    ]:
+        predictions = classifier.make_predictions(conditions)
+        top_k = classifier.make_top_k_predictions(conditions, 3)
+
+        for (label, probability), row in zip(predictions, top_k, strict=True):
+            assert len(row) == 3
+            assert row[0][0] == label
+            assert row[0][1] == pytest.approx(probability, rel=1e-5, abs=1e-6)
+            assert [p for _, p in row] == sorted((p for _, p in row), reverse=True)
+
+
+def test_unsupported_normalizer_falls_back_to_onnx_session(tmp_path: str) -> None:
+    vectorizer_file = os.path.join(tmp_path, "vectorizer.pkl")
+    model_file = os.path.join(tmp_path, "model.onnx")
+    vectorizer = TfidfVectorizer().fit(TRAINING_TEXTS)
+    joblib.dump(vectorizer, vectorizer_file)
+    build_linear_classifier_model(model_file, len(vectorizer.vocabulary_), "SOFTMAX", norm="L2")
+
+    with pytest.raises(ValueError, match="Unsupported Normalizer norm"):
+        SparseLinearScorer.from_onnx_model(model_file)
+
+    classifier = MLClassifier(model_file, vectorizer_file, sparse_inference=True)
+    assert classifier.sparse_scorer is None
+    assert len(classifier.make_predictions(["knee pain"])) == 1
+
+
+def test_rejects_mismatched_labels() -> None:
+    with pytest.raises(ValueError, match="one row per class label"):
+        SparseLinearScorer(np.zeros((2, 3)), np.zeros(2), ["a", "b", "c"])
+
+
+def test_rejects_unsupported_post_transform() -> None:
+    with pytest.raises(ValueError, match="Unsupported post_transform"):
+        SparseLinearScorer(np.zeros((2, 3)), np.zeros(2), ["a", "b"], post_transform="PROBIT")
@@ -0,0 +1,89 @@
+"""Tests for the timing of the classification pipeline's stages."""
+
+import asyncio
+import json
+from typing import Any, Dict
+from unittest.mock import MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from src.python_src.util.executor_utilities import run_in_classification_executor
+from src.python_src.util.stage_timing import (
+    finish_request_stages,
+    format_server_timing,
+    stage_latency_snapshot,
+    start_request_stages,
+    timed_stage,
+)
+
+TEST_CLAIM: Dict[str, Any] = {
+    "claim_id": 100,
+    "form526_submission_id": 500,
+    "contentions": [
+        {"contention_text": "PTSD", "contention_type": "NEW"},
+        {"contention_text": "", "contention_type": "INCREASE", "diagnostic_code": 7710},
+    ],
+}
+
+
+def test_timed_stage_adds_to_request_stages_and_histograms() -> None:
+    count_before = stage_latency_snapshot().get("test_stage", {}).get("count", 0)
+
+    token = start_request_stages()
+    with timed_stage("test_stage"):
+        pass
+    with timed_stage("test_stage"):
+        pass
+    stages = finish_request_stages(token)
+
+    assert list(stages) == ["test_stage"]
+    assert stages["test_stage"] >= 0
+    assert stage_latency_snapshot()["test_stage"]["count"] == count_before + 2
+
+
+def test_timed_stage_outside_a_request() -> None:
+    with timed_stage("test_stage_outside_request"):
+        pass
+
+    assert stage_latency_snapshot()["test_stage_outside_request"]["count"] >= 1
+
+
+def test_stages_timed_on_the_classification_executor_are_attributed_to_the_request() -> None:
+    @timed_stage("test_executor_stage")
+    def work() -> None:
+        pass
+
+    async def run() -> Dict[str, float]:
+        token = start_request_stages()
+        await run_in_classification_executor(work)
+        return finish_request_stages(token)
+
+    assert "test_executor_stage" in asyncio.run(run())
+
+
+def test_format_server_timing() -> None:
+    assert format_server_timing({"dc_lookup": 0.0001, "ml_inference": 0.0125}, total_seconds=0.02) == (
+        "dc_lookup;dur=0.100, ml_inference;dur=12.500, total;dur=20.000"
+    )
+
+
+def test_server_timing_header_is_off_by_default(test_client: TestClient) -> None:
+    response = test_client.post("/expanded-contention-classification", json=TEST_CLAIM)
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+
+
+@patch("src.python_src.api.log_as_json")
+@patch.dict("src.python_src.api.app_config", {"stage_timing": {"server_timing_header": True, "log_stages": True}})
+def test_server_timing_header_and_log(mock_log: MagicMock, test_client: TestClient) -> None:
+    response = test_client.post("/expanded-contention-classification", json=TEST_CLAIM)
+
+    assert response.status_code == 200
+    metrics = [metric.split(";")[0] for metric in response.headers["Server-Timing"].split(", ")]
+    for stage in ["validate_request", "expanded_lookup", "dc_lookup", "logging", "serialize_response", "total"]:
+        assert stage in metrics
+    process_time_log = mock_log.call_args.args[0]
+    assert process_time_log["url"] == "/expanded-contention-classification"
+    assert set(process_time_log["stages_ms"]) == set(metrics) - {"total"}
+    json.dumps(process_time_log)
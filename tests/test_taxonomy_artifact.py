@@ -0,0 +1,97 @@
+"""Tests for the compiled taxonomy artifact."""
+
+import json
+import os
+import tempfile
+from typing import Iterator
+
+import pytest
+
+from src.python_src.util.app_utilities import (
+    app_config,
+    autosuggestions_path,
+    diagnostic_code_inits,
+    dropdown_expanded_table_inits,
+    taxonomy_source_files,
+)
+from src.python_src.util.taxonomy_artifact import (
+    TaxonomyTables,
+    build_taxonomy_tables,
+    compile_taxonomy,
+    compute_source_hash,
+    load_taxonomy_artifact,
+)
+
+SOURCE_HASH = compute_source_hash(app_config, taxonomy_source_files)
+CSV_TABLES = build_taxonomy_tables(app_config, diagnostic_code_inits, dropdown_expanded_table_inits, autosuggestions_path)
+
+
+@pytest.fixture
+def artifact_path() -> Iterator[str]:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "compiled", "taxonomy.json")
+        compile_taxonomy(CSV_TABLES, SOURCE_HASH, path)
+        yield path
+
+
+def _load(artifact_path: str, source_hash: str = SOURCE_HASH) -> TaxonomyTables | None:
+    return load_taxonomy_artifact(artifact_path, source_hash, app_config, diagnostic_code_inits, dropdown_expanded_table_inits)
+
+
+def test_artifact_tables_match_csv_tables(artifact_path: str) -> None:
+    taxonomy = _load(artifact_path)
+
+    assert taxonomy is not None
+    assert taxonomy.dc_lookup_table.classification_code_mappings == CSV_TABLES.dc_lookup_table.classification_code_mappings
+    assert (
+        taxonomy.dropdown_lookup_table.classification_code_mappings
+        == CSV_TABLES.dropdown_lookup_table.classification_code_mappings
+    )
+    assert (
+        taxonomy.expanded_lookup_table.contention_text_lookup_table
+        == CSV_TABLES.expanded_lookup_table.contention_text_lookup_table
+    )
+    assert list(taxonomy.dropdown_values) == list(CSV_TABLES.dropdown_values)
+    for term in CSV_TABLES.dropdown_values:
+        assert taxonomy.dropdown_values.get(term) == CSV_TABLES.dropdown_values.get(term)
+
+
+def test_artifact_tables_classify_like_csv_tables(artifact_path: str) -> None:
+    taxonomy = _load(artifact_path)
+
+    assert taxonomy is not None
+    for text in ["Knee pain, right", "PTSD", "loss of teeth due to bone loss", "ringing in my ears", "not a condition"]:
+        assert taxonomy.expanded_lookup_table.lookup(text) == CSV_TABLES.expanded_lookup_table.lookup(text)
+        assert taxonomy.dropdown_lookup_table.get(text) == CSV_TABLES.dropdown_lookup_table.get(text)
+    assert taxonomy.dc_lookup_table.get("7710") == CSV_TABLES.dc_lookup_table.get("7710")
+
+
+def test_missing_artifact() -> None:
+    assert _load("does/not/exist.json") is None
+
+
+def test_out_of_date_artifact(artifact_path: str) -> None:
+    assert _load(artifact_path, source_hash="different") is None
+
+
+def test_source_hash_changes_with_config() -> None:
+    changed_config = {**app_config, "common_words": [*app_config["common_words"], "chronic"]}
+
+    assert compute_source_hash(changed_config, taxonomy_source_files) != SOURCE_HASH
+
+
+def test_tampered_artifact(artifact_path: str) -> None:
+    with open(artifact_path) as f:
+        artifact = json.load(f)
+    artifact["tables"]["dc_lookup_table"]["7710"] = [1, "Tampered"]
+    with open(artifact_path, "w") as f:
+        json.dump(artifact, f)
+
+    assert _load(artifact_path) is None
+
+
+def test_corrupt_artifact(artifact_path: str) -> None:
+    with open(artifact_path, "w") as f:
+        f.write("{not json")
+
+    assert _load(artifact_path) is None
@@ -0,0 +1,69 @@
+"""Tests for the single-pass text normalizer used by the expanded lookup table."""
+
+import pytest
+
+from src.python_src.util.app_utilities import app_config, dropdown_expanded_table_inits
+from src.python_src.util.expanded_lookup_table import ExpandedLookupTable
+from src.python_src.util.lookup_tables_utilities import read_csv_to_list
+from src.python_src.util.text_normalizer import TextNormalizer
+
+TEST_LUT = ExpandedLookupTable(
+    init_values=dropdown_expanded_table_inits,
+    common_words=app_config["common_words"],
+    musculoskeletal_lut=app_config["musculoskeletal_lut"],
+)
+NORMALIZER = TextNormalizer(app_config["common_words"])
+
+
+def _reference_pipeline(text: str) -> str:
+    """The original multi-step regex pipeline of the expanded lookup table"""
+    text = TEST_LUT._remove_punctuation(text)
+    text = TEST_LUT._remove_numbers_single_characters(text)
+    text = TEST_LUT._remove_common_words(text)
+    return text.lower().strip()
+
+
+def _taxonomy_terms() -> list[str]:
+    terms = []
+    for row in read_csv_to_list(dropdown_expanded_table_inits.csv_filepath):
+        for column in dropdown_expanded_table_inits.input_key:
+            if row[column]:
+                terms.append(row[column])
+        aggregate_synonyms = row.get(str(dropdown_expanded_table_inits.aggregate_synonyms)) or ""
+        terms.extend(t.strip() for t in aggregate_synonyms.split("|") if t.strip())
+    return terms
+
+
+def test_parity_with_reference_pipeline_for_every_taxonomy_term() -> None:
+    terms = _taxonomy_terms()
+    assert len(terms) > 1000
+    for term in terms:
+        assert NORMALIZER.normalize(term) == _reference_pipeline(term), f"{term!r}: normalizer output differs"
+        assert NORMALIZER.normalize(term.lower()) == _reference_pipeline(term.lower()), f"{term!r}: differs when lowercased"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "   ",
+        "Tinnitus (ringing or hissing in ears)",
+        "PTSD - post-traumatic stress disorder, chronic",
+        "a1b 2nd L5-S1 C4/C5",
+        "knee’s pain\tleft\t\tside",
+        "left\\knee",
+        "right knee's ACL tear, bilateral",
+        "haſ pain in K knee",
+        "café au lait spots",
+    ],
+)
+def test_parity_with_reference_pipeline_for_edge_cases(text: str) -> None:
+    assert NORMALIZER.normalize(text) == _reference_pipeline(text)
+
+
+def test_normalize_removes_punctuation_digits_single_letters_and_common_words() -> None:
+    assert NORMALIZER.normalize("Right Knee's ACL-tear (2nd, x) in the left") == "knees acl tear nd"
+
+
+def test_lookup_table_uses_normalizer() -> None:
+    assert TEST_LUT._removal_pipeline("Tinnitus (ringing or hissing in ears)") == "tinnitus ringing hissing ears"